@@ -0,0 +1,183 @@
+"""Benchmarks for editing schematics in place.
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_editor.py
+"""
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from bench_parser import _paths
+from bench_sexp import best_of, traced_memory
+
+from kicad_tool.annotate import read_rows, resolve_edits
+from kicad_tool.editor import (
+    EditResult, _apply_edits, _edit_tree, _index_symbols, _set_or_add_property,
+    list_references, set_properties, set_properties_batch,
+)
+from kicad_tool.locking import submit_edits
+from kicad_tool.sexp import SexpNode, map_file, parse_sexp, scan_symbol_properties, serialize_sexp_to
+
+EDIT = ("C1", {"Value": "1000uF", "Footprint": "Capacitor_THT:CP_Radial_D10.0mm_P5.00mm"})
+
+
+def _set_reserializing(path: str, reference: str, properties: dict[str, str]) -> None:
+    """Parse the whole file and write the whole tree back, as the editor used to."""
+    with map_file(path) as data:
+        root_data = parse_sexp(data, lexemes=True)
+    for sym in _index_symbols(SexpNode(root_data)).get(reference, []):
+        for key, value in properties.items():
+            _set_or_add_property(sym, key, value, None)
+    with open(path, "w") as f:
+        serialize_sexp_to(f, root_data)
+
+
+def _set_spliced(path: str, reference: str, properties: dict[str, str]) -> None:
+    """The tree path of ``set_properties``: parse symbols, splice dirty nodes."""
+    with map_file(path) as data:
+        _, write, _ = _edit_tree(data, {reference: properties})
+        out = io.BytesIO()
+        write(out)
+    with open(path, "wb") as f:
+        f.write(out.getvalue())
+
+
+def _best_of_fresh(fn, source: str, work: str, *args, repeat: int) -> float:
+    """Like ``best_of``, but each run edits a fresh copy of ``source``."""
+    best = float("inf")
+    for _ in range(repeat):
+        shutil.copy(source, work)
+        best = min(best, best_of(fn, work, *args, repeat=1))
+    return best
+
+
+def bench_set(paths) -> None:
+    print(
+        "set one reference: re-serialize everything vs splice dirty nodes vs patch values "
+        "vs values already set (time, peak memory)"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        work = os.path.join(tmpdir, "work.kicad_sch")
+        for name, path in paths:
+            repeat = 5 if os.path.getsize(path) < 1_000_000 else 2
+            row = f"  {name:<14}"
+            for label, fn in (("full", _set_reserializing), ("spliced", _set_spliced), ("patched", set_properties)):
+                elapsed = _best_of_fresh(fn, path, work, *EDIT, repeat=repeat)
+                shutil.copy(path, work)
+                _, peak = traced_memory(fn, work, *EDIT)
+                row += f" {label} {elapsed * 1e3:7.1f} ms {peak / 1e6:5.1f} MB "
+            # ``work`` already holds the edit, so this run finds nothing to write.
+            elapsed = best_of(set_properties, work, *EDIT, repeat=repeat)
+            row += f" unchanged {elapsed * 1e3:7.1f} ms"
+            print(row)
+
+
+BATCH_LIMIT = 20
+
+
+def _batch_edits(path: str) -> dict[str, dict[str, str]]:
+    """An MPN for (up to BATCH_LIMIT) resistors, as ``kicad-tool set --ref 'R*'`` would do."""
+    with open(path, "rb") as f:
+        refs = {props["Reference"][2] for props in scan_symbol_properties(f.read()) if "Reference" in props}
+    resistors = sorted(ref for ref in refs if ref.startswith("R"))[:BATCH_LIMIT]
+    return {ref: {"MPN": "RC0402FR-0710KL"} for ref in resistors}
+
+
+def _set_each(path: str, edits: dict[str, dict[str, str]]) -> None:
+    for ref, properties in edits.items():
+        set_properties(path, ref, properties)
+
+
+def bench_batch(paths) -> None:
+    print("set many references: one set_properties call per reference vs one set_properties_batch call")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        work = os.path.join(tmpdir, "work.kicad_sch")
+        for name, path in paths:
+            edits = _batch_edits(path)
+            row = f"  {name:<14} {len(edits):4d} refs"
+            for label, fn in (("each", _set_each), ("batch", set_properties_batch)):
+                elapsed = _best_of_fresh(fn, path, work, edits, repeat=2)
+                row += f" {label} {elapsed * 1e3:8.1f} ms"
+            print(row)
+
+
+ANNOTATE_ROWS = 30_000
+
+
+def _write_parts(path: str, references: list[str], rows: int) -> None:
+    with open(path, "w") as f:
+        f.write("Reference,MPN,LCSC,Supplier\n")
+        for i in range(rows):
+            f.write(f"{references[i % len(references)]},MPN-{i},C{i},Acme\n")
+        f.write("R*,,,Digi-Key\n")
+
+
+def _annotate(path: str, parts: str) -> EditResult:
+    edits, _ = resolve_edits(read_rows(parts), list_references(path))
+    return set_properties_batch(path, edits)
+
+
+def bench_annotate(paths) -> None:
+    print(f"annotate from a {ANNOTATE_ROWS}-row CSV: read rows, resolve refs, one batch edit")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        work = os.path.join(tmpdir, "work.kicad_sch")
+        parts = os.path.join(tmpdir, "parts.csv")
+        for name, path in paths:
+            _write_parts(parts, list_references(path), ANNOTATE_ROWS)
+            elapsed = _best_of_fresh(_annotate, path, work, parts, repeat=2)
+            print(f"  {name:<14} {elapsed * 1e3:8.1f} ms")
+
+
+CONCURRENT_WORKERS = 8
+
+
+def _unlocked(path: str, edits: dict[str, dict[str, str]]) -> EditResult:
+    return _apply_edits(path, edits)
+
+
+def _run_concurrently(fn, path: str, edits: dict[str, dict[str, str]]) -> float:
+    """Submit one edit per reference from a pool of processes."""
+    start = time.perf_counter()
+    with ProcessPoolExecutor(CONCURRENT_WORKERS) as pool:
+        list(pool.map(fn, repeat(path), ({ref: props} for ref, props in edits.items())))
+    return time.perf_counter() - start
+
+
+def bench_concurrent(paths) -> None:
+    print(
+        f"set from {CONCURRENT_WORKERS} processes, one reference each: no lock vs lock vs lock + queue "
+        "(time, edits lost)"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        work = os.path.join(tmpdir, "work.kicad_sch")
+        for name, path in paths:
+            edits = _batch_edits(path)
+            row = f"  {name:<14} {len(edits):4d} refs"
+            for label, fn in (("unlocked", _unlocked), ("locked", set_properties_batch), ("queued", submit_edits)):
+                shutil.copy(path, work)
+                elapsed = _run_concurrently(fn, work, edits)
+                with open(work, "rb") as f:
+                    annotated = {p["Reference"][2] for p in scan_symbol_properties(f.read()) if "MPN" in p}
+                lost = len(edits.keys() - annotated)
+                row += f" {label} {elapsed * 1e3:8.1f} ms {lost:3d} lost "
+            print(row)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = _paths(tmpdir)
+        bench_set(paths)
+        bench_batch(paths)
+        bench_annotate(paths)
+        bench_concurrent(paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""Benchmarks for schematic loading and extraction.
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_parser.py
+"""
+from __future__ import annotations
+
+import math
+import os
+import random
+import tempfile
+from fnmatch import fnmatch
+from pathlib import Path
+
+import legacy_parser
+from bench_sexp import best_of, traced_memory
+from synthetic import HIRVI, JOLENE, wire_mesh_schematic, write_hierarchical_project, write_tiled_schematic
+
+from kicad_tool.formatter import format_netlist
+from kicad_tool.parser import (
+    _SCHEMATIC_TAGS, _SKIPPED_TAGS, _build_lib_pin_tables, _build_pin_name_map, _extract_components,
+    _UnionFind, _coord_key, _extract_nets, _find_multi_unit_refs, _get_unit_pins, _index_lib_symbols, _pin_offsets,
+    _read_instances, _read_wiring, _to_iu, parse_schematic, parse_schematic_subset,
+)
+from kicad_tool.sexp import SexpNode, TagIndex, map_file, parse_sexp
+
+SYNTHETIC_COPIES = 60
+
+
+def _paths(tmpdir: str) -> list[tuple[str, str]]:
+    synthetic = os.path.join(tmpdir, "synthetic.kicad_sch")
+    write_tiled_schematic(synthetic, SYNTHETIC_COPIES)
+    return [("hirvi", HIRVI), ("jolene", JOLENE), (f"hirvi x{SYNTHETIC_COPIES}", synthetic)]
+
+
+def _load_decoded(path: str) -> list:
+    text = Path(path).read_text()
+    return parse_sexp(text, skip_tags=_SKIPPED_TAGS, keep_tags=_SCHEMATIC_TAGS)
+
+
+def _load_mapped(path: str) -> list:
+    with map_file(path) as data:
+        return parse_sexp(data, skip_tags=_SKIPPED_TAGS, keep_tags=_SCHEMATIC_TAGS)
+
+
+def bench_load(paths) -> None:
+    print("load schematic tree: read_text + parse vs mmap + parse (time, peak traced memory)")
+    for name, path in paths:
+        assert _load_decoded(path) == _load_mapped(path)
+        repeat = 5 if os.path.getsize(path) < 1_000_000 else 2
+        decoded = best_of(_load_decoded, path, repeat=repeat)
+        mapped = best_of(_load_mapped, path, repeat=repeat)
+        _, decoded_peak = traced_memory(_load_decoded, path)
+        _, mapped_peak = traced_memory(_load_mapped, path)
+        print(
+            f"  {name:<14} read_text {decoded * 1e3:8.1f} ms peak {decoded_peak / 1e6:6.1f} MB  "
+            f"mmap {mapped * 1e3:8.1f} ms peak {mapped_peak / 1e6:6.1f} MB"
+        )
+
+
+def _lookups(root: SexpNode):
+    """The lookup-bound half of ``parse_schematic``: components and pin names."""
+    instances = _read_instances(root)
+    lib_unit_pins, lib_pin_names = _build_lib_pin_tables(_index_lib_symbols(root), instances)
+    multi_unit_refs = _find_multi_unit_refs(instances)
+    components, positions = _extract_components(instances, lib_unit_pins, multi_unit_refs)
+    return components, positions, _build_pin_name_map(instances, lib_unit_pins, lib_pin_names, multi_unit_refs)
+
+
+def _lookups_scanning(data: list):
+    return _lookups(SexpNode(data))
+
+
+def _lookups_indexed(data: list):
+    return _lookups(SexpNode(data, TagIndex()))
+
+
+def _property_rounds(root: SexpNode, rounds: int = 5) -> int:
+    """Repeat the per-symbol lookups the extraction passes make."""
+    symbols = list(root.children("symbol"))
+    found = 0
+    for _ in range(rounds):
+        for sym in symbols:
+            for name in ("Reference", "Value", "Footprint", "Datasheet"):
+                found += sym.find("property", name) is not None
+            found += sym.has("unit") + sym.has("lib_id") + sym.has("at")
+    return found
+
+
+def bench_tag_index(paths) -> None:
+    print("linear child scans vs lazy TagIndex: repeated symbol lookups, components + pin names")
+    for name, path in paths:
+        data = _load_mapped(path)
+        assert _lookups_scanning(data) == _lookups_indexed(data)
+        repeat = 5 if os.path.getsize(path) < 1_000_000 else 2
+        rounds_scanning = best_of(lambda: _property_rounds(SexpNode(data)), repeat=repeat)
+        rounds_indexed = best_of(lambda: _property_rounds(SexpNode(data, TagIndex())), repeat=repeat)
+        scanning = best_of(_lookups_scanning, data, repeat=repeat)
+        indexed = best_of(_lookups_indexed, data, repeat=repeat)
+        print(
+            f"  {name:<14} lookups {rounds_scanning * 1e3:7.1f} -> {rounds_indexed * 1e3:7.1f} ms  "
+            f"extraction {scanning * 1e3:7.1f} -> {indexed * 1e3:7.1f} ms"
+        )
+
+
+def _legacy_stages(root: SexpNode) -> tuple[list, tuple]:
+    lib_unit_pins = legacy_parser._build_lib_unit_pins(root)
+    components = legacy_parser._extract_components(root, lib_unit_pins)
+    pin_names = legacy_parser._build_pin_name_map(root, lib_unit_pins)
+    nets = legacy_parser._extract_nets(root, pin_names, lib_unit_pins)
+    return [
+        ("instances", lambda: None),
+        ("lib pins", lambda: legacy_parser._build_lib_unit_pins(root)),
+        ("multi-unit", lambda: None),  # repeated inside the three stages below
+        ("components", lambda: legacy_parser._extract_components(root, lib_unit_pins)),
+        ("pin names", lambda: legacy_parser._build_pin_name_map(root, lib_unit_pins)),
+        ("nets", lambda: legacy_parser._extract_nets(root, pin_names, lib_unit_pins)),
+    ], (components[0], pin_names, nets)  # positions are in different units
+
+
+def _stages(root: SexpNode) -> tuple[list, tuple]:
+    instances = _read_instances(root)
+    lib_unit_pins, lib_pin_names = _build_lib_pin_tables(_index_lib_symbols(root), instances)
+    multi_unit_refs = _find_multi_unit_refs(instances)
+    components = _extract_components(instances, lib_unit_pins, multi_unit_refs)
+    pin_names = _build_pin_name_map(instances, lib_unit_pins, lib_pin_names, multi_unit_refs)
+    nets = _extract_nets(_read_wiring(root), instances, pin_names, lib_unit_pins, multi_unit_refs)
+    return [
+        ("instances", lambda: _read_instances(root)),
+        ("lib pins", lambda: _build_lib_pin_tables(_index_lib_symbols(root), instances)),
+        ("multi-unit", lambda: _find_multi_unit_refs(instances)),
+        ("components", lambda: _extract_components(instances, lib_unit_pins, multi_unit_refs)),
+        ("pin names", lambda: _build_pin_name_map(instances, lib_unit_pins, lib_pin_names, multi_unit_refs)),
+        ("nets", lambda: _extract_nets(_read_wiring(root), instances, pin_names, lib_unit_pins, multi_unit_refs)),
+    ], (components[0], pin_names, nets)  # positions are in different units
+
+
+def bench_stages(paths) -> None:
+    print("extraction stages: re-walking symbols per stage -> one instance table (ms)")
+    for name, path in paths:
+        root = SexpNode(_load_mapped(path), TagIndex())
+        legacy, legacy_out = _legacy_stages(root)
+        current, current_out = _stages(root)
+        assert legacy_out == current_out
+        repeat = 5 if os.path.getsize(path) < 1_000_000 else 2
+        row = f"  {name:<14}"
+        totals = [0.0, 0.0]
+        for (stage, old), (_, new) in zip(legacy, current):
+            before = best_of(old, repeat=repeat)
+            after = best_of(new, repeat=repeat)
+            totals[0] += before
+            totals[1] += after
+            row += f" {stage} {before * 1e3:.1f}->{after * 1e3:.1f}"
+        print(f"{row}  total {totals[0] * 1e3:.1f}->{totals[1] * 1e3:.1f}")
+
+
+DISTINCT_COPIES = 20
+
+
+def bench_lib_tables() -> None:
+    print(
+        f"library lookups with many distinct parts (hirvi x{DISTINCT_COPIES}, one library symbol set per copy): "
+        "linear lib_symbols scans -> lib_id index + pin tables (ms)"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "distinct.kicad_sch")
+        write_tiled_schematic(path, DISTINCT_COPIES, distinct_parts=True)
+        root = SexpNode(_load_mapped(path), TagIndex())
+    instances = _read_instances(root)
+    multi_unit_refs = _find_multi_unit_refs(instances)
+
+    def legacy():
+        lib_unit_pins = legacy_parser._build_lib_unit_pins(root)
+        return legacy_parser._build_pin_name_map(root, lib_unit_pins)
+
+    def indexed():
+        lib_unit_pins, lib_pin_names = _build_lib_pin_tables(_index_lib_symbols(root), instances)
+        return _build_pin_name_map(instances, lib_unit_pins, lib_pin_names, multi_unit_refs)
+
+    assert legacy() == indexed()
+    lib_symbols = len(_index_lib_symbols(root))
+    print(
+        f"  {len(instances)} instances, {lib_symbols} library symbols: "
+        f"{best_of(legacy, repeat=3) * 1e3:.1f} -> {best_of(indexed, repeat=3) * 1e3:.1f}"
+    )
+
+
+MESH_WIRES = (500, 1000, 2000, 5000)
+
+
+def bench_wire_scaling() -> None:
+    print("net extraction vs wire count: label x wire scan -> wire grid (ms; nets found)")
+    for wires in MESH_WIRES:
+        root = SexpNode(parse_sexp(wire_mesh_schematic(wires), skip_tags=_SKIPPED_TAGS), TagIndex())
+        legacy_pins = legacy_parser._build_lib_unit_pins(root)
+        legacy_names = legacy_parser._build_pin_name_map(root, legacy_pins)
+        instances = _read_instances(root)
+        lib_unit_pins, lib_pin_names = _build_lib_pin_tables(_index_lib_symbols(root), instances)
+        multi_unit_refs = _find_multi_unit_refs(instances)
+        pin_names = _build_pin_name_map(instances, lib_unit_pins, lib_pin_names, multi_unit_refs)
+
+        def legacy():
+            return legacy_parser._extract_nets(root, legacy_names, legacy_pins)
+
+        def gridded():
+            return _extract_nets(_read_wiring(root), instances, pin_names, lib_unit_pins, multi_unit_refs)
+
+        before, after = best_of(legacy, repeat=1), best_of(gridded, repeat=3)
+        print(
+            f"  {wires:5d} wires  {before * 1e3:8.1f} ms ({len(legacy())} nets)"
+            f" -> {after * 1e3:7.1f} ms ({len(gridded())} nets)"
+        )
+
+
+def _wire_points(root: SexpNode) -> list[tuple[float, float]]:
+    return [tuple(xy.values[:2]) for wire in root.children("wire") for xy in wire.child("pts").children("xy")]
+
+
+def bench_point_keys(paths) -> None:
+    print("connection point keys: rounded float tuples -> packed integer units (time, peak memory of a point dict)")
+    for name, path in paths:
+        points = _wire_points(SexpNode(_load_mapped(path), TagIndex()))
+
+        def tuple_keys():
+            return {legacy_parser._coord_key(x, y): None for x, y in points}
+
+        def int_keys():
+            return {_coord_key(_to_iu(x), _to_iu(y)): None for x, y in points}
+
+        assert len(tuple_keys()) == len(int_keys())
+        row = f"  {name:<14} {len(points):6d} points"
+        for label, fn in (("tuples", tuple_keys), ("ints", int_keys)):
+            _, peak = traced_memory(fn)
+            row += f" {label} {best_of(fn, repeat=3) * 1e3:6.1f} ms {peak / 1e6:5.2f} MB"
+        print(row)
+
+
+UNION_FIND_POINTS = (10_000, 100_000, 300_000)
+
+
+def _union_find_workload(n: int) -> tuple[list[int], list[tuple[int, int]]]:
+    """Points and unions shaped like a netlist: mostly short runs of wire."""
+    rng = random.Random(n)
+    points = [_coord_key(rng.randrange(1 << 24), rng.randrange(1 << 24)) for _ in range(n)]
+    unions = [(points[i], points[i + 1]) for i in range(n - 1) if rng.random() < 0.8]
+    unions += [(rng.choice(points), rng.choice(points)) for _ in range(n // 50)]
+    return points, unions
+
+
+def _run_union_find(cls, points, unions) -> list[list]:
+    uf = cls()
+    register = uf.add if hasattr(uf, "add") else uf.find
+    for p in points:
+        register(p)
+    for a, b in unions:
+        uf.union(a, b)
+    groups = uf.groups()
+    return list(groups.values()) if isinstance(groups, dict) else groups
+
+
+def bench_union_find() -> None:
+    print("union-find: dict of coordinate keys -> dense ids in flat lists (register, union, group)")
+    for n in UNION_FIND_POINTS:
+        points, unions = _union_find_workload(n)
+        legacy = _run_union_find(legacy_parser._UnionFind, points, unions)
+        current = _run_union_find(_UnionFind, points, unions)
+        assert sorted(map(sorted, legacy)) == sorted(map(sorted, current))
+        row = f"  {n:7d} points {len(current):6d} sets"
+        for label, cls in (("dict", legacy_parser._UnionFind), ("ids", _UnionFind)):
+            elapsed = best_of(_run_union_find, cls, points, unions, repeat=3)
+            _, peak = traced_memory(_run_union_find, cls, points, unions)
+            row += f"  {label} {elapsed * 1e3:7.1f} ms {peak / 1e6:5.1f} MB"
+        print(row)
+
+
+def _pin_keys_trig(instances, lib_unit_pins) -> list[int]:
+    """Place every pin of every instance with its own trigonometry, as nets used to."""
+    keys = []
+    for inst in instances:
+        if inst.is_power:
+            continue
+        theta = math.radians(inst.rotation)
+        for lib_pin in _get_unit_pins(lib_unit_pins, inst.lib_id, inst.unit).values():
+            rx = round(lib_pin.x * math.cos(theta) - lib_pin.y * math.sin(theta))
+            ry = round(lib_pin.x * math.sin(theta) + lib_pin.y * math.cos(theta))
+            if inst.mirror == "x":
+                ry = -ry
+            elif inst.mirror == "y":
+                rx = -rx
+            keys.append(_coord_key(inst.x + rx, inst.y - ry))
+    return keys
+
+
+def _pin_keys_tables(instances, lib_unit_pins) -> list[int]:
+    keys = []
+    tables = {}
+    for inst in instances:
+        if inst.is_power:
+            continue
+        table_key = (inst.lib_id, inst.unit, inst.rotation, inst.mirror)
+        offsets = tables.get(table_key)
+        if offsets is None:
+            unit_pins = _get_unit_pins(lib_unit_pins, inst.lib_id, inst.unit)
+            offsets = tables[table_key] = _pin_offsets(unit_pins, inst.rotation, inst.mirror)
+        sx, sy = inst.x, inst.y
+        keys.extend(_coord_key(sx + dx, sy + dy) for _, dx, dy in offsets)
+    return keys
+
+
+def bench_pin_offsets(paths) -> None:
+    print("pin locations: trigonometry per pin -> offset tables per library unit and orientation (ms)")
+    for name, path in paths:
+        root = SexpNode(_load_mapped(path), TagIndex())
+        instances = _read_instances(root)
+        lib_unit_pins, _ = _build_lib_pin_tables(_index_lib_symbols(root), instances)
+        keys = _pin_keys_trig(instances, lib_unit_pins)
+        assert keys == _pin_keys_tables(instances, lib_unit_pins)
+        orientations = len({(i.lib_id, i.unit, i.rotation, i.mirror) for i in instances if not i.is_power})
+        before = best_of(_pin_keys_trig, instances, lib_unit_pins, repeat=5)
+        after = best_of(_pin_keys_tables, instances, lib_unit_pins, repeat=5)
+        print(
+            f"  {name:<14} {len(keys):6d} pins {orientations:4d} tables"
+            f"  {before * 1e3:7.1f} -> {after * 1e3:6.1f}"
+        )
+
+
+QUERIES = (("--ref U1A", "U1A", None), ("--ref 'Q*'", "Q*", None), ("--net M+", None, "M+"))
+
+
+def _netlist_full(path: str, pattern: str | None, net: str | None) -> str:
+    """``netlist --ref/--net`` as it used to run: every net, then filter."""
+    schematic = parse_schematic(path)
+    selected = {c.reference for c in schematic.components if pattern and fnmatch(c.reference, pattern)}
+    if net:
+        on_net = {c.component_ref for n in schematic.nets if n.name == net for c in n.connections}
+        selected = selected & on_net if pattern else on_net
+    return format_netlist(schematic, components_filter=selected)
+
+
+def _netlist_walked(path: str, pattern: str | None, net: str | None) -> str:
+    select_refs = (lambda refs: {r for r in refs if fnmatch(r, pattern)}) if pattern else None
+    schematic, selected = parse_schematic_subset(path, select_refs=select_refs, net=net)
+    return format_netlist(schematic, components_filter=selected)
+
+
+def bench_query(paths) -> None:
+    print("netlist queries, load to output: extract every net -> walk out from the selection (ms)")
+    for name, path in paths:
+        repeat = 5 if os.path.getsize(path) < 1_000_000 else 3
+        row = f"  {name:<14}"
+        for label, pattern, net in QUERIES:
+            assert _netlist_full(path, pattern, net) == _netlist_walked(path, pattern, net)
+            before = best_of(_netlist_full, path, pattern, net, repeat=repeat)
+            after = best_of(_netlist_walked, path, pattern, net, repeat=repeat)
+            row += f"  {label} {before * 1e3:.1f}->{after * 1e3:.1f}"
+        print(row)
+
+
+HIERARCHY_SHEETS = 50
+HIERARCHY_FILES = (50, 10)
+HIERARCHY_WORKERS = (1, 2, 4)
+
+
+def bench_hierarchy() -> None:
+    print(
+        f"hierarchical project of {HIERARCHY_SHEETS} sheets: load serially vs in a process pool "
+        f"({os.cpu_count()} CPUs here; ms)"
+    )
+    for files in HIERARCHY_FILES:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = write_hierarchical_project(tmpdir, HIERARCHY_SHEETS, files)
+            serial = parse_schematic(root, False, 1)
+            row = f"  {files:3d} distinct files ({len(serial.components)} components, {len(serial.nets)} nets)"
+            for workers in HIERARCHY_WORKERS:
+                assert parse_schematic(root, False, workers) == serial
+                row += f"  {workers} workers {best_of(parse_schematic, root, False, workers, repeat=3) * 1e3:7.1f}"
+            print(row)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = _paths(tmpdir)
+        bench_load(paths)
+        bench_tag_index(paths)
+        bench_stages(paths)
+        bench_point_keys(paths)
+        bench_pin_offsets(paths)
+        bench_query(paths)
+    bench_lib_tables()
+    bench_wire_scaling()
+    bench_union_find()
+    bench_hierarchy()
+
+
+if __name__ == "__main__":
+    main()
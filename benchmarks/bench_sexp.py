@@ -0,0 +1,394 @@
+"""Benchmarks for the S-expression layer.
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_sexp.py
+"""
+from __future__ import annotations
+
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import HIRVI, JOLENE, tiled_schematic
+
+from kicad_tool.columnar import ColumnarTree
+from kicad_tool.parser import _SCHEMATIC_TAGS, _SKIPPED_TAGS
+from kicad_tool.sexp import (
+    CLOSE, OPEN, QuotedStr, SexpNode, SourceSpans, _ESCAPED, _TOKEN_RE, _all_same_tag_leaves, _unescape, format_atom,
+    iter_sexp_events, parse_sexp, serialize_sexp, serialize_sexp_to,
+)
+
+SYNTHETIC_COPIES = 60
+
+
+def _tokenize(text: str) -> list[str]:
+    """Tokens as the regex that parse_sexp runs on finds them."""
+    return [
+        '"' + _unescape(m[_ESCAPED]) + '"' if m.lastindex == _ESCAPED else m[0]
+        for m in _TOKEN_RE.finditer(text)
+    ]
+
+
+def _legacy_tokenize(text: str) -> list[str]:
+    """The original character-at-a-time tokenizer, kept as the baseline."""
+    tokens = []
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c in " \t\n\r":
+            i += 1
+        elif c == "(":
+            tokens.append("(")
+            i += 1
+        elif c == ")":
+            tokens.append(")")
+            i += 1
+        elif c == '"':
+            j = i + 1
+            parts = []
+            while j < n and text[j] != '"':
+                if text[j] == "\\" and j + 1 < n:
+                    ch = text[j + 1]
+                    if ch == "n":
+                        parts.append("\n")
+                    elif ch == "t":
+                        parts.append("\t")
+                    else:
+                        parts.append(ch)
+                    j += 2
+                else:
+                    parts.append(text[j])
+                    j += 1
+            tokens.append('"' + "".join(parts) + '"')
+            i = j + 1
+        else:
+            j = i
+            while j < n and text[j] not in " \t\n\r()\"":
+                j += 1
+            tokens.append(text[i:j])
+            i = j
+    return tokens
+
+
+def _legacy_parse(text: str) -> list:
+    """The original two-pass parser: full token list, then recursive descent."""
+    return _legacy_parse_tokens(_legacy_tokenize(text), 0)[0]
+
+
+def _legacy_parse_tokens(tokens: list[str], pos: int) -> tuple[list, int]:
+    pos += 1
+    items: list = []
+    while pos < len(tokens) and tokens[pos] != ")":
+        if tokens[pos] == "(":
+            child, pos = _legacy_parse_tokens(tokens, pos)
+            items.append(child)
+        else:
+            items.append(_legacy_atom(tokens[pos]))
+            pos += 1
+    return items, pos + 1
+
+
+def _legacy_atom(token: str):
+    if token.startswith('"'):
+        return QuotedStr(token[1:-1])
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    return token
+
+
+def _legacy_children(data: list, tag: str):
+    """The original ``SexpNode.children``: stringify and compare every head."""
+    for item in data[1:]:
+        if isinstance(item, list) and item and str(item[0]) == tag:
+            yield SexpNode(item)
+
+
+def _legacy_serialize(data: list) -> str:
+    """The original recursive serializer that joins every level into one string."""
+    return _legacy_serialize_node(data, 0) + "\n"
+
+
+def _legacy_serialize_node(data: list, indent: int) -> str:
+    if not any(isinstance(item, list) for item in data[1:]):
+        return "\t" * indent + "(" + " ".join(format_atom(item) for item in data) + ")"
+    leading = [format_atom(item) for item in data if not isinstance(item, list)]
+    list_children = [item for item in data if isinstance(item, list)]
+    prefix = "\t" * indent
+    if len(list_children) > 1 and _all_same_tag_leaves(list_children):
+        child_prefix = "\t" * (indent + 1)
+        packed_lines = []
+        current = child_prefix
+        for child in list_children:
+            f = "(" + " ".join(format_atom(item) for item in child) + ")"
+            if current == child_prefix:
+                current += f
+            elif len(current) + 1 + len(f) <= 112:
+                current += " " + f
+            else:
+                packed_lines.append(current)
+                current = child_prefix + f
+        packed_lines.append(current)
+        return "\n".join([prefix + "(" + " ".join(leading), *packed_lines, prefix + ")"])
+    lines = [prefix + "(" + " ".join(leading)]
+    for child in list_children:
+        lines.append(_legacy_serialize_node(child, indent + 1))
+    lines.append(prefix + ")")
+    return "\n".join(lines)
+
+
+def best_of(fn, *args, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _inputs() -> list[tuple[str, str]]:
+    inputs = []
+    for name, path in (("hirvi", HIRVI), ("jolene", JOLENE)):
+        with open(path) as f:
+            inputs.append((name, f.read()))
+    inputs.append((f"hirvi x{SYNTHETIC_COPIES}", tiled_schematic(SYNTHETIC_COPIES)))
+    return inputs
+
+
+def bench_tokenize(inputs) -> None:
+    print("tokenize")
+    for name, text in inputs:
+        assert _tokenize(text) == _legacy_tokenize(text)
+        repeat = 5 if len(text) < 1_000_000 else 2
+        old = best_of(_legacy_tokenize, text, repeat=repeat)
+        new = best_of(_tokenize, text, repeat=repeat)
+        print(
+            f"  {name:<14} {len(text) / 1e6:7.2f} MB  "
+            f"legacy {old * 1e3:8.1f} ms  regex {new * 1e3:8.1f} ms  {old / new:5.1f}x"
+        )
+
+
+def traced_memory(fn, *args) -> tuple[int, int]:
+    """Return (bytes still held by the result, peak bytes) for one call."""
+    tracemalloc.start()
+    try:
+        result = fn(*args)  # noqa: F841 - keep the result alive while measuring
+        return tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+
+def bench_parse(inputs) -> None:
+    print("parse_sexp (time, peak traced memory; the final tree holds the first figure)")
+    for name, text in inputs:
+        assert parse_sexp(text) == _legacy_parse(text)
+        repeat = 5 if len(text) < 1_000_000 else 2
+        old = best_of(_legacy_parse, text, repeat=repeat)
+        new = best_of(parse_sexp, text, repeat=repeat)
+        tree_mem, old_peak = traced_memory(_legacy_parse, text)
+        _, new_peak = traced_memory(parse_sexp, text)
+        print(
+            f"  {name:<14} tree {tree_mem / 1e6:6.1f} MB  "
+            f"legacy {old * 1e3:8.1f} ms peak {old_peak / 1e6:6.1f} MB  "
+            f"fused {new * 1e3:8.1f} ms peak {new_peak / 1e6:6.1f} MB"
+        )
+
+
+def _count_symbols_tree(data: bytes) -> int:
+    root = parse_sexp(data.decode())
+    return sum(1 for item in root if isinstance(item, list) and item[0] == "symbol")
+
+
+def _count_symbols_events(data: bytes) -> int:
+    depth = 0
+    count = 0
+    for event, value in iter_sexp_events(io.BytesIO(data)):
+        if event == OPEN:
+            depth += 1
+            if depth == 2 and value == "symbol":
+                count += 1
+        elif event == CLOSE:
+            depth -= 1
+    return count
+
+
+def bench_events(inputs) -> None:
+    print("count top-level symbols: full tree vs streamed events (time, peak traced memory)")
+    for name, text in inputs:
+        data = text.encode()
+        assert _count_symbols_tree(data) == _count_symbols_events(data)
+        repeat = 3 if len(text) < 1_000_000 else 1
+        tree = best_of(_count_symbols_tree, data, repeat=repeat)
+        events = best_of(_count_symbols_events, data, repeat=repeat)
+        _, tree_peak = traced_memory(_count_symbols_tree, data)
+        _, events_peak = traced_memory(_count_symbols_events, data)
+        print(
+            f"  {name:<14} tree {tree * 1e3:8.1f} ms peak {tree_peak / 1e6:6.1f} MB  "
+            f"events {events * 1e3:8.1f} ms peak {events_peak / 1e6:6.2f} MB"
+        )
+
+
+def _parse_filtered(text: str) -> list:
+    return parse_sexp(text, skip_tags=_SKIPPED_TAGS, keep_tags=_SCHEMATIC_TAGS)
+
+
+def bench_filtered(inputs) -> None:
+    print("parse_sexp: full vs parse_schematic's skip/keep filter (time, tree memory)")
+    for name, text in inputs:
+        repeat = 5 if len(text) < 1_000_000 else 2
+        full = best_of(parse_sexp, text, repeat=repeat)
+        filtered = best_of(_parse_filtered, text, repeat=repeat)
+        full_mem, _ = traced_memory(parse_sexp, text)
+        filtered_mem, _ = traced_memory(_parse_filtered, text)
+        print(
+            f"  {name:<14} full {full * 1e3:8.1f} ms {full_mem / 1e6:6.1f} MB  "
+            f"filtered {filtered * 1e3:8.1f} ms {filtered_mem / 1e6:6.1f} MB"
+        )
+
+
+def _parse_with_spans(text: str, atoms: bool) -> tuple[list, SourceSpans]:
+    spans = SourceSpans(atoms=atoms)
+    return parse_sexp(text, spans=spans), spans
+
+
+def bench_spans(inputs) -> None:
+    print("parse_sexp with source spans (time, retained memory)")
+    for name, text in inputs:
+        repeat = 5 if len(text) < 1_000_000 else 2
+        row = f"  {name:<14}"
+        for label, args in (("off", ()), ("lists", (False,)), ("atoms", (True,))):
+            fn = parse_sexp if not args else _parse_with_spans
+            elapsed = best_of(fn, text, *args, repeat=repeat)
+            retained, _ = traced_memory(fn, text, *args)
+            row += f" {label} {elapsed * 1e3:7.1f} ms {retained / 1e6:6.1f} MB "
+        print(row)
+
+
+def bench_columnar(inputs) -> None:
+    print("nested lists vs columnar tree (parse time, retained memory)")
+    for name, text in inputs:
+        repeat = 5 if len(text) < 1_000_000 else 2
+        lists = best_of(parse_sexp, text, repeat=repeat)
+        columns = best_of(ColumnarTree.parse, text, repeat=repeat)
+        lists_mem, _ = traced_memory(parse_sexp, text)
+        columns_mem, _ = traced_memory(ColumnarTree.parse, text)
+        print(
+            f"  {name:<14} lists {lists * 1e3:8.1f} ms {lists_mem / 1e6:6.1f} MB  "
+            f"columnar {columns * 1e3:8.1f} ms {columns_mem / 1e6:6.1f} MB  "
+            f"{lists_mem / columns_mem:4.1f}x smaller"
+        )
+
+
+def _scan_legacy(root: list) -> int:
+    count = 0
+    for sym in _legacy_children(root, "symbol"):
+        for prop in _legacy_children(sym.raw, "property"):
+            count += 1
+        for _ in _legacy_children(sym.raw, "pin"):
+            count += 1
+    return count
+
+
+def _scan(root: list) -> int:
+    count = 0
+    for sym in SexpNode(root).children("symbol"):
+        for prop in sym.children("property"):
+            count += 1
+        for _ in sym.children("pin"):
+            count += 1
+    return count
+
+
+def _parse_interned(text: str) -> list:
+    return parse_sexp(text, intern_quoted=True)
+
+
+def bench_interning(inputs) -> None:
+    print("interned atoms: tree memory and children() scans over symbols, properties and pins")
+    for name, text in inputs:
+        repeat = 5 if len(text) < 1_000_000 else 2
+        legacy_mem, _ = traced_memory(_legacy_parse, text)
+        interned_mem, _ = traced_memory(parse_sexp, text)
+        quoted_mem, _ = traced_memory(_parse_interned, text)
+        legacy_root = _legacy_parse(text)
+        root = parse_sexp(text)
+        assert _scan_legacy(legacy_root) == _scan(root)
+        old = best_of(_scan_legacy, legacy_root, repeat=repeat)
+        new = best_of(_scan, root, repeat=repeat)
+        print(
+            f"  {name:<14} tree fresh {legacy_mem / 1e6:6.1f} MB  keywords {interned_mem / 1e6:6.1f} MB  "
+            f"+quoted {quoted_mem / 1e6:6.1f} MB  scan {old * 1e3:7.1f} -> {new * 1e3:7.1f} ms"
+        )
+
+
+def _parse_lexemes(text: str) -> list:
+    return parse_sexp(text, lexemes=True)
+
+
+def bench_lexemes(inputs) -> None:
+    print("numbers converted while parsing vs kept as lexemes (time, tree memory)")
+    for name, text in inputs:
+        assert serialize_sexp(_parse_lexemes(text)) == serialize_sexp(parse_sexp(text))
+        repeat = 5 if len(text) < 1_000_000 else 2
+        eager = best_of(parse_sexp, text, repeat=repeat)
+        lexemes = best_of(_parse_lexemes, text, repeat=repeat)
+        eager_mem, _ = traced_memory(parse_sexp, text)
+        lexemes_mem, _ = traced_memory(_parse_lexemes, text)
+        print(
+            f"  {name:<14} numbers {eager * 1e3:8.1f} ms {eager_mem / 1e6:6.1f} MB  "
+            f"lexemes {lexemes * 1e3:8.1f} ms {lexemes_mem / 1e6:6.1f} MB"
+        )
+
+
+def _write_legacy(path: str, data: list) -> None:
+    with open(path, "w") as f:
+        f.write(_legacy_serialize(data))
+
+
+def _write_streaming(path: str, data: list) -> None:
+    with open(path, "w") as f:
+        serialize_sexp_to(f, data)
+
+
+def bench_serialize(inputs) -> None:
+    print("write a parsed tree to a file: build one string vs serialize_sexp_to (time, peak traced memory)")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "out.kicad_sch")
+        for name, text in inputs:
+            data = parse_sexp(text, lexemes=True)
+            assert serialize_sexp(data) == _legacy_serialize(data)
+            repeat = 5 if len(text) < 1_000_000 else 2
+            old = best_of(_write_legacy, path, data, repeat=repeat)
+            new = best_of(_write_streaming, path, data, repeat=repeat)
+            _, old_peak = traced_memory(_write_legacy, path, data)
+            _, new_peak = traced_memory(_write_streaming, path, data)
+            print(
+                f"  {name:<14} string {old * 1e3:8.1f} ms peak {old_peak / 1e6:6.1f} MB  "
+                f"streaming {new * 1e3:8.1f} ms peak {new_peak / 1e6:6.2f} MB"
+            )
+
+
+def main() -> None:
+    inputs = _inputs()
+    bench_tokenize(inputs)
+    bench_parse(inputs)
+    bench_events(inputs)
+    bench_filtered(inputs)
+    bench_spans(inputs)
+    bench_columnar(inputs)
+    bench_interning(inputs)
+    bench_lexemes(inputs)
+    bench_serialize(inputs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Synthetic schematic generators for the benchmarks.
+
+Large designs are built by tiling a fixture sheet: every placed item is
+copied with its coordinates shifted and its reference renamed, so the result
+is a valid, fully connected schematic of arbitrary size.
+"""
+from __future__ import annotations
+
+import copy
+import os
+
+from kicad_tool.sexp import QuotedStr, parse_sexp, serialize_sexp
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "fixtures")
+HIRVI = os.path.join(FIXTURES, "hirvi.kicad_sch")
+JOLENE = os.path.join(FIXTURES, "jolene.kicad_sch")
+
+_TILED_TAGS = {
+    "symbol", "wire", "junction", "label", "global_label", "no_connect",
+    "text", "rectangle", "polyline",
+}
+_COORD_TAGS = {"at", "xy", "start", "end"}
+_TILE_PITCH = 500.0
+
+
+def tiled_schematic(copies: int, source: str = HIRVI, distinct_parts: bool = False) -> str:
+    """Return the text of ``source`` with its sheet contents repeated ``copies`` times.
+
+    With ``distinct_parts`` every copy gets its own copy of each library
+    symbol, as a design with that many different parts would have.
+    """
+    with open(source) as f:
+        root = parse_sexp(f.read())
+
+    header = [item for item in root if not isinstance(item, list) or item[0] not in _TILED_TAGS]
+    placed = [item for item in root[1:] if isinstance(item, list) and item[0] in _TILED_TAGS]
+    if distinct_parts:
+        lib_symbols = next(item for item in header if isinstance(item, list) and item[0] == "lib_symbols")
+        originals = lib_symbols[1:]
+        for n in range(1, copies):
+            for lib_sym in originals:
+                lib_sym = copy.deepcopy(lib_sym)
+                lib_sym[1] = QuotedStr(f"{lib_sym[1]}_{n}")
+                lib_symbols.append(lib_sym)
+
+    tiled = list(header)
+    for n in range(copies):
+        dx = (n % 10) * _TILE_PITCH
+        dy = (n // 10) * _TILE_PITCH
+        for item in placed:
+            item = copy.deepcopy(item)
+            _shift(item, dx, dy)
+            if n and item[0] == "symbol":
+                _rename(item, n)
+                if distinct_parts:
+                    _rename_lib_id(item, n)
+            tiled.append(item)
+    return serialize_sexp(tiled)
+
+
+def _shift(node: list, dx: float, dy: float) -> None:
+    if node[0] in _COORD_TAGS and len(node) >= 3:
+        node[1] = round(node[1] + dx, 4)
+        node[2] = round(node[2] + dy, 4)
+        return
+    for item in node[1:]:
+        if isinstance(item, list):
+            _shift(item, dx, dy)
+
+
+def _rename(sym: list, n: int) -> None:
+    for item in sym[1:]:
+        if isinstance(item, list) and item[0] == "property" and item[1] == "Reference":
+            if not item[2].startswith("#"):
+                item[2] = QuotedStr(f"{item[2]}_{n}")
+            return
+
+
+def _rename_lib_id(sym: list, n: int) -> None:
+    for item in sym[1:]:
+        if isinstance(item, list) and item[0] == "lib_id":
+            item[1] = QuotedStr(f"{item[1]}_{n}")
+            return
+
+
+def write_tiled_schematic(path: str, copies: int, source: str = HIRVI, distinct_parts: bool = False) -> int:
+    text = tiled_schematic(copies, source, distinct_parts)
+    with open(path, "w") as f:
+        f.write(text)
+    return len(text)
+
+
+_MESH_LIB = """\
+  (lib_symbols
+    (symbol "Device:R"
+      (symbol "R_1_1"
+        (pin passive line (at 0 3.81 270) (length 1.27) (name "~") (number "1"))
+        (pin passive line (at 0 -3.81 90) (length 1.27) (name "~") (number "2"))
+      )
+    )
+  )
+"""
+_MESH_PITCH = 50.8
+_MESH_PER_ROW = 20
+
+
+def wire_mesh_schematic(wires: int) -> str:
+    """Return a sheet of about ``wires`` wires: resistors hanging off labeled buses.
+
+    Each resistor's first pin is wired up to the middle of a bus segment
+    (a T-connection) and its second pin down to a label of its own.
+    """
+    lines = ["(kicad_sch", _MESH_LIB]
+    for n in range(max(1, wires // 3)):
+        row, col = divmod(n, _MESH_PER_ROW)
+        x = col * _MESH_PITCH
+        y = row * 30.48
+        rx = round(x + _MESH_PITCH / 2, 4)
+        lines += [
+            f'  (symbol (lib_id "Device:R") (at {rx} {y + 10.16} 0) (unit 1)'
+            f' (property "Reference" "R{n + 1}") (property "Value" "10k"))',
+            f"  (wire (pts (xy {x} {y}) (xy {round(x + _MESH_PITCH, 4)} {y})))",
+            f"  (wire (pts (xy {rx} {round(y + 6.35, 4)}) (xy {rx} {y})))",
+            f"  (wire (pts (xy {rx} {round(y + 13.97, 4)}) (xy {rx} {round(y + 20.32, 4)})))",
+            f'  (label "BUS{row}" (at {round(x + 5.08, 4)} {y} 0))',
+            f'  (label "OUT{n + 1}" (at {rx} {round(y + 20.32, 4)} 0))',
+        ]
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+_ROOT_UUID = "00000000-0000-4000-8000-000000000000"
+_SHEET_PITCH = 15.24
+
+
+def _uuid(n: int) -> str:
+    return f"00000000-0000-4000-8000-{n + 1:012d}"
+
+
+def write_hierarchical_project(directory: str, sheets: int, files: int | None = None, source: str = HIRVI) -> str:
+    """Write a root sheet that places ``sheets`` copies of ``source``; return its path.
+
+    The copies are spread over ``files`` distinct sheet files (one each by
+    default), and each placement gets references of its own through the
+    symbols' instances. Every sheet exports its first local label as the
+    hierarchical label LINK, and the root wires all the LINK sheet pins
+    together.
+    """
+    files = files or sheets
+    with open(source) as f:
+        template = parse_sexp(f.read())
+    label = next(item for item in template if isinstance(item, list) and item[0] == "label")
+    at = next(item for item in label if isinstance(item, list) and item[0] == "at")
+
+    placed: dict[int, list[int]] = {}
+    for k in range(sheets):
+        placed.setdefault(k % files, []).append(k)
+    for n, numbers in placed.items():
+        sheet = copy.deepcopy(template)
+        for item in sheet[1:]:
+            if isinstance(item, list) and item[0] == "uuid":
+                item[1] = QuotedStr(_uuid(sheets + n))
+            elif isinstance(item, list) and item[0] == "symbol":
+                _annotate_placements(item, numbers)
+        sheet.append(["hierarchical_label", QuotedStr("LINK"), ["shape", "bidirectional"], ["at", at[1], at[2], 0]])
+        with open(os.path.join(directory, f"sheet{n}.kicad_sch"), "w") as f:
+            f.write(serialize_sexp(sheet))
+
+    lines = ["(kicad_sch", f'  (uuid "{_ROOT_UUID}")', "  (lib_symbols)"]
+    for k in range(sheets):
+        y = round(20 + k * _SHEET_PITCH, 4)
+        pin_y = round(y + 5.08, 4)
+        lines += [
+            f'  (sheet (at 20 {y}) (size 30 10.16) (uuid "{_uuid(k)}")',
+            f'    (property "Sheetname" "S{k}") (property "Sheetfile" "sheet{k % files}.kicad_sch")',
+            f"    (pin \"LINK\" bidirectional (at 50 {pin_y} 0)))",
+        ]
+        if k + 1 < sheets:
+            lines.append(f"  (wire (pts (xy 50 {pin_y}) (xy 50 {round(pin_y + _SHEET_PITCH, 4)})))")
+    lines.append(")")
+    root = os.path.join(directory, "project.kicad_sch")
+    with open(root, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return root
+
+
+def _annotate_placements(sym: list, numbers: list[int]) -> None:
+    """Give a symbol one reference per placement of its sheet."""
+    prop = next(item for item in sym[1:] if isinstance(item, list) and item[0] == "property" and item[1] == "Reference")
+    unit = next(item[1] for item in sym[1:] if isinstance(item, list) and item[0] == "unit")
+    ref = str(prop[2])
+    names = [ref if ref.startswith("#") else f"{ref}_{k}" for k in numbers]
+    prop[2] = QuotedStr(names[0])
+    paths = [
+        ["path", QuotedStr(f"/{_ROOT_UUID}/{_uuid(k)}"), ["reference", QuotedStr(name)], ["unit", unit]]
+        for k, name in zip(numbers, names)
+    ]
+    sym[:] = [item for item in sym if not (isinstance(item, list) and item[0] == "instances")]
+    sym.append(["instances", ["project", QuotedStr("synthetic"), *paths]])
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import csv
+import json
+from collections import Counter
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable, Iterator
+
+_REF_COLUMNS = ("reference", "ref", "designator")
+_GLOB_CHARS = frozenset("*?[")
+
+
+def read_rows(file_path: str | Path, fmt: str | None = None) -> Iterator[tuple[str, dict[str, str]]]:
+    """Stream ``(ref pattern, {key: value})`` rows from a CSV or NDJSON file.
+
+    The format follows the file extension unless ``fmt`` is given. The
+    reference column is the first one named Reference, Ref or Designator
+    (in any case); every other non-empty cell is a property to set.
+    """
+    path = Path(file_path)
+    if fmt is None:
+        fmt = "ndjson" if path.suffix.lower() in (".ndjson", ".jsonl") else "csv"
+    if fmt == "csv":
+        yield from _read_csv(path)
+    elif fmt == "ndjson":
+        yield from _read_ndjson(path)
+    else:
+        raise ValueError(f"Unknown annotation format '{fmt}'")
+
+
+def _read_csv(path: Path) -> Iterator[tuple[str, dict[str, str]]]:
+    with path.open(newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        ref_col = _ref_column(header)
+        if ref_col is None:
+            raise ValueError(f"{path}: no Reference column")
+        columns = [(i, name) for i, name in enumerate(header) if i != ref_col and name]
+        for row in reader:
+            if len(row) <= ref_col or not row[ref_col].strip():
+                continue
+            yield row[ref_col], {name: row[i] for i, name in columns if i < len(row) and row[i]}
+
+
+def _read_ndjson(path: Path) -> Iterator[tuple[str, dict[str, str]]]:
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            if not isinstance(obj, dict):
+                raise ValueError(f"{path}:{line_no}: expected a JSON object")
+            names = list(obj)
+            ref_col = _ref_column(names)
+            if ref_col is None:
+                raise ValueError(f"{path}:{line_no}: no Reference key")
+            ref_key = names[ref_col]
+            properties = {
+                key: value if isinstance(value, str) else json.dumps(value)
+                for key, value in obj.items()
+                if key != ref_key and value is not None and value != ""
+            }
+            yield str(obj[ref_key]), properties
+
+
+def _ref_column(names: list[str]) -> int | None:
+    for i, name in enumerate(names):
+        if name.strip().lower() in _REF_COLUMNS:
+            return i
+    return None
+
+
+def resolve_edits(
+    rows: Iterable[tuple[str, dict[str, str]]],
+    references: Iterable[str],
+) -> tuple[dict[str, dict[str, str]], list[str]]:
+    """Expand row patterns against ``references`` into ``{reference: {key: value}}``.
+
+    A pattern is a comma-separated list of refs and globs, as for ``--ref``.
+    Each distinct pattern is resolved once; exact refs are looked up rather
+    than matched. Later rows override earlier ones key by key. Returns the
+    edits and the patterns that matched nothing, in input order.
+    """
+    refs = set(references)
+    ordered = sorted(refs)
+    resolved: dict[str, list[str]] = {}
+    edits: dict[str, dict[str, str]] = {}
+    unmatched: list[str] = []
+    for pattern_str, properties in rows:
+        for pattern in pattern_str.split(","):
+            pattern = pattern.strip()
+            if not pattern:
+                continue
+            targets = resolved.get(pattern)
+            if targets is None:
+                if _GLOB_CHARS.isdisjoint(pattern):
+                    targets = [pattern] if pattern in refs else []
+                else:
+                    targets = [ref for ref in ordered if fnmatch(ref, pattern)]
+                resolved[pattern] = targets
+                if not targets:
+                    unmatched.append(pattern)
+            if not properties:
+                continue
+            for ref in targets:
+                edits.setdefault(ref, {}).update(properties)
+    return edits, unmatched
+
+
+def format_changes(changes: dict[str, list[str]]) -> str:
+    """Summarize ``set_properties_batch`` changes as one line per property.
+
+    Only components with at least one change count as annotated.
+    """
+    total: Counter[str] = Counter()
+    added: Counter[str] = Counter()
+    for ref_changes in changes.values():
+        for change in ref_changes:
+            key, _, rest = change.partition(": ")
+            total[key] += 1
+            if rest.startswith("(new) "):
+                added[key] += 1
+    annotated = sum(1 for ref_changes in changes.values() if ref_changes)
+    lines = [f"Annotated {annotated} components"]
+    for key in sorted(total):
+        line = f"  {key}: {total[key]} set"
+        if added[key]:
+            line += f" ({added[key]} new)"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
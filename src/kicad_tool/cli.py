@@ -2,7 +2,7 @@ import argparse
 import sys
 from fnmatch import fnmatch
 
-from kicad_tool.parser import parse_schematic
+from kicad_tool.parser import parse_schematic, parse_schematic_subset
 from kicad_tool.formatter import format_bom, format_groups, format_netlist, format_summary
 
 
@@ -30,6 +30,7 @@ Examples:
   kicad-tool groups board.kicad_sch                component groups from labeled rectangles
   kicad-tool set board.kicad_sch --ref U1 --set Value=40106B   edit a property
   kicad-tool set board.kicad_sch --ref 'R*' --set MPN=RC0402   batch edit
+  kicad-tool annotate board.kicad_sch --from parts.csv   properties from a spreadsheet
 
 Ref patterns:
   U1         exact match
@@ -109,6 +110,29 @@ def main():
         dest="assignments",
         help="Property to set (e.g. Value=10k, MPN=SN74HC04N)",
     )
+    set_parser.add_argument(
+        "--queue", action="store_true",
+        help="Queue the edit so that concurrent set runs on the same schematic "
+        "are applied together in one write",
+    )
+
+    annotate_parser = subparsers.add_parser(
+        "annotate",
+        help="Set component properties from a CSV or NDJSON file",
+        description="Back-annotate properties from a file of rows: a Reference column "
+        "(refs or comma-separated globs) plus one column per property. Empty cells "
+        "are ignored and later rows override earlier ones. The schematic is "
+        "written once, and only if every row applies.",
+    )
+    annotate_parser.add_argument("schematic", help="Path to .kicad_sch file")
+    annotate_parser.add_argument(
+        "--from", required=True, metavar="FILE", dest="source",
+        help="CSV with a header row, or NDJSON with one object per line",
+    )
+    annotate_parser.add_argument(
+        "--format", choices=["csv", "ndjson"],
+        help="Input format (default: from the file extension, .ndjson/.jsonl or CSV)",
+    )
 
     args = parser.parse_args()
     if not args.command:
@@ -116,7 +140,8 @@ def main():
         sys.exit(1)
 
     if args.command == "set":
-        from kicad_tool.editor import set_properties
+        from kicad_tool.editor import list_references, set_properties_batch
+        from kicad_tool.locking import submit_edits
 
         assignments = {}
         for a in args.assignments:
@@ -129,22 +154,66 @@ def main():
                 sys.exit(1)
             assignments[key] = value
 
-        schematic = parse_schematic(args.schematic)
-        matched = match_refs((c.base_ref for c in schematic.components), args.ref)
+        # The refs of the file being edited, scanned rather than parsed.
+        matched = match_refs(list_references(args.schematic), args.ref)
         if not matched:
+            # A hierarchical root only holds its own symbols; say so rather
+            # than leave the sub-sheet components looking absent.
+            in_sheets = match_refs((c.reference for c in parse_schematic(args.schematic).components), args.ref)
+            if in_sheets:
+                shown = ", ".join(sorted(in_sheets)[:10]) + (", ..." if len(in_sheets) > 10 else "")
+                print(
+                    f"Warning: '{args.ref}' only matches components in sub-sheets ({shown}); "
+                    "set edits only the file it is given",
+                    file=sys.stderr,
+                )
             print(f"Error: no components found matching '{args.ref}'", file=sys.stderr)
             sys.exit(1)
 
         try:
-            for ref in sorted(matched):
-                changes = set_properties(args.schematic, ref, assignments)
-                for c in changes:
+            apply = submit_edits if args.queue else set_properties_batch
+            result = apply(args.schematic, {ref: assignments for ref in sorted(matched)})
+            for ref, ref_changes in result.changes.items():
+                for c in ref_changes:
                     print(f"{ref}: {c}")
+            if not result.written:
+                print("No changes")
         except ValueError as e:
             print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
         return
 
+    if args.command == "annotate":
+        from kicad_tool.annotate import format_changes, read_rows, resolve_edits
+        from kicad_tool.editor import list_references, set_properties_batch
+
+        try:
+            edits, unmatched = resolve_edits(
+                read_rows(args.source, args.format), list_references(args.schematic)
+            )
+            if unmatched:
+                shown = ", ".join(unmatched[:10]) + (", ..." if len(unmatched) > 10 else "")
+                print(f"Warning: {len(unmatched)} patterns matched no components: {shown}", file=sys.stderr)
+            if not edits:
+                print(f"Error: nothing to annotate from '{args.source}'", file=sys.stderr)
+                sys.exit(1)
+            result = set_properties_batch(args.schematic, edits)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(format_changes(result.changes), end="")
+        if not result.written:
+            print("No changes")
+        return
+
+    if args.command == "netlist" and not args.summary and (args.ref or args.net):
+        # Only the selected components' nets are needed: walk to them
+        # instead of extracting every net in the design.
+        select_refs = (lambda refs: match_refs(refs, args.ref)) if args.ref else None
+        schematic, selected = parse_schematic_subset(args.schematic, select_refs=select_refs, net=args.net)
+        print(format_netlist(schematic, components_filter=selected), end="")
+        return
+
     schematic = parse_schematic(args.schematic)
 
     if args.command == "groups":
@@ -165,25 +234,7 @@ def main():
         print(format_summary(schematic), end="")
         return
 
-    components_filter = None
-    if args.ref:
-        matched = match_refs(
-            (c.reference for c in schematic.components), args.ref
-        )
-        if args.net:
-            net_refs = set()
-            for net in schematic.nets:
-                if net.name == args.net:
-                    net_refs.update(c.component_ref for c in net.connections)
-            matched &= net_refs
-        components_filter = matched
-    elif args.net:
-        components_filter = set()
-        for net in schematic.nets:
-            if net.name == args.net:
-                components_filter.update(c.component_ref for c in net.connections)
-
-    print(format_netlist(schematic, components_filter=components_filter), end="")
+    print(format_netlist(schematic), end="")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,399 @@
+"""Array-backed S-expression trees.
+
+A :class:`ColumnarTree` stores a parsed file as flat columns (node kind, tag
+id, parent, first child, next sibling, atom string id) plus one shared
+string table, instead of nested Python lists of atom objects. Atoms are
+materialized only when read, so a tree costs a few bytes per node.
+
+:class:`ColumnarNode` and :class:`ColumnarList` present the same interface
+as :class:`~kicad_tool.sexp.SexpNode` and the nested lists returned by
+:func:`~kicad_tool.sexp.parse_sexp`, so code written against those runs on a
+columnar tree unchanged.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Iterable, Iterator
+
+from kicad_tool.sexp import (
+    _CLOSE, _ESCAPED, _OPEN, _QUOTED, _TAG_RE, _TAG_RE_B, _TOKEN_RE, _TOKEN_RE_B,
+    QuotedStr, SexpNode, _atom, _skip_list, _text, _unescape,
+)
+
+LIST = 0
+SYMBOL = 1
+QUOTED = 2
+INT = 3
+FLOAT = 4
+
+_NONE = -1
+
+
+class ColumnarTree:
+    __slots__ = (
+        "kinds", "tags", "parents", "first_child", "next_sibling", "atoms",
+        "strings", "_string_ids",
+    )
+
+    def __init__(self):
+        self.kinds = array("b")
+        self.tags = array("i")
+        self.parents = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.atoms = array("i")
+        self.strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+
+    @classmethod
+    def parse(
+        cls,
+        text: str | bytes,
+        skip_tags: Iterable[str] | None = None,
+        keep_tags: Iterable[str] | None = None,
+    ) -> ColumnarTree:
+        """Parse the first top-level list in ``text``, like :func:`parse_sexp`.
+
+        ``text`` may be a str or a UTF-8 bytes-like buffer such as an mmap.
+        """
+        tree = cls()
+        tree._build(text, frozenset(skip_tags or ()), keep_tags)
+        return tree
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def root(self) -> ColumnarNode:
+        return ColumnarNode(ColumnarList(self, 0))
+
+    def to_list(self, index: int = 0) -> list:
+        """Materialize the subtree at ``index`` as nested Python lists."""
+        result: list = []
+        stack = [(index, result)]
+        while stack:
+            node, out = stack.pop()
+            if self.tags[node] != _NONE:
+                out.append(self.strings[self.tags[node]])
+            child = self.first_child[node]
+            while child != _NONE:
+                if self.kinds[child] == LIST:
+                    sub: list = []
+                    out.append(sub)
+                    stack.append((child, sub))
+                else:
+                    out.append(self._value(child))
+                child = self.next_sibling[child]
+        return result
+
+    def tag_id(self, tag: str) -> int:
+        return self._string_ids.get(tag, _NONE)
+
+    def _value(self, node: int):
+        kind = self.kinds[node]
+        text = self.strings[self.atoms[node]]
+        if kind == SYMBOL:
+            return text
+        if kind == QUOTED:
+            return QuotedStr(text)
+        if kind == INT:
+            return int(text)
+        return float(text)
+
+    def _children(self, node: int) -> Iterator[int]:
+        child = self.first_child[node]
+        while child != _NONE:
+            yield child
+            child = self.next_sibling[child]
+
+    def _string(self, text: str) -> int:
+        sid = self._string_ids.get(text)
+        if sid is None:
+            sid = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return sid
+
+    def _new_node(self, kind: int, parent: int, tag: int = _NONE, atom: int = _NONE) -> int:
+        node = len(self.kinds)
+        self.kinds.append(kind)
+        self.tags.append(tag)
+        self.parents.append(parent)
+        self.first_child.append(_NONE)
+        self.next_sibling.append(_NONE)
+        self.atoms.append(atom)
+        return node
+
+    def _new_atom(self, value, parent: int) -> int:
+        kind, atom = self._atom_fields(value)
+        return self._new_node(kind, parent, atom=atom)
+
+    def _atom_fields(self, value) -> tuple[int, int]:
+        if isinstance(value, QuotedStr):
+            return QUOTED, self._string(value)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return SYMBOL, self._string(str(value))
+        if isinstance(value, int):
+            return INT, self._string(str(value))
+        return FLOAT, self._string(repr(value))
+
+    def _encode(self, value, parent: int) -> int:
+        """Append ``value`` (an atom or nested list) as new, unlinked nodes."""
+        if not isinstance(value, list):
+            return self._new_atom(value, parent)
+        if isinstance(value, ColumnarList) and value._tree is self:
+            value = value._tree.to_list(value._index)
+        top = self._new_node(LIST, parent)
+        stack = [(top, value)]
+        while stack:
+            node, items = stack.pop()
+            last = _NONE
+            for pos, item in enumerate(items):
+                if pos == 0 and _is_tag(item):
+                    self.tags[node] = self._string(item)
+                    continue
+                if isinstance(item, list):
+                    child = self._new_node(LIST, node)
+                    stack.append((child, item))
+                else:
+                    child = self._new_atom(item, node)
+                if last == _NONE:
+                    self.first_child[node] = child
+                else:
+                    self.next_sibling[last] = child
+                last = child
+        return top
+
+    def _build(self, text: str | bytes, skip: frozenset, keep_tags: Iterable[str] | None) -> None:
+        keep = frozenset(keep_tags) if keep_tags is not None else None
+        filtered = bool(skip) or keep is not None
+        string = self._string
+        new_node = self._new_node
+        token_re, tag_re = (_TOKEN_RE, _TAG_RE) if isinstance(text, str) else (_TOKEN_RE_B, _TAG_RE_B)
+
+        # last[i] is the most recent child appended to open list i; tag_next
+        # marks that the next token is the first item of the current list.
+        last: dict[int, int] = {}
+        current = _NONE
+        depth = 0
+        tag_next = False
+        pos: int | None = 0
+        while pos is not None:
+            start, pos = pos, None
+            for m in token_re.finditer(text, start):
+                kind = m.lastindex
+                if kind == _OPEN:
+                    if filtered and current != _NONE:
+                        tag_match = tag_re.match(text, m.end())
+                        tag = _text(tag_match[1]) if tag_match else None
+                        if tag in skip or (keep is not None and depth == 1 and tag not in keep):
+                            pos = _skip_list(text, m.end())
+                            tag_next = False
+                            break
+                    node = new_node(LIST, current)
+                    self._link(current, node, last)
+                    current = node
+                    depth += 1
+                    tag_next = True
+                    continue
+                if kind == _CLOSE:
+                    if current == _NONE:
+                        continue
+                    last.pop(current, None)
+                    current = self.parents[current]
+                    depth -= 1
+                    tag_next = False
+                    if current == _NONE:
+                        break
+                    continue
+                if current == _NONE:
+                    continue
+                if kind == _QUOTED:
+                    node = new_node(QUOTED, current, atom=string(_text(m[kind])))
+                elif kind == _ESCAPED:
+                    node = new_node(QUOTED, current, atom=string(_unescape(_text(m[kind]))))
+                else:
+                    tok = _text(m[kind])
+                    value = _atom(tok)
+                    if type(value) is str:
+                        if tag_next:
+                            self.tags[current] = string(value)
+                            tag_next = False
+                            continue
+                        node = new_node(SYMBOL, current, atom=string(value))
+                    else:
+                        node = new_node(INT if type(value) is int else FLOAT, current, atom=string(tok))
+                tag_next = False
+                self._link(current, node, last)
+        # Only tag lookups need the string dict after parsing; strings added
+        # by later edits are simply appended to the table.
+        self._string_ids = {self.strings[t]: t for t in set(self.tags) if t != _NONE}
+
+    def _link(self, parent: int, node: int, last: dict[int, int]) -> None:
+        if parent == _NONE:
+            return
+        prev = last.get(parent, _NONE)
+        if prev == _NONE:
+            self.first_child[parent] = node
+        else:
+            self.next_sibling[prev] = node
+        last[parent] = node
+
+
+def _is_tag(item) -> bool:
+    return type(item) is str
+
+
+class ColumnarList(list):
+    """Read/write view of one list node, usable wherever a parsed list is.
+
+    It subclasses ``list`` only so that ``isinstance(x, list)`` checks in
+    the serializer and editor accept it; the builtin list storage is never
+    used, and every access goes through the tree's columns.
+    """
+
+    __slots__ = ("_tree", "_index")
+
+    def __init__(self, tree: ColumnarTree, index: int):
+        self._tree = tree
+        self._index = index
+
+    def _nodes(self) -> list[int]:
+        return list(self._tree._children(self._index))
+
+    def _has_tag(self) -> bool:
+        return self._tree.tags[self._index] != _NONE
+
+    def _item(self, node: int):
+        tree = self._tree
+        if tree.kinds[node] == LIST:
+            return ColumnarList(tree, node)
+        return tree._value(node)
+
+    def __iter__(self):
+        tree = self._tree
+        if self._has_tag():
+            yield tree.strings[tree.tags[self._index]]
+        for node in tree._children(self._index):
+            yield self._item(node)
+
+    def __len__(self) -> int:
+        return self._has_tag() + sum(1 for _ in self._tree._children(self._index))
+
+    def __bool__(self) -> bool:
+        return self._has_tag() or self._tree.first_child[self._index] != _NONE
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+        if i < 0:
+            i += len(self)
+        if i < 0:
+            raise IndexError("list index out of range")
+        if self._has_tag():
+            if i == 0:
+                return self._tree.strings[self._tree.tags[self._index]]
+            i -= 1
+        for node in self._tree._children(self._index):
+            if not i:
+                return self._item(node)
+            i -= 1
+        raise IndexError("list index out of range")
+
+    def __setitem__(self, i, value) -> None:
+        if isinstance(i, slice):
+            raise TypeError("slice assignment is not supported on columnar lists")
+        tree = self._tree
+        if i < 0:
+            i += len(self)
+        if self._has_tag():
+            if i == 0:
+                if not _is_tag(value):
+                    raise TypeError("the tag of a columnar list must be a plain string")
+                tree.tags[self._index] = tree._string(value)
+                return
+            i -= 1
+        nodes = self._nodes()
+        if not 0 <= i < len(nodes):
+            raise IndexError("list assignment index out of range")
+        old = nodes[i]
+        if not isinstance(value, list):
+            tree.kinds[old], tree.atoms[old] = tree._atom_fields(value)
+            tree.first_child[old] = _NONE
+            tree.tags[old] = _NONE
+            return
+        node = tree._encode(value, self._index)
+        tree.next_sibling[node] = tree.next_sibling[old]
+        if i == 0:
+            tree.first_child[self._index] = node
+        else:
+            tree.next_sibling[nodes[i - 1]] = node
+
+    def insert(self, i: int, value) -> None:
+        tree = self._tree
+        if i < 0:
+            i = max(0, i + len(self))
+        if self._has_tag():
+            i = max(0, i - 1)
+        nodes = self._nodes()
+        i = min(i, len(nodes))
+        node = tree._encode(value, self._index)
+        if i == 0:
+            tree.next_sibling[node] = tree.first_child[self._index]
+            tree.first_child[self._index] = node
+        else:
+            tree.next_sibling[node] = tree.next_sibling[nodes[i - 1]]
+            tree.next_sibling[nodes[i - 1]] = node
+
+    def append(self, value) -> None:
+        self.insert(len(self), value)
+
+    def __contains__(self, value) -> bool:
+        return any(item == value for item in self)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def _unsupported(self, *args, **kwargs):
+        raise TypeError("operation not supported on columnar lists")
+
+    extend = pop = remove = clear = sort = reverse = _unsupported
+    __delitem__ = __iadd__ = __imul__ = _unsupported
+
+
+class ColumnarNode(SexpNode):
+    """:class:`SexpNode` over a columnar list, with tag matching on ids."""
+
+    __slots__ = ()
+
+    def __init__(self, data: ColumnarList):
+        self._data = data
+        self._index = None
+
+    @property
+    def tag(self) -> str:
+        data = self._data
+        tag = data._tree.tags[data._index]
+        return data._tree.strings[tag] if tag != _NONE else str(data[0])
+
+    def child(self, tag: str) -> ColumnarNode | None:
+        return next(self.children(tag), None)
+
+    def children(self, tag: str):
+        tree = self._data._tree
+        tag_id = tree.tag_id(tag)
+        if tag_id == _NONE:
+            return
+        kinds = tree.kinds
+        tags = tree.tags
+        for node in tree._children(self._data._index):
+            if tags[node] == tag_id and kinds[node] == LIST:
+                yield ColumnarNode(ColumnarList(tree, node))
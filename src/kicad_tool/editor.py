@@ -1,8 +1,24 @@
 from __future__ import annotations
 
+import os
+import shutil
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
+from typing import IO, Callable
 
-from kicad_tool.sexp import QuotedStr, SexpNode, parse_sexp, serialize_sexp
+from kicad_tool.locking import schematic_lock
+from kicad_tool.sexp import (
+    QuotedStr, SexpNode, SourceSpans, TagIndex, format_atom, map_file, parse_sexp, scan_symbol_properties,
+    splice_sexp_to,
+)
+
+
+@dataclass
+class EditResult:
+    changes: dict[str, list[str]]
+    written: bool = False
+    bytes_written: int = 0
 
 
 def set_properties(
@@ -10,51 +26,198 @@ def set_properties(
     reference: str,
     properties: dict[str, str],
 ) -> list[str]:
-    if "Reference" in properties:
-        raise ValueError("Cannot edit the Reference property")
+    return set_properties_batch(file_path, {reference: properties}).changes[reference]
+
+
+def set_properties_batch(
+    file_path: str | Path,
+    edits: dict[str, dict[str, str]],
+) -> EditResult:
+    """Apply ``{reference: {key: value}}`` edits with one read and one write.
+
+    Returns the change descriptions per reference; values that already
+    match are not reported, and when nothing changes the file is not
+    written at all. Either every edit is applied or, when a reference is
+    missing, none is and ValueError is raised.
+
+    The edit holds the schematic's lock (see ``kicad_tool.locking``), so
+    concurrent editors of the same file don't lose each other's updates.
+    """
+    with schematic_lock(file_path):
+        return _apply_edits(file_path, edits)
+
+
+def _apply_edits(file_path: str | Path, edits: dict[str, dict[str, str]]) -> EditResult:
+    for properties in edits.values():
+        if "Reference" in properties:
+            raise ValueError("Cannot edit the Reference property")
 
     path = Path(file_path)
-    text = path.read_text()
-    root_data = parse_sexp(text)
-    root = SexpNode(root_data)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with map_file(path) as data:
+        # Values of existing properties are rewritten where they are; only
+        # inserting a property needs the parsed tree.
+        patched = _patch_properties(data, edits)
+        if patched is not None:
+            changes, patches = patched
+            write = partial(_write_patched, data=data, patches=patches)
+            unchanged = not patches
+        else:
+            changes, write, unchanged = _edit_tree(data, edits)
+        if unchanged:
+            return EditResult(changes)
+
+        # Write next to the original and swap it in, so a crash or a
+        # concurrent reader never sees a truncated schematic.
+        try:
+            with tmp_path.open("wb") as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            shutil.copymode(path, tmp_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+    return EditResult(changes, written=True, bytes_written=size)
+
 
-    matched = _find_symbols(root, reference)
-    if not matched:
-        raise ValueError(f"Reference '{reference}' not found")
+def _fsync_dir(path: Path) -> None:
+    """Make a rename in ``path`` durable, where the platform allows it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
 
-    changes = []
-    first = True
-    for sym in matched:
-        for key, value in properties.items():
-            _set_or_add_property(sym, key, value, changes if first else None)
-        first = False
 
-    path.write_text(serialize_sexp(root_data))
-    return changes
+def list_references(file_path: str | Path) -> list[str]:
+    """Return the distinct component references in the file, without parsing it.
 
+    Power symbols and other ``#``-prefixed references are left out.
+    """
+    with map_file(file_path) as data:
+        refs = {
+            props["Reference"][2]
+            for props in scan_symbol_properties(data)
+            if "Reference" in props
+        }
+    return sorted(ref for ref in refs if ref and not ref.startswith("#"))
 
-def _find_symbols(root: SexpNode, reference: str) -> list[SexpNode]:
-    result = []
+
+def _edit_tree(
+    data: bytes, edits: dict[str, dict[str, str]]
+) -> tuple[dict[str, list[str]], Callable[[IO[bytes]], None], bool]:
+    spans = SourceSpans()
+    # Only symbols are edited; everything else is copied from the file.
+    root_data = parse_sexp(data, keep_tags={"symbol"}, spans=spans, lexemes=True)
+    root = SexpNode(root_data, TagIndex())
+
+    by_ref = _index_symbols(root)
+    for reference in edits:
+        if reference not in by_ref:
+            raise ValueError(f"Reference '{reference}' not found")
+
+    changes: dict[str, list[str]] = {}
+    dirty = []
+    for reference, properties in edits.items():
+        changes[reference] = ref_changes = []
+        first = True
+        for sym in by_ref[reference]:
+            for key, value in properties.items():
+                modified = _set_or_add_property(sym, key, value, ref_changes if first else None)
+                if modified is not None:
+                    dirty.append(modified)
+            first = False
+    return changes, partial(splice_sexp_to, spans=spans, dirty=dirty), not dirty
+
+
+def _patch_properties(
+    data: bytes, edits: dict[str, dict[str, str]]
+) -> tuple[dict[str, list[str]], list[tuple[int, int, bytes]]] | None:
+    """Find the byte ranges to rewrite for ``set_properties_batch``, without parsing.
+
+    Returns the change descriptions per reference and ``(start, end,
+    replacement)`` patches, or None when a symbol lacks one of the
+    properties (or a reference is not found) and the caller must edit the
+    tree instead.
+    """
+    changes: dict[str, list[str]] = {}
+    patches: list[tuple[int, int, bytes]] = []
+    for props in scan_symbol_properties(data):
+        ref = props.get("Reference")
+        if ref is None or ref[2] not in edits:
+            continue
+        reference = ref[2]
+        first = reference not in changes
+        ref_changes = changes.setdefault(reference, [])
+        for key, value in edits[reference].items():
+            prop = props.get(key)
+            if prop is None or prop[0] < 0:
+                return None
+            start, end, old_value = prop
+            if old_value == value:
+                continue
+            patches.append((start, end, format_atom(QuotedStr(value)).encode()))
+            if first:
+                ref_changes.append(f"{key}: {old_value} -> {value}")
+    if len(changes) < len(edits):
+        return None
+    patches.sort()
+    return {reference: changes[reference] for reference in edits}, patches
+
+
+def _write_patched(fp: IO[bytes], data: bytes, patches: list[tuple[int, int, bytes]]) -> None:
+    with memoryview(data) as view:
+        pos = 0
+        for start, end, replacement in patches:
+            fp.write(view[pos:start])
+            fp.write(replacement)
+            pos = end
+        fp.write(view[pos:])
+
+
+def _index_symbols(root: SexpNode) -> dict[str, list[SexpNode]]:
+    """Map each reference to its symbol instances, one per unit."""
+    result: dict[str, list[SexpNode]] = {}
     for sym in root.children("symbol"):
-        for prop in sym.children("property"):
-            if prop.value == "Reference":
-                ref_val = str(prop.raw[2]) if len(prop.raw) > 2 else ""
-                if ref_val == reference:
-                    result.append(sym)
-                break
+        prop = sym.find("property", "Reference")
+        if prop is not None:
+            ref_val = str(prop.raw[2]) if len(prop.raw) > 2 else ""
+            result.setdefault(ref_val, []).append(sym)
     return result
 
 
 def _set_or_add_property(
     sym: SexpNode, key: str, value: str, changes: list[str] | None
-) -> None:
-    for prop in sym.children("property"):
-        if prop.value == key:
-            old_value = str(prop.raw[2]) if len(prop.raw) > 2 else ""
-            prop.raw[2] = QuotedStr(value)
-            if changes is not None:
-                changes.append(f"{key}: {old_value} -> {value}")
-            return
+) -> list | None:
+    """Set property ``key`` of ``sym`` and return the list that was modified.
+
+    Returns None, and records no change, when the value already matches.
+    """
+    prop = sym.find("property", key)
+    if prop is not None:
+        raw = prop.raw
+        has_value = len(raw) > 2 and not isinstance(raw[2], list)
+        old_value = str(raw[2]) if has_value else ""
+        if has_value and old_value == value:
+            return None
+        if has_value:
+            raw[2] = QuotedStr(value)
+        else:
+            # (property "MPN") or (property "MPN" (at ...)): add the value atom.
+            raw.insert(2, QuotedStr(value))
+            prop.invalidate()
+        if changes is not None:
+            changes.append(f"{key}: {old_value} -> {value}")
+        return prop.raw
 
     # Property doesn't exist — insert after last existing property
     new_prop = [
@@ -71,8 +234,10 @@ def _set_or_add_property(
     ]
     insert_idx = _find_last_property_index(sym.raw)
     sym.raw.insert(insert_idx + 1, new_prop)
+    sym.invalidate()
     if changes is not None:
         changes.append(f"{key}: (new) {value}")
+    return sym.raw
 
 
 def _find_last_property_index(raw: list) -> int:
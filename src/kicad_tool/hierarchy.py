@@ -0,0 +1,91 @@
+"""Load hierarchical schematics: a root sheet and every sheet below it.
+
+Each distinct sheet file is parsed once, in a pool of worker processes,
+into its components and the nets local to that file. Sheet files that are
+placed several times are then instantiated once per placement, with the
+references KiCad assigned to that sheet path, and the local nets of all
+placements are stitched together: hierarchical labels to the pins of the
+sheet block that placed them, and global labels and power symbols by name
+across the whole project. Reading and stitching the sheets is the
+parser's; this module finds the files and walks their placements.
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+
+from kicad_tool.models import Schematic
+from kicad_tool.parser import SheetRef, _Sheet, _SheetPlacement, assemble_sheets, load_sheet, read_sheet
+from kicad_tool.sexp import SexpNode
+
+
+def parse_hierarchy(path: str | Path, workers: int | None = None, root: SexpNode | None = None) -> Schematic:
+    """Extract components, nets and groups from a root sheet and all its sub-sheets.
+
+    Sub-sheet files are parsed by up to ``workers`` processes (by default
+    one per CPU; ``workers=1`` parses them in this process). A ``root``
+    already parsed from ``path`` is read rather than parsed again; it must
+    keep what :func:`kicad_tool.parser.read_sheet` needs.
+    """
+    root_path = Path(path).resolve()
+    sheets = _load_sheets(root_path, workers, root)
+    return assemble_sheets(_place_sheets(root_path, sheets))
+
+
+def _load_sheets(root_path: Path, workers: int | None, root: SexpNode | None) -> dict[Path, _Sheet]:
+    """Parse the root and every sheet file below it, each file once."""
+    root_sheet = load_sheet(str(root_path)) if root is None else read_sheet(root, str(root_path))
+    sheets = {root_path: root_sheet}
+    frontier = [root_path]
+    max_workers = workers or os.cpu_count() or 1
+    pool: Executor | None = None
+    try:
+        while True:
+            pending: list[Path] = []
+            for parent in frontier:
+                for ref in sheets[parent].sheets:
+                    child = _sheet_file(parent, root_path, ref)
+                    if child not in sheets and child not in pending:
+                        pending.append(child)
+            if not pending:
+                break
+            if pool is None and max_workers > 1 and len(pending) > 1:
+                pool = ProcessPoolExecutor(max_workers)
+            load = pool.map if pool is not None else map
+            loaded = load(load_sheet, map(str, pending))
+            sheets.update(zip(pending, loaded))
+            frontier = pending
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return sheets
+
+
+def _sheet_file(parent: Path, root_path: Path, ref: SheetRef) -> Path:
+    """Resolve a sheet's file next to the sheet that places it, or else the root."""
+    candidate = (parent.parent / ref.file).resolve()
+    if not candidate.exists():
+        fallback = (root_path.parent / ref.file).resolve()
+        if fallback.exists():
+            return fallback
+    return candidate
+
+
+def _place_sheets(root_path: Path, sheets: dict[Path, _Sheet]) -> list[_SheetPlacement]:
+    """Walk the hierarchy depth first and instantiate every sheet placement."""
+    placements: list[_SheetPlacement] = []
+
+    def place(file: Path, path: str, prefix: str, parent: int | None, block: int | None, ancestors: tuple) -> None:
+        if file in ancestors:
+            raise ValueError(f"{file}: sheet places itself")
+        sheet = sheets[file]
+        index = len(placements)
+        placements.append(_SheetPlacement(path, prefix, sheet, parent, block))
+        for i, ref in enumerate(sheet.sheets):
+            child = _sheet_file(file, root_path, ref)
+            place(child, f"{path}/{ref.uuid}", f"{prefix}{ref.name}/", index, i, ancestors + (file,))
+
+    root = sheets[root_path]
+    place(root_path, f"/{root.uuid}", "/", None, None, ())
+    return placements
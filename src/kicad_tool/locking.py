@@ -0,0 +1,219 @@
+"""Coordinate concurrent edits of one schematic.
+
+Every edit holds an advisory lock on a sidecar ``<schematic>.lock`` file
+while it reads, changes and replaces the schematic, so concurrent editors
+never lose each other's updates. Editors may instead queue their edits in
+a ``<schematic>.queue`` spool directory: whichever process gets the lock
+applies everything pending in one read and one write, and leaves each
+queued edit's outcome next to it for its submitter.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Collection, Iterator
+
+try:
+    import fcntl
+except ImportError:  # not POSIX
+    fcntl = None
+
+if TYPE_CHECKING:
+    from kicad_tool.editor import EditResult
+
+_POLL_INTERVAL = 0.01
+# Without flock, a lock file this old is taken to be left behind by a
+# process that died while holding it.
+_STALE_LOCK_AGE = 60.0
+
+
+@contextmanager
+def schematic_lock(file_path: str | Path) -> Iterator[None]:
+    """Hold the exclusive edit lock of a schematic."""
+    path = Path(file_path)
+    lock_path = path.with_name(path.name + ".lock")
+    if fcntl is not None:
+        with lock_path.open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return
+
+    # Without flock, the lock file's existence is the lock.
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                age = time.time() - lock_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age > _STALE_LOCK_AGE:
+                _break_stale_lock(lock_path)
+                continue
+            time.sleep(_POLL_INTERVAL)
+    held = os.fstat(fd)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        # Only remove the lock file if it is still ours and not a newer one.
+        try:
+            current = lock_path.stat()
+        except FileNotFoundError:
+            pass
+        else:
+            if (current.st_dev, current.st_ino) == (held.st_dev, held.st_ino):
+                lock_path.unlink(missing_ok=True)
+
+
+def _break_stale_lock(lock_path: Path) -> None:
+    """Remove a stale fallback lock file, but never a fresh one.
+
+    Another process may have broken the stale lock and taken a new one
+    since its age was checked, so the lock file is first renamed to a name
+    of our own, which only one process can do, and its age is checked
+    again there. A fresh lock taken by mistake is linked back in place.
+    """
+    claimed = lock_path.with_name(f"{lock_path.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}.stale")
+    try:
+        os.rename(lock_path, claimed)
+    except FileNotFoundError:  # broken by someone else first
+        return
+    try:
+        if time.time() - claimed.stat().st_mtime <= _STALE_LOCK_AGE:
+            try:
+                os.link(claimed, lock_path)
+            except FileExistsError:  # already replaced; its holder keeps it
+                pass
+    finally:
+        claimed.unlink()
+
+
+def queue_dir(file_path: str | Path) -> Path:
+    path = Path(file_path)
+    return path.with_name(path.name + ".queue")
+
+
+def enqueue_edits(file_path: str | Path, edits: dict[str, dict[str, str]]) -> Path:
+    """Spool ``{reference: {key: value}}`` edits and return the queue entry.
+
+    Entries are named so that they sort in submission order, and appear
+    complete or not at all.
+    """
+    spool = queue_dir(file_path)
+    spool.mkdir(exist_ok=True)
+    name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    tmp_path = spool / (name + ".tmp")
+    tmp_path.write_text(json.dumps(edits))
+    entry = spool / (name + ".edits")
+    os.replace(tmp_path, entry)
+    return entry
+
+
+def drain_queue(file_path: str | Path) -> int:
+    """Apply every queued edit in one write; the caller holds the lock.
+
+    Each entry is replaced by a ``.result`` file with its changes or its
+    error. When the merged edit is rejected, the entries are retried one
+    by one so that a bad entry doesn't fail the others. Any other error
+    fails every entry, and is raised once they all have their outcome.
+    A property set by several entries is reported changed only to the last
+    of them, whose value is the one written. Returns the number of entries
+    drained.
+    """
+    from kicad_tool.editor import _apply_edits
+
+    spool = queue_dir(file_path)
+    entries = sorted(spool.glob("*.edits")) if spool.is_dir() else []
+    if not entries:
+        return 0
+    queued = [(entry, json.loads(entry.read_text())) for entry in entries]
+
+    merged: dict[str, dict[str, str]] = {}
+    # The last entry to set a property is the one whose value is written.
+    setters: dict[tuple[str, str], Path] = {}
+    for entry, edits in queued:
+        for ref, properties in edits.items():
+            merged.setdefault(ref, {}).update(properties)
+            for key in properties:
+                setters[ref, key] = entry
+    try:
+        try:
+            result = _apply_edits(file_path, merged)
+        except ValueError:
+            for entry, edits in queued:
+                try:
+                    outcome = _entry_outcome(_apply_edits(file_path, edits), edits)
+                except ValueError as e:
+                    outcome = _error_outcome(e)
+                _finish_entry(entry, outcome)
+        else:
+            for entry, edits in queued:
+                written = {
+                    ref: {key for key in properties if setters[ref, key] == entry}
+                    for ref, properties in edits.items()
+                }
+                _finish_entry(entry, _entry_outcome(result, written))
+    except Exception as e:
+        # Finished entries are gone from the spool; fail the rest.
+        for entry, _ in queued:
+            if entry.exists():
+                _finish_entry(entry, _error_outcome(e))
+        raise
+    return len(entries)
+
+
+def submit_edits(file_path: str | Path, edits: dict[str, dict[str, str]]) -> EditResult:
+    """Queue edits, then wait until they have been applied by any process.
+
+    Returns this submission's share of the changes; ``written`` and
+    ``bytes_written`` describe the write that included them. Nothing of
+    the submission is left in the spool, whatever the outcome.
+    """
+    from kicad_tool.editor import EditResult
+
+    entry = enqueue_edits(file_path, edits)
+    result_path = entry.with_suffix(".result")
+    try:
+        with schematic_lock(file_path):
+            if entry.exists():
+                drain_queue(file_path)
+        outcome = json.loads(result_path.read_text())
+    finally:
+        # Never leave an edit behind for a later run to apply after this
+        # one has reported it failed.
+        entry.unlink(missing_ok=True)
+        result_path.unlink(missing_ok=True)
+    if "error" in outcome:
+        error = OSError if outcome.get("os_error") else ValueError
+        raise error(outcome["error"])
+    return EditResult(outcome["changes"], outcome["written"], outcome["bytes_written"])
+
+
+def _entry_outcome(result: EditResult, edits: dict[str, Collection[str]]) -> dict:
+    """Pick out the changes to the ``{reference: properties}`` of one entry from a merged result."""
+    changes = {}
+    for ref, properties in edits.items():
+        changes[ref] = [
+            change for change in result.changes.get(ref, []) if change.partition(": ")[0] in properties
+        ]
+    return {"changes": changes, "written": result.written, "bytes_written": result.bytes_written}
+
+
+def _error_outcome(error: Exception) -> dict:
+    return {"error": str(error), "os_error": isinstance(error, OSError)}
+
+
+def _finish_entry(entry: Path, outcome: dict) -> None:
+    tmp_path = entry.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(outcome))
+    os.replace(tmp_path, entry.with_suffix(".result"))
+    entry.unlink()
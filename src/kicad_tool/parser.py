@@ -1,49 +1,264 @@
 from __future__ import annotations
 
 import math
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, replace
 from pathlib import Path
 
+from kicad_tool.columnar import ColumnarTree
 from kicad_tool.models import Component, Group, Net, PinConnection, Schematic
-from kicad_tool.sexp import SexpNode, parse_sexp
+from kicad_tool.sexp import SexpNode, TagIndex, map_file, parse_sexp
+
+# Geometry runs on KiCad's schematic internal unit, 100 nm: the finest step
+# a .kicad_sch file stores, so every coordinate in it is an exact integer.
+_IU_PER_MM = 10_000
+# Points pack into one int: 32 bits per axis, offset to keep them unsigned.
+_KEY_OFFSET = 1 << 31
+_KEY_MASK = (1 << 32) - 1
+
+_GROUP_LABEL_Y_TOLERANCE = 30_000  # 3 mm
+# Side of a wire grid cell: four 100 mil grid steps.
+_WIRE_GRID_CELL = 101_600
+# Share of a sheet's symbols a subset walk may place before it gives up
+# and extracts every net instead.
+_WALK_BUDGET_SHARE = 0.05
+# (cos, sin) of the rotations KiCad places symbols at.
+_QUARTER_TURNS = {0: (1, 0), 90: (0, 1), 180: (-1, 0), 270: (0, -1)}
+
+# Top-level items the extraction stages read; everything else on the sheet
+# (graphics, images, buses, sheet metadata) is skipped while parsing.
+_SCHEMATIC_TAGS = frozenset({
+    "lib_symbols", "symbol", "wire", "junction", "label", "global_label", "rectangle", "text", "sheet",
+})
+# Drawing and per-instance detail nested inside the kept items.
+_SKIPPED_TAGS = frozenset({
+    "polyline", "arc", "circle", "bezier", "effects", "stroke", "fill", "instances",
+})
+# Sheets of a hierarchy also need their own uuid, their hierarchical labels
+# and, for the references of each placement, the instances of every symbol.
+_SHEET_TAGS = _SCHEMATIC_TAGS | {"uuid", "hierarchical_label"}
+_SHEET_SKIPPED_TAGS = _SKIPPED_TAGS - {"instances"}
+# Any sheet block makes the file the root of a hierarchy. A match inside a
+# string only costs the extra tags read for sheets.
+_SHEET_BLOCK_RE = re.compile(rb"\(sheet\s")
+
+
+def parse_schematic(path: str | Path, columnar: bool = False, workers: int | None = None) -> Schematic:
+    """Extract components, nets and groups from a ``.kicad_sch`` file.
+
+    With ``columnar=True`` the file is held in a :class:`ColumnarTree`,
+    which is slower to walk but takes a fraction of the memory. A root
+    sheet that places sub-sheets is loaded with all of them, see
+    :func:`kicad_tool.hierarchy.parse_hierarchy`; ``workers`` caps the
+    processes that parse them.
+    """
+    root = _load_root(path, columnar)
+    if root.child("sheet") is not None:
+        from kicad_tool.hierarchy import parse_hierarchy
+
+        return parse_hierarchy(path, workers, root)
+    symbols = _read_symbols(root)
+    nets = _extract_all_nets(_read_wiring(root), symbols)
+    groups = _extract_groups(root, symbols.positions)
+    return Schematic(components=symbols.components, nets=nets, groups=groups)
+
+
+def parse_schematic_subset(
+    path: str | Path,
+    select_refs: Callable[[Iterable[str]], set[str]] | None = None,
+    net: str | None = None,
+    columnar: bool = False,
+) -> tuple[Schematic, set[str]]:
+    """Extract only the nets and groups of a few components.
+
+    ``select_refs`` picks references out of all component references, and
+    ``net`` keeps the components with a pin on the net of that name; with
+    both, a component must pass both. Returns the selected references and
+    a schematic with every component, but only the nets that touch a
+    selected component and the groups of selected components. Those nets
+    are found by walking outward from the selection rather than by
+    extracting every net, and come out as :func:`parse_schematic` would
+    list them. When nothing is selected, or the walk grows to cover much
+    of the sheet, the whole schematic is extracted and then filtered, as
+    are hierarchical schematics.
+    """
+    root = _load_root(path, columnar)
+    if root.child("sheet") is not None:
+        from kicad_tool.hierarchy import parse_hierarchy
+
+        schematic = parse_hierarchy(path, root=root)
+        return schematic, _select(schematic, select_refs, net)
+    symbols = _read_symbols(root)
+    components, positions = symbols.components, symbols.positions
+    wiring = _read_wiring(root)
+    grid = nets = None
+
+    selected: set[str] = set()
+    if select_refs is not None:
+        selected = select_refs(c.reference for c in components)
+    if net is not None or selected:
+        walker = _NetWalker(wiring, symbols, budget=round(len(symbols.instances) * _WALK_BUDGET_SHARE))
+        grid = walker.grid
+        if net is not None:
+            named = walker.nets(walker.label_points.get(net, ()))
+            if named is None:
+                named = nets = _extract_all_nets(wiring, symbols, grid)
+            on_net = {c.component_ref for n in named if n.name == net for c in n.connections}
+            selected = on_net if select_refs is None else selected & on_net
+        if selected and nets is None:
+            nets = walker.nets(walker.seeds(selected))
+    if nets is None:
+        nets = _extract_all_nets(wiring, symbols, grid)
+    if not selected:
+        return Schematic(components=components, nets=nets, groups=_extract_groups(root, positions)), selected
+    nets = [n for n in nets if any(c.component_ref in selected for c in n.connections)]
+    groups = _extract_groups(root, {ref: pos for ref, pos in positions.items() if ref in selected})
+    return Schematic(components=components, nets=nets, groups=groups), selected
+
+
+@dataclass(slots=True)
+class _Symbols:
+    """The symbols of a sheet, through the stages every extraction shares."""
+
+    instances: list[_Instance]
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]]
+    multi_unit_refs: set[str]
+    components: list[Component]
+    positions: dict[str, tuple[int, int]]
+    lib_pin_names: dict[str, dict[str, str]]
+
+
+def _read_symbols(root: SexpNode) -> _Symbols:
+    instances = _read_instances(root)
+    lib_unit_pins, lib_pin_names = _build_lib_pin_tables(_index_lib_symbols(root), instances)
+    multi_unit_refs = _find_multi_unit_refs(instances)
+    components, positions = _extract_components(instances, lib_unit_pins, multi_unit_refs)
+    return _Symbols(instances, lib_unit_pins, multi_unit_refs, components, positions, lib_pin_names)
+
+
+def _extract_all_nets(wiring: _Wiring, symbols: _Symbols, grid: _WireGrid | None = None) -> list[Net]:
+    instances, lib_unit_pins, multi_unit_refs = symbols.instances, symbols.lib_unit_pins, symbols.multi_unit_refs
+    pin_names = _build_pin_name_map(instances, lib_unit_pins, symbols.lib_pin_names, multi_unit_refs)
+    return _extract_nets(wiring, instances, pin_names, lib_unit_pins, multi_unit_refs, grid)
+
+
+def _select(
+    schematic: Schematic, select_refs: Callable[[Iterable[str]], set[str]] | None, net: str | None
+) -> set[str]:
+    selected: set[str] = set()
+    if select_refs is not None:
+        selected = select_refs(c.reference for c in schematic.components)
+    if net is not None:
+        on_net = {c.component_ref for n in schematic.nets if n.name == net for c in n.connections}
+        selected = on_net if select_refs is None else selected & on_net
+    return selected
+
+
+def _load_root(path: str | Path, columnar: bool) -> SexpNode:
+    """Parse the file, keeping what :func:`read_sheet` needs if it places sheets."""
+    with map_file(path) as data:
+        if _SHEET_BLOCK_RE.search(data):
+            skip_tags, keep_tags = _SHEET_SKIPPED_TAGS, _SHEET_TAGS
+        else:
+            skip_tags, keep_tags = _SKIPPED_TAGS, _SCHEMATIC_TAGS
+        if columnar:
+            return ColumnarTree.parse(data, skip_tags=skip_tags, keep_tags=keep_tags).root
+        return SexpNode(parse_sexp(data, skip_tags=skip_tags, keep_tags=keep_tags, intern_quoted=True), TagIndex())
+
+
+@dataclass(slots=True)
+class _Instance:
+    """One placed symbol, read once for every extraction stage."""
+
+    reference: str
+    lib_id: str
+    unit: int
+    x: int
+    y: int
+    rotation: float
+    mirror: str | None
+    properties: dict[str, str]
+    is_power: bool
+    # {sheet path: (reference, unit)} from the symbol's instances, if read.
+    path_refs: dict[str, tuple[str, int]] | None = None
+
+
+def _read_instances(root: SexpNode) -> list[_Instance]:
+    """Read every placed symbol in a single pass over its children."""
+    instances = []
+    for sym in root.children("symbol"):
+        properties: dict[str, str] = {}
+        lib_id = unit = at = mirror = path_refs = None
+        for item in sym.raw[1:]:
+            if not isinstance(item, list) or not item:
+                continue
+            tag = item[0]
+            if tag == "property":
+                node = SexpNode(item)
+                name = node.value
+                if name not in properties:
+                    properties[name] = str(item[2]) if len(item) > 2 else ""
+            elif tag == "lib_id" and lib_id is None:
+                lib_id = SexpNode(item).value
+            elif tag == "unit" and unit is None:
+                unit = SexpNode(item).value
+            elif tag == "at" and at is None:
+                at = SexpNode(item).values
+            elif tag == "mirror" and mirror is None:
+                mirror = SexpNode(item).value
+            elif tag == "instances" and path_refs is None:
+                path_refs = _read_path_refs(SexpNode(item))
+        reference = properties.get("Reference", "")
+        instances.append(_Instance(
+            reference=reference,
+            lib_id=lib_id,
+            unit=unit,
+            x=_to_iu(at[0]),
+            y=_to_iu(at[1]),
+            rotation=at[2] if len(at) > 2 else 0,
+            mirror=mirror,
+            properties=properties,
+            is_power=reference.startswith("#"),
+            path_refs=path_refs,
+        ))
+    return instances
 
-_GROUP_LABEL_Y_TOLERANCE = 3.0
 
+def _read_path_refs(instances: SexpNode) -> dict[str, tuple[str, int]]:
+    path_refs = {}
+    for project in instances.children("project"):
+        for path in project.children("path"):
+            reference = path.child("reference")
+            unit = path.child("unit")
+            if reference is not None and unit is not None:
+                path_refs[path.value] = (reference.value, unit.value)
+    return path_refs
 
-def parse_schematic(path: str | Path) -> Schematic:
-    text = Path(path).read_text()
-    root = SexpNode(parse_sexp(text))
-    lib_unit_pins = _build_lib_unit_pins(root)
-    components, positions = _extract_components(root, lib_unit_pins)
-    pin_names = _build_pin_name_map(root, lib_unit_pins)
-    nets = _extract_nets(root, pin_names, lib_unit_pins)
-    groups = _extract_groups(root, positions)
-    return Schematic(components=components, nets=nets, groups=groups)
 
+@dataclass(slots=True)
+class _LibPin:
+    """A library pin, relative to its symbol's origin."""
 
-def _get_property(node: SexpNode, name: str) -> str:
-    for prop in node.children("property"):
-        if prop.value == name:
-            return str(prop.raw[2]) if len(prop.raw) > 2 else ""
-    return ""
+    number: str
+    name: str
+    electrical_type: str
+    x: int
+    y: int
 
 
-def _get_lib_symbol(root: SexpNode, lib_id: str) -> SexpNode | None:
+def _index_lib_symbols(root: SexpNode) -> dict[str, SexpNode]:
+    """Map lib_id to its library symbol; the first one wins."""
+    result: dict[str, SexpNode] = {}
     lib_symbols = root.child("lib_symbols")
-    if lib_symbols is None:
-        return None
-    for sym in lib_symbols.children("symbol"):
-        if sym.value == lib_id:
-            return sym
-    return None
-
-
-def _is_power(sym: SexpNode) -> bool:
-    ref = _get_property(sym, "Reference")
-    return ref.startswith("#")
+    if lib_symbols is not None:
+        for sym in lib_symbols.children("symbol"):
+            result.setdefault(sym.value, sym)
+    return result
 
 
 def _is_power_only_unit(
-    lib_unit_pins: dict[tuple[str, int], dict[str, SexpNode]],
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]],
     lib_id: str,
     unit_num: int,
 ) -> bool:
@@ -51,18 +266,17 @@ def _is_power_only_unit(
     if not unit_own_pins:
         return True
     return all(
-        str(pin.raw[1]) == "power_in"
+        pin.electrical_type == "power_in"
         for pin in unit_own_pins.values()
     )
 
 
-def _find_multi_unit_refs(root: SexpNode) -> set[str]:
+def _find_multi_unit_refs(instances: list[_Instance]) -> set[str]:
     units_per_ref: dict[str, set[int]] = {}
-    for sym in root.children("symbol"):
-        if _is_power(sym):
+    for inst in instances:
+        if inst.is_power:
             continue
-        ref = _get_property(sym, "Reference")
-        units_per_ref.setdefault(ref, set()).add(sym.child("unit").value)
+        units_per_ref.setdefault(inst.reference, set()).add(inst.unit)
     return {ref for ref, units in units_per_ref.items() if len(units) > 1}
 
 
@@ -71,7 +285,7 @@ def _resolve_comp_ref(
     unit_num: int,
     lib_id: str,
     multi_unit_refs: set[str],
-    lib_unit_pins: dict[tuple[str, int], dict[str, SexpNode]],
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]],
 ) -> str:
     if base_ref in multi_unit_refs:
         if _is_power_only_unit(lib_unit_pins, lib_id, unit_num):
@@ -81,22 +295,18 @@ def _resolve_comp_ref(
 
 
 def _extract_components(
-    root: SexpNode,
-    lib_unit_pins: dict[tuple[str, int], dict[str, SexpNode]],
-) -> tuple[list[Component], dict[str, tuple[float, float]]]:
-    multi_unit_refs = _find_multi_unit_refs(root)
-
+    instances: list[_Instance],
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]],
+    multi_unit_refs: set[str],
+) -> tuple[list[Component], dict[str, tuple[int, int]]]:
     seen: set[str] = set()
     components = []
-    positions: dict[str, tuple[float, float]] = {}
-    for sym in root.children("symbol"):
-        if _is_power(sym):
+    positions: dict[str, tuple[int, int]] = {}
+    for inst in instances:
+        if inst.is_power:
             continue
-        base_ref = _get_property(sym, "Reference")
-        unit_num = sym.child("unit").value
-        lib_id = sym.child("lib_id").value
-
-        reference = _resolve_comp_ref(base_ref, unit_num, lib_id, multi_unit_refs, lib_unit_pins)
+        base_ref = inst.reference
+        reference = _resolve_comp_ref(base_ref, inst.unit, inst.lib_id, multi_unit_refs, lib_unit_pins)
         if reference == base_ref and base_ref in multi_unit_refs:
             continue
 
@@ -104,22 +314,19 @@ def _extract_components(
             continue
         seen.add(reference)
 
-        value = _get_property(sym, "Value")
-        footprint = _get_property(sym, "Footprint")
-        props = {}
-        for prop in sym.children("property"):
-            name = prop.value
-            if name not in ("Reference", "Value", "Footprint", "Datasheet"):
-                props[name] = str(prop.raw[2]) if len(prop.raw) > 2 else ""
-        at = sym.child("at").values
+        props = {
+            name: value
+            for name, value in inst.properties.items()
+            if name not in ("Reference", "Value", "Footprint", "Datasheet")
+        }
         components.append(Component(
             reference=reference,
-            value=value,
-            footprint=footprint,
+            value=inst.properties.get("Value", ""),
+            footprint=inst.properties.get("Footprint", ""),
             base_ref=base_ref,
             properties=props,
         ))
-        positions[reference] = (at[0], at[1])
+        positions[reference] = (inst.x, inst.y)
     return components, positions
 
 
@@ -129,42 +336,59 @@ def _parse_lib_sub_unit(sub: SexpNode) -> int:
     return int(parts[-2])
 
 
-def _build_lib_unit_pins(root: SexpNode) -> dict[tuple[str, int], dict[str, SexpNode]]:
-    """Map (lib_id, unit_number) to {pin_number: lib_pin_node}."""
-    seen_libs: set[str] = set()
-    result: dict[tuple[str, int], dict[str, SexpNode]] = {}
+def _build_lib_pin_tables(
+    lib_symbols: dict[str, SexpNode], instances: list[_Instance]
+) -> tuple[dict[tuple[str, int], dict[str, _LibPin]], dict[str, dict[str, str]]]:
+    """Read the pins of every library symbol that is placed, once.
 
-    for sym in root.children("symbol"):
-        if _is_power(sym):
+    Returns ``{(lib_id, unit): {pin_number: pin}}``, where the first body
+    style of each unit wins, and ``{lib_id: {pin_number: pin_name}}`` over
+    all units, leaving out unnamed pins.
+    """
+    unit_pins: dict[tuple[str, int], dict[str, _LibPin]] = {}
+    pin_names: dict[str, dict[str, str]] = {}
+
+    for inst in instances:
+        if inst.is_power:
             continue
-        lib_id = sym.child("lib_id").value
-        if lib_id in seen_libs:
+        lib_id = inst.lib_id
+        if lib_id in pin_names:
             continue
-        seen_libs.add(lib_id)
-        lib_sym = _get_lib_symbol(root, lib_id)
+        lib_sym = lib_symbols.get(lib_id)
         if lib_sym is None:
             continue
+        names: dict[str, str] = {}
         for sub in lib_sym.children("symbol"):
-            pins = list(sub.children("pin"))
+            pins = [_read_lib_pin(pin) for pin in sub.children("pin")]
+            for pin in pins:
+                if pin.name and pin.name != "~":
+                    names[pin.number] = pin.name
             if not pins:
                 continue
-            sub_unit = _parse_lib_sub_unit(sub)
-            key = (lib_id, sub_unit)
-            if key in result:
-                continue
-            pin_map: dict[str, SexpNode] = {}
-            for pin in pins:
-                pin_map[str(pin.child("number").value)] = pin
-            result[key] = pin_map
-
-    return result
+            key = (lib_id, _parse_lib_sub_unit(sub))
+            if key not in unit_pins:
+                unit_pins[key] = {pin.number: pin for pin in pins}
+        pin_names[lib_id] = names
+
+    return unit_pins, pin_names
+
+
+def _read_lib_pin(pin: SexpNode) -> _LibPin:
+    at = pin.child("at").values
+    return _LibPin(
+        number=str(pin.child("number").value),
+        name=str(pin.child("name").value),
+        electrical_type=str(pin.raw[1]),
+        x=_to_iu(at[0]),
+        y=_to_iu(at[1]),
+    )
 
 
 def _get_unit_pins(
-    lib_unit_pins: dict[tuple[str, int], dict[str, SexpNode]],
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]],
     lib_id: str,
     unit_num: int,
-) -> dict[str, SexpNode]:
+) -> dict[str, _LibPin]:
     pins = dict(lib_unit_pins.get((lib_id, 0), {}))
     if unit_num != 0:
         pins.update(lib_unit_pins.get((lib_id, unit_num), {}))
@@ -172,40 +396,18 @@ def _get_unit_pins(
 
 
 def _build_pin_name_map(
-    root: SexpNode,
-    lib_unit_pins: dict[tuple[str, int], dict[str, SexpNode]],
+    instances: list[_Instance],
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]],
+    lib_pin_names: dict[str, dict[str, str]],
+    multi_unit_refs: set[str],
 ) -> dict[tuple[str, str], str]:
-    lib_pin_names: dict[str, dict[str, str]] = {}
-    for sym in root.children("symbol"):
-        if _is_power(sym):
-            continue
-        lib_id = sym.child("lib_id").value
-        if lib_id in lib_pin_names:
-            continue
-        lib_sym = _get_lib_symbol(root, lib_id)
-        if lib_sym is None:
-            continue
-        pin_map: dict[str, str] = {}
-        for sub in lib_sym.children("symbol"):
-            for pin in sub.children("pin"):
-                number = str(pin.child("number").value)
-                name = str(pin.child("name").value)
-                if name and name != "~":
-                    pin_map[number] = name
-        lib_pin_names[lib_id] = pin_map
-
-    multi_unit_refs = _find_multi_unit_refs(root)
-
     result: dict[tuple[str, str], str] = {}
-    for sym in root.children("symbol"):
-        if _is_power(sym):
+    for inst in instances:
+        if inst.is_power:
             continue
-        base_ref = _get_property(sym, "Reference")
-        lib_id = sym.child("lib_id").value
-        unit_num = sym.child("unit").value
-        pin_map = lib_pin_names.get(lib_id, {})
-        unit_pins = _get_unit_pins(lib_unit_pins, lib_id, unit_num)
-        comp_ref = _resolve_comp_ref(base_ref, unit_num, lib_id, multi_unit_refs, lib_unit_pins)
+        pin_map = lib_pin_names.get(inst.lib_id, {})
+        unit_pins = _get_unit_pins(lib_unit_pins, inst.lib_id, inst.unit)
+        comp_ref = _resolve_comp_ref(inst.reference, inst.unit, inst.lib_id, multi_unit_refs, lib_unit_pins)
 
         for pin_number in unit_pins:
             resolved = pin_map.get(pin_number, pin_number)
@@ -215,215 +417,891 @@ def _build_pin_name_map(
 
 
 class _UnionFind:
+    """Disjoint sets of connection points.
+
+    Each distinct point gets a dense id on first sight; parents and ranks
+    live in flat lists indexed by id, with union by rank and path halving.
+    """
+
     def __init__(self):
-        self._parent: dict = {}
-
-    def find(self, x):
-        if x not in self._parent:
-            self._parent[x] = x
-        while self._parent[x] != x:
-            self._parent[x] = self._parent[self._parent[x]]
-            x = self._parent[x]
-        return x
-
-    def union(self, a, b):
-        ra, rb = self.find(a), self.find(b)
-        if ra != rb:
-            self._parent[ra] = rb
-
-    def groups(self) -> dict:
-        result: dict = {}
-        for key in self._parent:
-            root = self.find(key)
-            result.setdefault(root, []).append(key)
-        return result
-
-
-def _coord_key(x: float, y: float) -> tuple[float, float]:
-    return (round(x, 2), round(y, 2))
-
-
-def _point_on_wire(
-    point: tuple[float, float],
-    wire_start: tuple[float, float],
-    wire_end: tuple[float, float],
-    tol: float = 0.05,
-) -> bool:
-    px, py = point
-    sx, sy = wire_start
-    ex, ey = wire_end
-    if abs(sy - ey) < tol and abs(py - sy) < tol:
-        if min(sx, ex) - tol < px < max(sx, ex) + tol:
-            return True
-    if abs(sx - ex) < tol and abs(px - sx) < tol:
-        if min(sy, ey) - tol < py < max(sy, ey) + tol:
-            return True
+        self._ids: dict = {}
+        self._parent: list[int] = []
+        self._rank: list[int] = []
+
+    def add(self, x) -> int:
+        """Return the id of ``x``, registering it as a set of its own."""
+        ids = self._ids
+        i = ids.get(x)
+        if i is None:
+            i = ids[x] = len(ids)
+            self._parent.append(i)
+            self._rank.append(0)
+        return i
+
+    def union(self, a, b) -> None:
+        parent = self._parent
+        i, j = self.add(a), self.add(b)
+        while (p := parent[i]) != i:
+            parent[i] = i = parent[p]
+        while (p := parent[j]) != j:
+            parent[j] = j = parent[p]
+        if i == j:
+            return
+        rank = self._rank
+        if rank[i] < rank[j]:
+            i, j = j, i
+        parent[j] = i
+        if rank[i] == rank[j]:
+            rank[i] += 1
+
+    def keys(self) -> list:
+        return list(self._ids)
+
+    def groups(self) -> list[list]:
+        """Return the sets in order of their first point, points in insertion order."""
+        parent = self._parent
+        slot = [-1] * len(parent)
+        groups: list[list] = []
+        for i, key in enumerate(self._ids):
+            r = i
+            while (p := parent[r]) != r:
+                parent[r] = r = parent[p]
+            g = slot[r]
+            if g < 0:
+                slot[r] = len(groups)
+                groups.append([key])
+            else:
+                groups[g].append(key)
+        return groups
+
+
+def _to_iu(mm: float) -> int:
+    return round(mm * _IU_PER_MM)
+
+
+def _coord_key(x: int, y: int) -> int:
+    """Pack a point in internal units into a single int key."""
+    return (x + _KEY_OFFSET) << 32 | (y + _KEY_OFFSET)
+
+
+def _key_point(key: int) -> tuple[int, int]:
+    return (key >> 32) - _KEY_OFFSET, (key & _KEY_MASK) - _KEY_OFFSET
+
+
+def _point_on_wire(px: int, py: int, sx: int, sy: int, ex: int, ey: int) -> bool:
+    """Whether the point lies on a horizontal or vertical wire, ends included."""
+    if sy == ey == py:
+        return min(sx, ex) <= px <= max(sx, ex)
+    if sx == ex == px:
+        return min(sy, ey) <= py <= max(sy, ey)
     return False
 
 
-def _pin_location(sym: SexpNode, lib_pin: SexpNode) -> tuple[float, float]:
-    sym_at = sym.child("at").values
-    sx, sy = sym_at[0], sym_at[1]
-    sym_rot = sym_at[2] if len(sym_at) > 2 else 0
+class _WireGrid:
+    """Uniform grid over horizontal and vertical wire segments.
 
-    pin_at = lib_pin.child("at").values
-    px, py = pin_at[0], pin_at[1]
+    Each segment ``(sx, sy, ex, ey)`` is filed under every cell it crosses,
+    so a point only needs to be tested against the segments in its own
+    cell. Other segments can never pass :func:`_point_on_wire` and are
+    left out.
+    """
 
-    theta = math.radians(sym_rot)
-    rx = px * math.cos(theta) - py * math.sin(theta)
-    ry = px * math.sin(theta) + py * math.cos(theta)
-
-    mirror = sym.child("mirror")
-    if mirror is not None:
-        mval = mirror.value
-        if mval == "x":
+    def __init__(self, segments: list[tuple[int, int, int, int]]):
+        self._cells: dict[tuple[int, int], list[tuple[int, int, int, int]]] = {}
+        cell = _WIRE_GRID_CELL
+        for segment in segments:
+            sx, sy, ex, ey = segment
+            if sx != ex and sy != ey:
+                continue
+            for cx in range(min(sx, ex) // cell, max(sx, ex) // cell + 1):
+                for cy in range(min(sy, ey) // cell, max(sy, ey) // cell + 1):
+                    self._cells.setdefault((cx, cy), []).append(segment)
+
+    def in_cell(self, cell: tuple[int, int]) -> list[tuple[int, int, int, int]]:
+        """Return the segments filed under ``cell``."""
+        return self._cells.get(cell, [])
+
+    def touching(self, x: int, y: int) -> Iterator[tuple[int, int, int, int]]:
+        """Yield the segments that the point lies on, ends included."""
+        cell = _WIRE_GRID_CELL
+        for segment in self._cells.get((x // cell, y // cell), ()):
+            if _point_on_wire(x, y, *segment):
+                yield segment
+
+
+def _pin_offsets(
+    unit_pins: dict[str, _LibPin], rotation: float, mirror: str | None
+) -> list[tuple[str, int, int]]:
+    """Return ``(pin_number, dx, dy)`` for every pin of an orientation.
+
+    Offsets are relative to the instance's origin, in sheet coordinates.
+    KiCad only places symbols at quarter turns, which transform exactly;
+    any other angle falls back to rounded trigonometry.
+    """
+    turn = _QUARTER_TURNS.get(rotation % 360)
+    if turn is None:
+        theta = math.radians(rotation)
+        cos, sin = math.cos(theta), math.sin(theta)
+    else:
+        cos, sin = turn
+    offsets = []
+    for pin_number, lib_pin in unit_pins.items():
+        px, py = lib_pin.x, lib_pin.y
+        rx = round(px * cos - py * sin)
+        ry = round(px * sin + py * cos)
+        if mirror == "x":
             ry = -ry
-        elif mval == "y":
+        elif mirror == "y":
             rx = -rx
-
-    return _coord_key(sx + rx, sy - ry)
+        # Library y points up, sheet y points down.
+        offsets.append((pin_number, rx, -ry))
+    return offsets
 
 
 def _extract_groups(
     root: SexpNode,
-    positions: dict[str, tuple[float, float]],
+    positions: dict[str, tuple[int, int]],
 ) -> list[Group]:
+    groups, grouped_refs = _assign_groups(_read_group_rects(root), positions)
+    ungrouped = sorted(set(positions.keys()) - grouped_refs)
+    if ungrouped:
+        groups.append(Group(name="Ungrouped", references=ungrouped))
+    return groups
+
+
+def _read_group_rects(root: SexpNode) -> list[tuple[str | None, tuple[int, int, int, int]]]:
+    """Return the sheet's rectangles, each named by a text along its top edge."""
     rects = []
     for r in root.children("rectangle"):
         start = r.child("start").values
         end = r.child("end").values
-        x1, y1 = start[0], start[1]
-        x2, y2 = end[0], end[1]
+        x1, y1 = _to_iu(start[0]), _to_iu(start[1])
+        x2, y2 = _to_iu(end[0]), _to_iu(end[1])
         rects.append((min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
 
     texts = []
     for t in root.children("text"):
         at = t.child("at").values
-        texts.append((t.value, at[0], at[1]))
+        texts.append((t.value, _to_iu(at[0]), _to_iu(at[1])))
 
-    labeled: set[int] = set()
-    rect_names: dict[int, str] = {}
-    for i, (rx1, ry1, rx2, ry2) in enumerate(rects):
+    named = []
+    for rx1, ry1, rx2, ry2 in rects:
+        name = None
         for tval, tx, ty in texts:
             if rx1 <= tx <= rx2 and abs(ty - ry1) <= _GROUP_LABEL_Y_TOLERANCE:
-                labeled.add(i)
-                rect_names[i] = tval
+                name = tval
                 break
+        named.append((name, (rx1, ry1, rx2, ry2)))
+    return named
 
+
+def _assign_groups(
+    rects: list[tuple[str | None, tuple[int, int, int, int]]],
+    positions: dict[str, tuple[int, int]],
+) -> tuple[list[Group], set[str]]:
+    """Group the components inside each rectangle; also return who was grouped."""
     groups = []
     grouped_refs: set[str] = set()
-    for i, (rx1, ry1, rx2, ry2) in enumerate(rects):
+    for name, (rx1, ry1, rx2, ry2) in rects:
         refs = []
         for ref, (px, py) in positions.items():
             if rx1 <= px <= rx2 and ry1 <= py <= ry2:
                 refs.append(ref)
         if not refs:
             continue
-        if i not in labeled:
-            name = None
-        else:
-            name = rect_names[i]
         grouped_refs.update(refs)
         groups.append(Group(name=name, references=sorted(refs)))
+    return groups, grouped_refs
 
-    ungrouped = sorted(set(positions.keys()) - grouped_refs)
-    if ungrouped:
-        groups.append(Group(name="Ungrouped", references=ungrouped))
 
-    return groups
+@dataclass(slots=True)
+class _Wiring:
+    """A sheet's wires, junctions and labels, each kind in file order."""
 
+    wires: list[tuple[int, int, int, int]]
+    junctions: list[int]
+    labels: list[tuple[int, str]]
+    global_labels: list[tuple[int, str]]
 
-def _extract_nets(
-    root: SexpNode,
-    pin_names: dict[tuple[str, str], str],
-    lib_unit_pins: dict[tuple[str, int], dict[str, SexpNode]],
-) -> list[Net]:
-    uf = _UnionFind()
 
-    pin_at_coord: dict[tuple[float, float], list[tuple[str, str]]] = {}
-    label_at_coord: dict[tuple[float, float], str] = {}
-    power_net_names: set[str] = set()
+def _read_wiring(root: SexpNode) -> _Wiring:
+    wires = []
+    for wire in root.children("wire"):
+        pts = wire.child("pts").raw
+        start, end = pts[1], pts[2]
+        wires.append((_to_iu(start[1]), _to_iu(start[2]), _to_iu(end[1]), _to_iu(end[2])))
+    junctions = [_at_key(junc) for junc in root.children("junction")]
+    labels = [(_at_key(label), label.value) for label in root.children("label")]
+    global_labels = [(_at_key(glabel), glabel.value) for glabel in root.children("global_label")]
+    return _Wiring(wires, junctions, labels, global_labels)
 
-    multi_unit_refs = _find_multi_unit_refs(root)
 
-    for sym in root.children("symbol"):
-        if _is_power(sym):
-            value = _get_property(sym, "Value")
+@dataclass(slots=True)
+class _ConnectionPoints:
+    """Everything on a sheet that can join a net, keyed by point."""
+
+    pins: dict[int, list[tuple[str, str]]]
+    labels: dict[int, str]
+    power_net_names: set[str]
+    wires: list[tuple[int, int, int, int]]
+
+
+def _place_connection_points(
+    wiring: _Wiring,
+    instances: list[_Instance],
+    pin_names: dict[tuple[str, str], str],
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]],
+    multi_unit_refs: set[str],
+    register: Callable[[int], object],
+) -> _ConnectionPoints:
+    """Locate pins, power symbols, wires, junctions and labels.
+
+    ``register`` sees every point in a fixed order, which decides the order
+    of nets and of their connections.
+    """
+    pin_at_coord: dict[int, list[tuple[str, str]]] = {}
+    label_at_coord: dict[int, str] = {}
+    power_net_names: set[str] = set()
+
+    # Repeated parts share their pin offsets: one table per library unit
+    # and orientation, after which each instance only adds its origin.
+    offset_tables: dict[tuple[str, int, float, str | None], list[tuple[str, int, int]]] = {}
+    for inst in instances:
+        if inst.is_power:
+            value = inst.properties.get("Value", "")
             if value == "PWR_FLAG":
                 continue
-            at = sym.child("at").values
-            coord = _coord_key(at[0], at[1])
-            uf.find(coord)
+            coord = _coord_key(inst.x, inst.y)
+            register(coord)
             power_net_names.add(value)
             label_at_coord[coord] = value
             continue
-        base_ref = _get_property(sym, "Reference")
-        lib_id = sym.child("lib_id").value
-        unit_num = sym.child("unit").value
-        unit_pins = _get_unit_pins(lib_unit_pins, lib_id, unit_num)
-        comp_ref = _resolve_comp_ref(base_ref, unit_num, lib_id, multi_unit_refs, lib_unit_pins)
-
-        for pin_number, lib_pin in unit_pins.items():
-            coord = _pin_location(sym, lib_pin)
-            uf.find(coord)
+        table_key = (inst.lib_id, inst.unit, inst.rotation, inst.mirror)
+        offsets = offset_tables.get(table_key)
+        if offsets is None:
+            unit_pins = _get_unit_pins(lib_unit_pins, inst.lib_id, inst.unit)
+            offsets = offset_tables[table_key] = _pin_offsets(unit_pins, inst.rotation, inst.mirror)
+        comp_ref = _resolve_comp_ref(inst.reference, inst.unit, inst.lib_id, multi_unit_refs, lib_unit_pins)
+
+        sx, sy = inst.x, inst.y
+        for pin_number, dx, dy in offsets:
+            coord = _coord_key(sx + dx, sy + dy)
+            register(coord)
             resolved = pin_names.get((comp_ref, pin_number), pin_number)
             pin_at_coord.setdefault(coord, []).append((comp_ref, resolved))
 
-    wire_segments = []
-    for wire in root.children("wire"):
-        pts = list(wire.child("pts").children("xy"))
-        start = _coord_key(pts[0].values[0], pts[0].values[1])
-        end = _coord_key(pts[1].values[0], pts[1].values[1])
-        uf.union(start, end)
-        wire_segments.append((start, end))
-
-    for junc in root.children("junction"):
-        at = junc.child("at").values
-        coord = _coord_key(at[0], at[1])
-        uf.find(coord)
-
-    for label in root.children("label"):
-        at = label.child("at").values
-        coord = _coord_key(at[0], at[1])
-        uf.find(coord)
-        label_at_coord[coord] = label.value
-
-    for glabel in root.children("global_label"):
-        at = glabel.child("at").values
-        coord = _coord_key(at[0], at[1])
-        uf.find(coord)
-        label_at_coord[coord] = glabel.value
-
-    for coord in label_at_coord:
-        for ws, we in wire_segments:
-            if _point_on_wire(coord, ws, we):
-                uf.union(coord, ws)
-                break
+    for sx, sy, ex, ey in wiring.wires:
+        register(_coord_key(sx, sy))
+        register(_coord_key(ex, ey))
+
+    for coord in wiring.junctions:
+        register(coord)
+
+    for coord, name in wiring.labels:
+        register(coord)
+        label_at_coord[coord] = name
+
+    for coord, name in wiring.global_labels:
+        register(coord)
+        label_at_coord[coord] = name
+
+    return _ConnectionPoints(pin_at_coord, label_at_coord, power_net_names, wiring.wires)
+
+
+def _join_points(
+    uf: _UnionFind, wires: list[tuple[int, int, int, int]], labels: dict[int, str], grid: _WireGrid | None = None
+) -> None:
+    """Union the registered points that wires and same-named labels connect.
 
-    name_to_coords: dict[str, list[tuple[float, float]]] = {}
-    for coord, name in label_at_coord.items():
+    ``grid`` is a :class:`_WireGrid` of ``wires`` when the caller has one.
+    """
+    for sx, sy, ex, ey in wires:
+        uf.union(_coord_key(sx, sy), _coord_key(ex, ey))
+
+    # Labels, pins, junctions and wire ends that land anywhere on a wire,
+    # not just on one of its ends, join its net: T-connections included.
+    if grid is None:
+        grid = _WireGrid(wires)
+    for coord in uf.keys():
+        for sx, sy, _, _ in grid.touching(*_key_point(coord)):
+            uf.union(coord, _coord_key(sx, sy))
+
+    name_to_coords: dict[str, list[int]] = {}
+    for coord, name in labels.items():
         name_to_coords.setdefault(name, []).append(coord)
     for coords in name_to_coords.values():
         for c in coords[1:]:
             uf.union(coords[0], c)
 
-    groups = uf.groups()
+
+def _make_net(coords: list[int], points: _ConnectionPoints) -> Net | None:
+    """Build the net of a set of connected points, or None if it has no pins."""
+    connections = []
+    name = None
+    is_power = False
+    for coord in coords:
+        if coord in points.pins:
+            for ref, pin_num in points.pins[coord]:
+                connections.append(PinConnection(ref, pin_num))
+        if coord in points.labels:
+            lbl = points.labels[coord]
+            if lbl in points.power_net_names:
+                is_power = True
+            name = lbl
+    if not connections:
+        return None
+    return Net(name=name, connections=connections, is_power=is_power)
+
+
+def _extract_nets(
+    wiring: _Wiring,
+    instances: list[_Instance],
+    pin_names: dict[tuple[str, str], str],
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]],
+    multi_unit_refs: set[str],
+    grid: _WireGrid | None = None,
+) -> list[Net]:
+    uf = _UnionFind()
+    points = _place_connection_points(wiring, instances, pin_names, lib_unit_pins, multi_unit_refs, uf.add)
+    _join_points(uf, points.wires, points.labels, grid)
+
     nets = []
-    for _root, coords in groups.items():
+    for coords in uf.groups():
+        net = _make_net(coords, points)
+        if net is not None:
+            nets.append(net)
+    return nets
+
+
+def _rank(phase: int, item: int, point: int) -> int:
+    """Order points as :func:`_place_connection_points` registers them.
+
+    ``phase`` counts symbols, wires, junctions, labels and global labels;
+    ``item`` is the index within its kind and ``point`` the pin or wire end.
+    """
+    return phase << 56 | item << 24 | point
+
+
+class _NetWalker:
+    """Find single nets by walking outward from some of their points.
+
+    Follows the same connections as :func:`_extract_nets` - wire ends,
+    points anywhere on a wire, and labels of the same name - but only
+    visits what is reachable from where it starts. Wire ends, junctions and
+    labels are filed by grid cell up front, and each symbol under the cells
+    its pins can reach; a cell's points are registered, and its symbols'
+    pins placed, only once the walk needs that cell. Points are ordered by
+    where :func:`_place_connection_points` would first register them, so
+    nets come out as :func:`_extract_nets` lists them.
+    """
+
+    def __init__(self, wiring: _Wiring, symbols: _Symbols, budget: int):
+        self._symbols = symbols
+        # Symbols the walk may place before it gives up, see nets().
+        self._budget = budget
+        self._rank: dict[int, int] = {}
+        self._point_cells: dict[tuple[int, int], list[int]] = {}
+        self._pins: dict[int, list[tuple[int, str, str]]] = {}
+        self._wire_ends: dict[int, list[int]] = {}
+        # (point, rank, other end of its wire) of everything but pins, by cell.
+        cell_points: dict[tuple[int, int], list[tuple[int, int, int | None]]] = {}
+        labels: dict[int, str] = {}
+        self.power_net_names: set[str] = set()
+
+        instances = symbols.instances
+        self._comp_refs: list[str | None] = [None] * len(instances)
+        self._offsets: list[list[tuple[str, int, int]]] = [[]] * len(instances)
+        self._same_ref: dict[str, list[int]] = {}
+        self._symbol_cells: dict[tuple[int, int], list[int]] = {}
+        # Pin offsets and their bounding box per library unit and orientation.
+        tables: dict[tuple, tuple[list[tuple[str, int, int]], tuple[int, int, int, int]]] = {}
+        cell = _WIRE_GRID_CELL
+        for i, inst in enumerate(instances):
+            if inst.is_power:
+                value = inst.properties.get("Value", "")
+                if value != "PWR_FLAG":
+                    coord = _coord_key(inst.x, inst.y)
+                    point = (coord, _rank(0, i, 0), None)
+                    cell_points.setdefault((inst.x // cell, inst.y // cell), []).append(point)
+                    self.power_net_names.add(value)
+                    labels[coord] = value
+                continue
+            table_key = (inst.lib_id, inst.unit, inst.rotation, inst.mirror)
+            table = tables.get(table_key)
+            if table is None:
+                unit_pins = _get_unit_pins(symbols.lib_unit_pins, inst.lib_id, inst.unit)
+                offsets = _pin_offsets(unit_pins, inst.rotation, inst.mirror)
+                xs = [dx for _, dx, _ in offsets] or [0]
+                ys = [dy for _, _, dy in offsets] or [0]
+                table = tables[table_key] = (offsets, (min(xs), min(ys), max(xs), max(ys)))
+            offsets, (x1, y1, x2, y2) = table
+            comp_ref = _resolve_comp_ref(
+                inst.reference, inst.unit, inst.lib_id, symbols.multi_unit_refs, symbols.lib_unit_pins
+            )
+            self._comp_refs[i] = comp_ref
+            self._offsets[i] = offsets
+            self._same_ref.setdefault(comp_ref, []).append(i)
+            if not offsets:
+                continue
+            for cx in range((inst.x + x1) // cell, (inst.x + x2) // cell + 1):
+                for cy in range((inst.y + y1) // cell, (inst.y + y2) // cell + 1):
+                    self._symbol_cells.setdefault((cx, cy), []).append(i)
+        self._placed = bytearray(len(instances))
+        self._resolved: set[tuple[int, int]] = set()
+
+        # Wire ends are found through the grid, which leaves out the rare
+        # diagonal wire; those are filed with the other points.
+        wires = wiring.wires
+        self.grid = _WireGrid(wires)
+        # Built backwards, so a repeated wire keeps its first index.
+        self._wire_index = dict(zip(reversed(wires), range(len(wires) - 1, -1, -1)))
+        for j in [j for j, (sx, sy, ex, ey) in enumerate(wires) if sx != ex and sy != ey]:
+            sx, sy, ex, ey = wires[j]
+            start, end = _coord_key(sx, sy), _coord_key(ex, ey)
+            cell_points.setdefault((sx // cell, sy // cell), []).append((start, _rank(1, j, 0), end))
+            cell_points.setdefault((ex // cell, ey // cell), []).append((end, _rank(1, j, 1), start))
+
+        for j, coord in enumerate(wiring.junctions):
+            x, y = _key_point(coord)
+            cell_points.setdefault((x // cell, y // cell), []).append((coord, _rank(2, j, 0), None))
+        for phase, kind in ((3, wiring.labels), (4, wiring.global_labels)):
+            for j, (coord, name) in enumerate(kind):
+                x, y = _key_point(coord)
+                cell_points.setdefault((x // cell, y // cell), []).append((coord, _rank(phase, j, 0), None))
+                labels[coord] = name
+
+        self._cell_points = cell_points
+        self._labels = labels
+        self.label_points: dict[str, list[int]] = {}
+        for coord, name in labels.items():
+            self.label_points.setdefault(name, []).append(coord)
+
+    def seeds(self, refs: set[str]) -> list[int]:
+        """Place the components ``refs`` and return their pin points."""
+        seeds = []
+        instances = self._symbols.instances
+        for i, comp_ref in enumerate(self._comp_refs):
+            if comp_ref in refs:
+                self._place(i)
+                sx, sy = instances[i].x, instances[i].y
+                seeds += [_coord_key(sx + dx, sy + dy) for _, dx, dy in self._offsets[i]]
+        return seeds
+
+    def nets(self, seeds: Iterable[int]) -> list[Net] | None:
+        """Return the nets through ``seeds``, in :func:`_extract_nets` order.
+
+        Returns None once the walk has placed more symbols than its budget,
+        or reaches a label repeated more often than that: extracting every
+        net is then cheaper than walking on.
+        """
+        found: dict[int, list[int]] = {}
+        covered: set[int] = set()
+        for seed in seeds:
+            if seed in covered:
+                continue
+            coords = self._net_points(seed)
+            if coords is None:
+                return None
+            covered.update(coords)
+            found[self._rank[coords[0]]] = coords
+        nets = []
+        for first in sorted(found):
+            net = self._make_net(found[first])
+            if net is not None:
+                nets.append(net)
+        return nets
+
+    def _net_points(self, seed: int) -> list[int] | None:
+        """Return the points connected to ``seed`` in registration order, or None past the budget."""
+        seen = {seed}
+        todo = [seed]
+        walked_wires: set[tuple[int, int, int, int]] = set()
+        labels = self._labels
+        cell = _WIRE_GRID_CELL
+        while todo:
+            coord = todo.pop()
+            x, y = _key_point(coord)
+            if not self._resolve((x // cell, y // cell)):
+                return None
+            reached = list(self._wire_ends.get(coord, ()))
+            for segment in self.grid.touching(x, y):
+                if segment in walked_wires:
+                    continue
+                walked_wires.add(segment)
+                points = self._points_on(segment)
+                if points is None:
+                    return None
+                reached += points
+            name = labels.get(coord)
+            if name is not None:
+                points = self.label_points[name]
+                if len(points) > self._budget:
+                    # A label spread wider than the budget, such as a
+                    # ground symbol, joins a net too wide to walk.
+                    return None
+                reached += points
+            for other in reached:
+                if other not in seen:
+                    seen.add(other)
+                    todo.append(other)
+        return sorted(seen, key=self._rank.__getitem__)
+
+    def _points_on(self, segment: tuple[int, int, int, int]) -> list[int] | None:
+        sx, sy, ex, ey = segment
+        cell = _WIRE_GRID_CELL
+        found = []
+        for cx in range(min(sx, ex) // cell, max(sx, ex) // cell + 1):
+            for cy in range(min(sy, ey) // cell, max(sy, ey) // cell + 1):
+                if not self._resolve((cx, cy)):
+                    return None
+                for coord in self._point_cells.get((cx, cy), ()):
+                    if _point_on_wire(*_key_point(coord), sx, sy, ex, ey):
+                        found.append(coord)
+        return found
+
+    def _resolve(self, cell: tuple[int, int]) -> bool:
+        """Register the points of ``cell`` and place every symbol reaching it; False past the budget."""
+        if cell in self._resolved:
+            return True
+        self._resolved.add(cell)
+        wire_ends = self._wire_ends
+        for segment in self.grid.in_cell(cell):
+            sx, sy, ex, ey = segment
+            start, end = _coord_key(sx, sy), _coord_key(ex, ey)
+            j = self._wire_index[segment]
+            if (sx // _WIRE_GRID_CELL, sy // _WIRE_GRID_CELL) == cell:
+                self._register(start, _rank(1, j, 0))
+                wire_ends.setdefault(start, []).append(end)
+            if (ex // _WIRE_GRID_CELL, ey // _WIRE_GRID_CELL) == cell:
+                self._register(end, _rank(1, j, 1))
+                wire_ends.setdefault(end, []).append(start)
+        for coord, rank, other in self._cell_points.get(cell, ()):
+            self._register(coord, rank)
+            if other is not None:
+                wire_ends.setdefault(coord, []).append(other)
+        for i in self._symbol_cells.get(cell, ()):
+            if not self._placed[i]:
+                if not self._budget:
+                    return False
+                self._budget -= 1
+                self._place(i)
+        return True
+
+    def _place(self, i: int) -> None:
+        if self._placed[i]:
+            return
+        self._placed[i] = 1
+        inst = self._symbols.instances[i]
+        comp_ref = self._comp_refs[i]
+        same_ref = self._same_ref[comp_ref]
+        lib_pin_names = self._symbols.lib_pin_names
+        names = lib_pin_names.get(inst.lib_id, {})
+        pins = self._pins
+        for p, (pin_number, dx, dy) in enumerate(self._offsets[i]):
+            coord = _coord_key(inst.x + dx, inst.y + dy)
+            rank = _rank(0, i, p)
+            self._register(coord, rank)
+            if len(same_ref) > 1:
+                # Named by the last symbol of the reference with this pin,
+                # as _build_pin_name_map does.
+                last = next(j for j in reversed(same_ref) if any(n == pin_number for n, _, _ in self._offsets[j]))
+                pin_name = lib_pin_names.get(self._symbols.instances[last].lib_id, {}).get(pin_number, pin_number)
+            else:
+                pin_name = names.get(pin_number, pin_number)
+            entry = (rank, comp_ref, pin_name)
+            at = pins.get(coord)
+            if at is None:
+                pins[coord] = [entry]
+            else:
+                at.append(entry)
+
+    def _register(self, coord: int, rank: int) -> None:
+        first = self._rank.get(coord)
+        if first is None:
+            self._rank[coord] = rank
+            x, y = _key_point(coord)
+            self._point_cells.setdefault((x // _WIRE_GRID_CELL, y // _WIRE_GRID_CELL), []).append(coord)
+        elif rank < first:
+            self._rank[coord] = rank
+
+    def _make_net(self, coords: list[int]) -> Net | None:
+        """Build a net as :func:`_make_net` does from the full connection points."""
         connections = []
         name = None
         is_power = False
         for coord in coords:
-            if coord in pin_at_coord:
-                for ref, pin_num in pin_at_coord[coord]:
-                    connections.append(PinConnection(ref, pin_num))
-            if coord in label_at_coord:
-                lbl = label_at_coord[coord]
-                if lbl in power_net_names:
+            pins = self._pins.get(coord)
+            if pins:
+                pins.sort()
+                for _, ref, pin_name in pins:
+                    connections.append(PinConnection(ref, pin_name))
+            label = self._labels.get(coord)
+            if label is not None:
+                if label in self.power_net_names:
                     is_power = True
-                name = lbl
+                name = label
+        if not connections:
+            return None
+        return Net(name=name, connections=connections, is_power=is_power)
+
+
+# Sheets of a hierarchy are read on their own and stitched together by
+# kicad_tool.hierarchy, which finds the files and walks their placements.
+
+_GLOBAL = "global"
+_LOCAL = "local"
+_HIERARCHICAL = "hierarchical"
+
+
+@dataclass(slots=True)
+class SheetRef:
+    """A ``(sheet ...)`` block: a placement of another sheet file."""
+
+    uuid: str
+    name: str
+    file: str
+
+
+@dataclass(slots=True)
+class _SheetNet:
+    """A net within one sheet file, before it is stitched to other sheets."""
+
+    pins: list[tuple[int, str]]  # (instance index, pin name)
+    labels: list[tuple[str, str]]  # (kind, name), in point order
+    sheet_pins: list[tuple[int, str]]  # (sheet block index, pin name)
+
+
+@dataclass(slots=True)
+class _Sheet:
+    """Everything one sheet file contributes, independent of where it is placed.
+
+    Returned by :func:`load_sheet` and :func:`read_sheet` as an opaque handle
+    for :func:`assemble_sheets`; outside this module only ``uuid`` and
+    ``sheets``, the blocks placing other sheet files, are read.
+    """
+
+    uuid: str
+    sheets: list[SheetRef]
+    instances: list[_Instance]
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]]
+    power_net_names: set[str]
+    nets: list[_SheetNet]
+    group_rects: list[tuple[str | None, tuple[int, int, int, int]]]
+
+
+@dataclass(slots=True)
+class _SheetPlacement:
+    """One sheet file at one sheet path."""
+
+    path: str  # the uuids down to this sheet, e.g. "/<root uuid>/<block uuid>"
+    prefix: str  # "/" followed by the sheet names down to this one, e.g. "/Power/"
+    sheet: _Sheet
+    parent: int | None  # index of the placing sheet's placement
+    block: int | None  # index of the placing sheet block within the parent
+
+
+def load_sheet(path: str) -> _Sheet:
+    """Parse one sheet file of a hierarchy; safe to run in worker processes."""
+    with map_file(path) as data:
+        root = SexpNode(
+            parse_sexp(data, skip_tags=_SHEET_SKIPPED_TAGS, keep_tags=_SHEET_TAGS, intern_quoted=True),
+            TagIndex(),
+        )
+    return read_sheet(root, path)
 
+
+def read_sheet(root: SexpNode, path: str) -> _Sheet:
+    """Read a sheet of a hierarchy from its parsed tree.
+
+    The tree must keep what :func:`load_sheet` keeps: the sheet's uuid,
+    its hierarchical labels and the instances of every symbol.
+    """
+    uuid = root.child("uuid")
+    instances = _read_instances(root)
+    lib_unit_pins, lib_pin_names = _build_lib_pin_tables(_index_lib_symbols(root), instances)
+
+    # References depend on where the sheet is placed, so pins are placed
+    # under their instance's index and resolved when stitching.
+    local = [inst if inst.is_power else replace(inst, reference=str(i)) for i, inst in enumerate(instances)]
+    pin_names = _build_pin_name_map(local, lib_unit_pins, lib_pin_names, set())
+    uf = _UnionFind()
+    wiring = _read_wiring(root)
+    points = _place_connection_points(wiring, local, pin_names, lib_unit_pins, set(), uf.add)
+
+    global_coords = {coord for coord, _ in wiring.global_labels}
+    local_coords = {coord for coord, _ in wiring.labels}
+    hier_at: dict[int, str] = {}
+    for hlabel in root.children("hierarchical_label"):
+        coord = _at_key(hlabel)
+        uf.add(coord)
+        hier_at[coord] = hlabel.value
+
+    sheets = []
+    sheet_pin_at: dict[int, list[tuple[int, str]]] = {}
+    for i, block in enumerate(root.children("sheet")):
+        sheets.append(_read_sheet_ref(block, path))
+        for pin in block.children("pin"):
+            coord = _at_key(pin)
+            uf.add(coord)
+            sheet_pin_at.setdefault(coord, []).append((i, pin.value))
+
+    _join_points(uf, points.wires, points.labels | hier_at)
+
+    nets = []
+    for coords in uf.groups():
+        pins = []
+        labels = []
+        sheet_pins = []
+        for coord in coords:
+            for ref, pin_name in points.pins.get(coord, ()):
+                pins.append((int(ref), pin_name))
+            name = points.labels.get(coord)
+            if name is not None:
+                # Power symbols are global; a label on top of one names it.
+                kind = _GLOBAL if coord in global_coords or coord not in local_coords else _LOCAL
+                labels.append((kind, name))
+            if coord in hier_at:
+                labels.append((_HIERARCHICAL, hier_at[coord]))
+            sheet_pins += sheet_pin_at.get(coord, ())
+        if pins or sheet_pins or any(kind != _LOCAL for kind, _ in labels):
+            nets.append(_SheetNet(pins, labels, sheet_pins))
+
+    return _Sheet(
+        uuid=uuid.value if uuid is not None else "",
+        sheets=sheets,
+        instances=instances,
+        lib_unit_pins=lib_unit_pins,
+        power_net_names=points.power_net_names,
+        nets=nets,
+        group_rects=_read_group_rects(root),
+    )
+
+
+def _at_key(node: SexpNode) -> int:
+    at = node.child("at").raw
+    return _coord_key(_to_iu(at[1]), _to_iu(at[2]))
+
+
+def _read_sheet_ref(block: SexpNode, path: str) -> SheetRef:
+    # KiCad 6 spelled the property names with a space.
+    name = block.find("property", "Sheetname") or block.find("property", "Sheet name")
+    file = block.find("property", "Sheetfile") or block.find("property", "Sheet file")
+    uuid = block.child("uuid")
+    if file is None or uuid is None:
+        raise ValueError(f"{path}: sheet without a file or uuid")
+    return SheetRef(
+        uuid=str(uuid.value),
+        name=str(name.values[1]) if name is not None else "",
+        file=str(file.values[1]),
+    )
+
+
+def assemble_sheets(placements: list[_SheetPlacement]) -> Schematic:
+    """Extract components, nets and groups from every placement of a hierarchy.
+
+    Placements come parents first, the root sheet first of all. Each gets
+    the references KiCad annotated for its sheet path; hierarchical labels
+    join the pins of the sheet block that placed them, and global labels
+    and power symbols join by name across the whole hierarchy.
+    """
+    placed = [_placed_instances(placement.sheet, placement.path) for placement in placements]
+    instances = [inst for sheet_instances in placed for inst in sheet_instances]
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]] = {}
+    power_net_names: set[str] = set()
+    for placement in placements:
+        for key, pins in placement.sheet.lib_unit_pins.items():
+            lib_unit_pins.setdefault(key, pins)
+        power_net_names |= placement.sheet.power_net_names
+    multi_unit_refs = _find_multi_unit_refs(instances)
+
+    components = []
+    seen: set[str] = set()
+    groups: list[Group] = []
+    grouped_refs: set[str] = set()
+    for placement, sheet_instances in zip(placements, placed):
+        sheet_components, positions = _extract_components(sheet_instances, lib_unit_pins, multi_unit_refs)
+        for comp in sheet_components:
+            if comp.reference not in seen:
+                seen.add(comp.reference)
+                components.append(comp)
+        sheet_groups, sheet_grouped = _assign_groups(placement.sheet.group_rects, positions)
+        groups += sheet_groups
+        grouped_refs |= sheet_grouped
+    ungrouped = sorted(seen - grouped_refs)
+    if ungrouped:
+        groups.append(Group(name="Ungrouped", references=ungrouped))
+
+    nets = _stitch_nets(placements, placed, lib_unit_pins, multi_unit_refs, power_net_names)
+    return Schematic(components=components, nets=nets, groups=groups)
+
+
+def _placed_instances(sheet: _Sheet, path: str) -> list[_Instance]:
+    """The sheet's symbols with the reference and unit annotated for ``path``."""
+    placed = []
+    for inst in sheet.instances:
+        annotated = inst.path_refs.get(path) if inst.path_refs else None
+        if annotated is not None and annotated != (inst.reference, inst.unit):
+            reference, unit = annotated
+            inst = replace(inst, reference=reference, unit=unit, is_power=reference.startswith("#"))
+        placed.append(inst)
+    return placed
+
+
+def _stitch_nets(
+    placements: list[_SheetPlacement],
+    placed: list[list[_Instance]],
+    lib_unit_pins: dict[tuple[str, int], dict[str, _LibPin]],
+    multi_unit_refs: set[str],
+    power_net_names: set[str],
+) -> list[Net]:
+    uf = _UnionFind()
+    for p, placement in enumerate(placements):
+        for n in range(len(placement.sheet.nets)):
+            uf.add((p, n))
+
+    sheet_pins: list[dict[tuple[int, str], int]] = []
+    for placement in placements:
+        pins = {}
+        for n, net in enumerate(placement.sheet.nets):
+            for sheet_pin in net.sheet_pins:
+                pins.setdefault(sheet_pin, n)
+        sheet_pins.append(pins)
+
+    for p, placement in enumerate(placements):
+        for n, net in enumerate(placement.sheet.nets):
+            for kind, name in net.labels:
+                if kind == _GLOBAL:
+                    uf.union((p, n), name)
+                elif kind == _HIERARCHICAL and placement.parent is not None:
+                    outer = sheet_pins[placement.parent].get((placement.block, name))
+                    if outer is not None:
+                        uf.union((p, n), (placement.parent, outer))
+
+    nets = []
+    for members in uf.groups():
+        connections = []
+        global_name = root_name = sheet_name = None
+        is_power = False
+        for member in members:
+            if isinstance(member, str):
+                continue
+            p, n = member
+            placement = placements[p]
+            net = placement.sheet.nets[n]
+            for i, pin_name in net.pins:
+                inst = placed[p][i]
+                comp_ref = _resolve_comp_ref(inst.reference, inst.unit, inst.lib_id, multi_unit_refs, lib_unit_pins)
+                connections.append(PinConnection(comp_ref, pin_name))
+            for kind, name in net.labels:
+                if name in power_net_names:
+                    is_power = True
+                if kind == _GLOBAL:
+                    global_name = name
+                elif placement.parent is None:
+                    root_name = name
+                elif sheet_name is None:
+                    sheet_name = placement.prefix + name
         if connections:
+            name = global_name or root_name or sheet_name
             nets.append(Net(name=name, connections=connections, is_power=is_power))
-
     return nets
@@ -1,74 +1,317 @@
 from __future__ import annotations
 
+import codecs
+import io
+import mmap
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
 
 class QuotedStr(str):
     """A string that was originally quoted in S-expression source."""
     pass
 
 
-def parse_sexp(text: str) -> list:
-    tokens = _tokenize(text)
-    result, _ = _parse_tokens(tokens, 0)
-    return result
+class Lexeme(str):
+    """A numeric atom kept as its source text (see ``parse_sexp(lexemes=True)``).
 
+    Serialization writes the text back unchanged; :attr:`number` and
+    :attr:`SexpNode.value` convert it on access.
+    """
 
-def _tokenize(text: str) -> list[str]:
-    tokens = []
-    i = 0
-    n = len(text)
-    while i < n:
-        c = text[i]
-        if c in " \t\n\r":
-            i += 1
-        elif c == "(":
-            tokens.append("(")
-            i += 1
-        elif c == ")":
-            tokens.append(")")
-            i += 1
-        elif c == '"':
-            j = i + 1
-            parts = []
-            while j < n and text[j] != '"':
-                if text[j] == "\\" and j + 1 < n:
-                    ch = text[j + 1]
-                    if ch == "n":
-                        parts.append("\n")
-                    elif ch == "t":
-                        parts.append("\t")
+    __slots__ = ()
+
+    @property
+    def number(self) -> int | float:
+        try:
+            return int(self)
+        except ValueError:
+            return float(self)
+
+
+def parse_sexp(
+    text: str | bytes,
+    skip_tags: Iterable[str] | None = None,
+    keep_tags: Iterable[str] | None = None,
+    spans: SourceSpans | None = None,
+    intern_quoted: bool = False,
+    lexemes: bool = False,
+) -> list:
+    """Parse the first top-level list in ``text``.
+
+    Tokenizing and tree building happen in one pass over the regex matches,
+    with an explicit stack of open lists, so no token list is materialized
+    and nesting depth is not limited by the recursion limit.
+
+    ``text`` may also be UTF-8 ``bytes`` or any bytes-like buffer such as an
+    ``mmap`` (see :func:`map_file`); only the atoms that end up in the tree
+    are decoded, and span offsets are then byte offsets.
+
+    Lists whose tag is in ``skip_tags`` are dropped wherever they occur, and
+    when ``keep_tags`` is given only the root's child lists with those tags
+    are kept. Dropped lists are jumped over by matching parens, without
+    converting any of their atoms.
+
+    Passing a :class:`SourceSpans` records the source offsets of every kept
+    list (and of every atom, if the table was created with ``atoms=True``).
+
+    Unquoted atoms go through a symbol table, so each distinct keyword or
+    number is converted once and every occurrence of a keyword is the same
+    interned ``str`` as the literals in the calling code. ``intern_quoted``
+    shares short quoted strings (property names and the like) the same way.
+
+    With ``lexemes=True`` numbers are not converted: they are kept as
+    :class:`Lexeme` strings, so code that only rewrites some atoms can
+    serialize the rest exactly as it was written.
+    """
+    skip = frozenset(skip_tags or ())
+    keep = frozenset(keep_tags) if keep_tags is not None else None
+    # Tags are looked ahead at every depth for skip_tags, but only directly
+    # under the root when keep_tags is all there is.
+    filter_all = bool(skip)
+    filter_root = keep is not None
+    if isinstance(text, str):
+        token_re, tag_re, quoted = _TOKEN_RE, _TAG_RE, QuotedStr
+        atom = _lexeme if lexemes else _atom
+    else:
+        token_re, tag_re, quoted = _TOKEN_RE_B, _TAG_RE_B, _quoted_bytes
+        atom = _lexeme_bytes if lexemes else _atom_bytes
+
+    track = spans is not None
+    track_atoms = track and spans.atoms
+    if track:
+        spans._begin(text)
+    rows: list[int] = []
+    pending_atoms: list[list[int]] = []
+
+    symbols: dict = {}
+    strings: dict = {}
+    root: list = []
+    items: list | None = None
+    stack: list[list] = []
+    pos: int | None = 0
+    while pos is not None:
+        start, pos = pos, None
+        for m in token_re.finditer(text, start):
+            kind = m.lastindex
+            if kind == _BARE or kind == _QUOTED:
+                if items is not None:
+                    if track_atoms:
+                        pending_atoms[-1] += (len(items), m.start(), m.end())
+                    token = m[kind]
+                    if kind == _BARE:
+                        value = symbols.get(token)
+                        if value is None:
+                            value = symbols[token] = atom(token)
+                    elif intern_quoted and len(token) <= _INTERN_QUOTED_MAX:
+                        value = strings.get(token)
+                        if value is None:
+                            value = strings[token] = quoted(token)
                     else:
-                        parts.append(ch)
-                    j += 2
+                        value = quoted(token)
+                    items.append(value)
+            elif kind == _OPEN:
+                if items is not None and (filter_all or (filter_root and not stack)):
+                    tag_match = tag_re.match(text, m.end())
+                    tag = _text(tag_match[1]) if tag_match else None
+                    if tag in skip or (keep is not None and not stack and tag not in keep):
+                        pos = _skip_list(text, m.end())
+                        break
+                child: list = []
+                if items is None:
+                    root = child
                 else:
-                    parts.append(text[j])
-                    j += 1
-            tokens.append('"' + "".join(parts) + '"')
-            i = j + 1
+                    items.append(child)
+                    stack.append(items)
+                items = child
+                if track:
+                    rows.append(spans._open(child, m.start()))
+                    if track_atoms:
+                        pending_atoms.append([])
+            elif kind == _CLOSE:
+                if items is None:
+                    continue
+                if track:
+                    spans._close(rows.pop(), m.end(), pending_atoms.pop() if track_atoms else None)
+                if not stack:
+                    break
+                items = stack.pop()
+            elif items is not None:
+                if track_atoms:
+                    pending_atoms[-1] += (len(items), m.start(), m.end())
+                items.append(QuotedStr(_unescape(_text(m[kind]))))
+    while rows:
+        spans._close(rows.pop(), len(text), pending_atoms.pop() if track_atoms else None)
+    return root
+
+
+@contextmanager
+def map_file(path: str | Path) -> Iterator[bytes | mmap.mmap]:
+    """Memory-map ``path`` read-only for parsing without decoding it first.
+
+    The mapping shares the OS page cache with other readers of the file and
+    is closed on exit, so nothing parsed from it may keep referring to it.
+    """
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files cannot be mapped
+            yield b""
+            return
+        with mapped:
+            yield mapped
+
+
+# Token kinds are told apart by which group matched (Match.lastindex), which
+# works the same for str and bytes input. Escape-free quoted strings are
+# sliced directly; strings with escapes or no closing quote take the last
+# alternative and get unescaped.
+_OPEN, _CLOSE, _BARE, _QUOTED, _ESCAPED = 1, 2, 3, 4, 5
+_TOKEN_PATTERN = r'(\()|(\))|([^ \t\n\r()"]+)|"([^"\\]*)"|"([^"\\]*(?:\\.?[^"\\]*)*)"?'
+_TAG_PATTERN = r'[ \t\n\r]*([^ \t\n\r()"]+)'
+_SKIP_PATTERN = r'(\()|(\))|"[^"\\]*(?:\\.?[^"\\]*)*"?'
+
+
+def _balanced_pattern(depth: int) -> str:
+    """Match the rest of a list after its "(" when it nests at most ``depth`` deep."""
+    string = r'"[^"\\]*+(?:\\.[^"\\]*+)*+"'
+    body = rf'(?:[^()"]++|{string})*+\)'
+    for _ in range(depth):
+        body = rf'(?:[^()"]++|{string}|\({body})*+\)'
+    return body
+
+
+_BALANCED_PATTERN = _balanced_pattern(16)
+
+_TOKEN_RE = re.compile(_TOKEN_PATTERN, re.DOTALL)
+_TOKEN_RE_B = re.compile(_TOKEN_PATTERN.encode(), re.DOTALL)
+_TAG_RE = re.compile(_TAG_PATTERN)
+_TAG_RE_B = re.compile(_TAG_PATTERN.encode())
+_SKIP_RE = re.compile(_SKIP_PATTERN, re.DOTALL)
+_SKIP_RE_B = re.compile(_SKIP_PATTERN.encode(), re.DOTALL)
+_BALANCED_RE = re.compile(_BALANCED_PATTERN, re.DOTALL)
+_BALANCED_RE_B = re.compile(_BALANCED_PATTERN.encode(), re.DOTALL)
+_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+_ESCAPES = {"n": "\n", "t": "\t"}
+# Bare atoms starting with anything else are never numbers in KiCad files
+# (int() and float() would also take "inf", "nan", padding or non-ASCII
+# digits, none of which KiCad writes).
+_NUMBER_START = frozenset("0123456789+-.")
+_NUMBER_START_B = frozenset(b"0123456789+-.")
+_NUMBER_RE = re.compile(r"[-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?")
+# Longest quoted string shared by ``intern_quoted``; keeps one-off values such
+# as UUIDs (36 characters) out of the table.
+_INTERN_QUOTED_MAX = 32
+# Output pieces collected by serialize_sexp_to before each write.
+_WRITE_CHUNK = 4096
+
+
+def _skip_list(text: str | bytes, pos: int) -> int:
+    """Return the offset just past the list whose opening paren ends at ``pos``."""
+    # One regex match covers lists of bounded depth with closed strings;
+    # anything else is walked paren by paren.
+    m = (_BALANCED_RE if isinstance(text, str) else _BALANCED_RE_B).match(text, pos)
+    if m is not None:
+        return m.end()
+    skip_re = _SKIP_RE if isinstance(text, str) else _SKIP_RE_B
+    depth = 1
+    for m in skip_re.finditer(text, pos):
+        kind = m.lastindex
+        if kind == _OPEN:
+            depth += 1
+        elif kind == _CLOSE:
+            depth -= 1
+            if not depth:
+                return m.end()
+    return len(text)
+
+
+def _unescape(body: str) -> str:
+    if "\\" not in body:
+        return body
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m[1], m[1]), body)
+
+
+def _text(token: str | bytes) -> str:
+    return token if isinstance(token, str) else token.decode()
+
+
+OPEN = "open"
+ATOM = "atom"
+CLOSE = "close"
+
+
+def iter_sexp_events(fp: IO, chunk_size: int = 1 << 16) -> Iterator[tuple[str, object]]:
+    """Stream ``(event, value)`` pairs from a text or binary file object.
+
+    Events are ``(OPEN, tag)`` for each list (``tag`` is its first atom, or
+    None when the list starts with another list or is empty), ``(ATOM, value)``
+    for every further atom and ``(CLOSE, None)`` at the end of each list.
+    Atoms are converted exactly as in :func:`parse_sexp`. The file is read
+    ``chunk_size`` units at a time, so memory use does not depend on its size.
+    """
+    pending_open = False
+    for m in _iter_stream_matches(fp, chunk_size):
+        kind = m.lastindex
+        if kind == _OPEN:
+            if pending_open:
+                yield OPEN, None
+            pending_open = True
+            continue
+        if kind == _CLOSE:
+            if pending_open:
+                yield OPEN, None
+                pending_open = False
+            yield CLOSE, None
+            continue
+        if kind == _BARE:
+            value = _atom(m[kind])
+        elif kind == _QUOTED:
+            value = QuotedStr(m[kind])
         else:
-            j = i
-            while j < n and text[j] not in " \t\n\r()\"":
-                j += 1
-            tokens.append(text[i:j])
-            i = j
-    return tokens
-
-
-def _parse_tokens(tokens: list[str], pos: int) -> tuple[list, int]:
-    pos += 1  # skip opening paren
-    items: list = []
-    while pos < len(tokens) and tokens[pos] != ")":
-        if tokens[pos] == "(":
-            child, pos = _parse_tokens(tokens, pos)
-            items.append(child)
+            value = QuotedStr(_unescape(m[kind]))
+        if pending_open:
+            yield OPEN, value
+            pending_open = False
         else:
-            items.append(_atom(tokens[pos]))
-            pos += 1
-    return items, pos + 1  # skip closing paren
+            yield ATOM, value
+    if pending_open:
+        yield OPEN, None
+
+
+def _iter_stream_matches(fp: IO, chunk_size: int) -> Iterator[re.Match]:
+    # A token that touches the end of the buffer may continue in the next
+    # chunk, so it is carried over and rescanned rather than emitted.
+    decode = None
+    carry = ""
+    while True:
+        data = fp.read(chunk_size)
+        eof = not data
+        if isinstance(data, bytes):
+            if decode is None:
+                decode = codecs.getincrementaldecoder("utf-8")().decode
+            data = decode(data, eof)
+        buf = carry + data if carry else data
+        carry = ""
+        end = len(buf)
+        for m in _TOKEN_RE.finditer(buf):
+            if m.end() == end and not eof and m.lastindex > _CLOSE:
+                carry = buf[m.start():]
+                break
+            yield m
+        if eof:
+            return
 
 
 def _atom(token: str):
-    if token.startswith('"'):
-        return QuotedStr(token[1:-1])
+    if token[0] not in _NUMBER_START:
+        return sys.intern(token)
     try:
         return int(token)
     except ValueError:
@@ -77,19 +320,246 @@ def _atom(token: str):
         return float(token)
     except ValueError:
         pass
-    return token
+    return sys.intern(token)
+
+
+def _atom_bytes(token: bytes):
+    if token[0] not in _NUMBER_START_B:
+        return sys.intern(token.decode())
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    return sys.intern(token.decode())
+
+
+def _lexeme(token: str):
+    return Lexeme(token) if _NUMBER_RE.fullmatch(token) else sys.intern(token)
+
+
+def _lexeme_bytes(token: bytes):
+    return _lexeme(token.decode())
+
+
+def _quoted_bytes(body: bytes) -> QuotedStr:
+    return QuotedStr(body.decode())
 
 
 def serialize_sexp(data: list) -> str:
-    return _serialize_node(data, 0) + "\n"
+    out = io.StringIO()
+    serialize_sexp_to(out, data)
+    return out.getvalue()
+
+
+def serialize_sexp_to(fp: IO[str], data: list) -> None:
+    """Write ``data`` to ``fp`` in the same layout as :func:`serialize_sexp`.
+
+    Nodes are visited with an explicit stack and written out in chunks of
+    finished lines, so neither the recursion limit nor the size of the
+    output text bounds the tree.
+    """
+    _serialize_to(fp.write, data, 0)
+    fp.write("\n")
+
+
+def splice_sexp_to(fp: IO, spans: SourceSpans, dirty: Iterable[list]) -> None:
+    """Write ``spans.source`` back out with the ``dirty`` lists re-serialized.
+
+    Everything outside the outermost dirty lists is copied from the source
+    unchanged, and so is everything inside them that was not edited: the
+    atoms that kept their value, every original child list that neither is
+    nor contains a dirty list, and the whitespace in front of each of them
+    and of the closing paren. Only atoms that changed and child lists that
+    have no source span come out freshly serialized; a new child takes the
+    leading whitespace of its nearest original sibling. ``fp`` must be
+    binary when the source is bytes.
+    """
+    source = spans.source
+    binary = not isinstance(source, str)
+    regions = sorted(
+        ((span, node) for node in dirty if (span := spans.span(node)) is not None),
+        key=lambda region: region[0],
+    )
+    splicer = _Splicer(spans, [start for (start, _), _ in regions])
+    with memoryview(source) if binary else nullcontext(source) as view:
+        pos = 0
+        for (start, end), node in regions:
+            if start < pos:  # inside a list already written out
+                continue
+            fp.write(view[pos:start])
+            out: list[str] = []
+            splicer.write(out, node, start, end)
+            text = "".join(out)
+            fp.write(text.encode() if binary else text)
+            pos = end
+        fp.write(view[pos:])
+
+
+class _Splicer:
+    """Writes dirty lists for :func:`splice_sexp_to`, reusing their source text."""
+
+    def __init__(self, spans: SourceSpans, dirty_starts: list[int]):
+        self._spans = spans
+        self._source = spans.source
+        self._binary = not isinstance(self._source, str)
+        self._dirty_starts = dirty_starts
+
+    def write(self, out: list[str], node: list, start: int, end: int) -> None:
+        """Append ``node``, whose source was ``[start, end)``, to ``out``."""
+        pos = self._write_atoms(out, node, start)
+        spans = self._spans
+        children = []
+        for item in islice(node, 1, None):
+            if isinstance(item, list):
+                children.append(item)
+            elif children:
+                raise ValueError(f"Atom {item!r} after list child in {node[0]!r} node")
+        placed = [spans.span(child) for child in children]
+        placed = [span if span is not None and start < span[0] < end else None for span in placed]
+        layout = self._child_layout(start, [span for span in placed if span is not None])
+        previous_ws = None
+        for k, (child, span) in enumerate(zip(children, placed)):
+            if span is not None and span[0] >= pos:
+                previous_ws = self._leading_ws(span[0], pos)
+                out.append(previous_ws)
+                if self._contains_dirty(span):
+                    self.write(out, child, *span)
+                else:
+                    out.append(self._text(*span))
+                pos = span[1]
+                continue
+            ws = previous_ws
+            if ws is None:
+                following = next((s for s in placed[k + 1:] if s is not None and s[0] >= pos), None)
+                ws = self._leading_ws(following[0], pos) if following is not None else layout[0]
+            out.append(ws)
+            self._write_fresh(out, child, ws, layout)
+        out.append(self._leading_ws(end - 1, pos) + ")")
+
+    def _write_atoms(self, out: list[str], node: list, start: int) -> int:
+        """Append the paren and leading atoms of ``node``; return where they ended in the source."""
+        atoms = []
+        for item in node:
+            if isinstance(item, list):
+                break
+            atoms.append(item)
+        out.append("(")
+        pos = start + 1
+        token_re = _TOKEN_RE_B if self._binary else _TOKEN_RE
+        i = 0
+        for m in token_re.finditer(self._source, pos):
+            kind = m.lastindex
+            if kind == _OPEN or kind == _CLOSE:
+                break
+            if i < len(atoms):
+                token = _text(m[kind])
+                if kind == _BARE:
+                    original = _lexeme(token)
+                else:
+                    original = QuotedStr(_unescape(token) if kind == _ESCAPED else token)
+                out.append(self._text(pos, m.start()))
+                out.append(self._text(*m.span()) if _same_atom(original, atoms[i]) else format_atom(atoms[i]))
+            i += 1
+            pos = m.end()
+        for atom in atoms[i:]:
+            out.append(" " + format_atom(atom))
+        return pos
+
+    def _child_layout(self, start: int, placed: list[tuple[int, int]]) -> tuple[str, str]:
+        """Return the whitespace before a new child line, and one level of indent."""
+        parent_indent = self._line_indent(start)
+        for child_start, _ in placed:
+            ws = self._leading_ws(child_start, start)
+            if "\n" in ws:
+                indent = ws.rpartition("\n")[2]
+                unit = indent[len(parent_indent):] if indent.startswith(parent_indent) else ""
+                return ws, unit or "\t"
+        return "\n" + parent_indent + "\t", "\t"
+
+    def _write_fresh(self, out: list[str], node: list, ws: str, layout: tuple[str, str]) -> None:
+        """Append ``node`` serialized, with its lines indented like its siblings'."""
+        line_ws, unit = layout
+        indent = (ws if "\n" in ws else line_ws).rpartition("\n")[2]
+        pieces: list[str] = []
+        _serialize_to(pieces.append, node, 0)
+        lines = "".join(pieces).split("\n")
+        for n in range(1, len(lines)):
+            line = lines[n]
+            body = line.lstrip("\t")
+            lines[n] = indent + unit * (len(line) - len(body)) + body
+        out.append("\n".join(lines))
+
+    def _contains_dirty(self, span: tuple[int, int]) -> bool:
+        k = bisect_left(self._dirty_starts, span[0])
+        return k < len(self._dirty_starts) and self._dirty_starts[k] < span[1]
+
+    def _leading_ws(self, end: int, floor: int) -> str:
+        """Return the run of whitespace just before ``end``, not reaching back past ``floor``."""
+        text = self._text(floor, end)
+        return text[len(text.rstrip(" \t\r\n")):]
+
+    def _line_indent(self, pos: int) -> str:
+        source = self._source
+        line_start = source.rfind(b"\n" if self._binary else "\n", 0, pos) + 1
+        line = self._text(line_start, pos)
+        return line[:len(line) - len(line.lstrip(" \t"))]
+
+    def _text(self, start: int, end: int) -> str:
+        return _text(self._source[start:end])
+
+
+def _same_atom(original, current) -> bool:
+    """Tell whether an atom read back from the source still has its parsed value."""
+    if isinstance(original, QuotedStr) != isinstance(current, QuotedStr):
+        return False
+    if type(original) is Lexeme and type(current) is not Lexeme:
+        return not isinstance(current, str) and original.number == current
+    return original == current
+
+
+def _serialize_to(write, data: list, indent: int) -> None:
+    """Serialize ``data`` at ``indent`` through ``write``, without a final newline."""
+    out: list[str] = []
+    stack: list[tuple[Iterator[list], int]] = []
+    node = data
+    while True:
+        children = _write_node_start(out, node, indent)
+        if children is not None:
+            stack.append((iter(children), indent))
+        while stack:
+            remaining, parent_indent = stack[-1]
+            node = next(remaining, None)
+            if node is None:
+                stack.pop()
+                out.append("\n" + "\t" * parent_indent + ")")
+                continue
+            indent = parent_indent + 1
+            out.append("\n")
+            break
+        else:
+            write("".join(out))
+            return
+        if len(out) >= _WRITE_CHUNK:
+            write("".join(out))
+            out.clear()
 
 
-def _serialize_node(data: list, indent: int) -> str:
-    has_child_lists = any(isinstance(item, list) for item in data[1:])
+def _write_node_start(out: list[str], data: list, indent: int) -> list[list] | None:
+    """Append ``data`` up to its first child list to ``out``.
 
-    if not has_child_lists:
-        parts = [_format_atom(item) for item in data]
-        return "\t" * indent + "(" + " ".join(parts) + ")"
+    Returns the child lists still to be written on their own lines, or
+    None when the node was written completely.
+    """
+    for item in islice(data, 1, None):
+        if isinstance(item, list):
+            break
+    else:
+        out.append("\t" * indent + "(" + " ".join([format_atom(item) for item in data]) + ")")
+        return None
 
     # Collect leading atoms (tag + args before first list child)
     leading = []
@@ -100,7 +570,7 @@ def _serialize_node(data: list, indent: int) -> str:
             found_list = True
             list_children.append(item)
         elif not found_list:
-            leading.append(_format_atom(item))
+            leading.append(format_atom(item))
         else:
             raise ValueError(f"Atom {item!r} after list child in {data[0]!r} node")
 
@@ -111,7 +581,7 @@ def _serialize_node(data: list, indent: int) -> str:
     if len(list_children) > 1 and _all_same_tag_leaves(list_children):
         child_prefix = "\t" * (indent + 1)
         formatted = [
-            "(" + " ".join(_format_atom(item) for item in child) + ")"
+            "(" + " ".join(format_atom(item) for item in child) + ")"
             for child in list_children
         ]
         # Pack children into lines, wrapping at ~120 chars
@@ -129,13 +599,11 @@ def _serialize_node(data: list, indent: int) -> str:
         lines = [prefix + "(" + " ".join(leading)]
         lines.extend(packed_lines)
         lines.append(prefix + ")")
-        return "\n".join(lines)
+        out.append("\n".join(lines))
+        return None
 
-    lines = [prefix + "(" + " ".join(leading)]
-    for child in list_children:
-        lines.append(_serialize_node(child, indent + 1))
-    lines.append(prefix + ")")
-    return "\n".join(lines)
+    out.append(prefix + "(" + " ".join(leading))
+    return list_children
 
 
 def _all_same_tag_leaves(children: list[list]) -> bool:
@@ -147,7 +615,9 @@ def _all_same_tag_leaves(children: list[list]) -> bool:
     )
 
 
-def _format_atom(value) -> str:
+def format_atom(value) -> str:
+    if type(value) is str or type(value) is Lexeme:
+        return value
     if isinstance(value, QuotedStr):
         escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
         return f'"{escaped}"'
@@ -156,11 +626,26 @@ def _format_atom(value) -> str:
     return str(value)
 
 
+# Lists this short are scanned even when an index is available: building
+# their table costs more than the few lookups made on them.
+_TAG_INDEX_MIN_LEN = 8
+
+
 class SexpNode:
-    __slots__ = ("_data",)
+    """View of a parsed list with tag-based child lookup.
+
+    Lookups scan the children linearly unless a :class:`TagIndex` is passed,
+    in which case each longer list's tag positions are computed on first
+    access and the index is shared by every node reached from this one. Code
+    that inserts or removes child lists of an indexed node must call
+    :meth:`invalidate` on it afterwards.
+    """
+
+    __slots__ = ("_data", "_index")
 
-    def __init__(self, data: list):
+    def __init__(self, data: list, index: TagIndex | None = None):
         self._data = data
+        self._index = index
 
     @property
     def tag(self) -> str:
@@ -168,26 +653,275 @@ class SexpNode:
 
     @property
     def value(self):
-        return self._data[1] if len(self._data) > 1 else None
+        if len(self._data) < 2:
+            return None
+        value = self._data[1]
+        return value.number if type(value) is Lexeme else value
 
     @property
     def values(self) -> list:
-        return [x for x in self._data[1:] if not isinstance(x, list)]
+        return [x.number if type(x) is Lexeme else x for x in self._data[1:] if not isinstance(x, list)]
 
     @property
     def raw(self) -> list:
         return self._data
 
     def child(self, tag: str) -> SexpNode | None:
-        for item in self._data[1:]:
-            if isinstance(item, list) and item and str(item[0]) == tag:
-                return SexpNode(item)
+        data, index = self._data, self._index
+        if index is not None and len(data) > _TAG_INDEX_MIN_LEN:
+            positions = index.positions(data).get(tag)
+            return SexpNode(data[positions[0]], index) if positions else None
+        for item in islice(data, 1, None):
+            if isinstance(item, list) and item and item[0] == tag:
+                return SexpNode(item, index)
         return None
 
     def children(self, tag: str):
-        for item in self._data[1:]:
-            if isinstance(item, list) and item and str(item[0]) == tag:
-                yield SexpNode(item)
+        data, index = self._data, self._index
+        if index is not None and len(data) > _TAG_INDEX_MIN_LEN:
+            for i in index.positions(data).get(tag, ()):
+                yield SexpNode(data[i], index)
+            return
+        for item in islice(data, 1, None):
+            if isinstance(item, list) and item and item[0] == tag:
+                yield SexpNode(item, index)
+
+    def find(self, tag: str, value) -> SexpNode | None:
+        """Return the first ``(tag value ...)`` child, e.g. a named property."""
+        data, index = self._data, self._index
+        if index is not None and len(data) > _TAG_INDEX_MIN_LEN:
+            i = index.named(data, tag).get(value)
+            return SexpNode(data[i], index) if i is not None else None
+        for item in self.children(tag):
+            if item.value == value:
+                return item
+        return None
 
     def has(self, tag: str) -> bool:
         return self.child(tag) is not None
+
+    def invalidate(self) -> None:
+        """Drop this node's cached tag positions after its children changed."""
+        if self._index is not None:
+            self._index.invalidate(self._data)
+
+
+class TagIndex:
+    """Lazily built tag -> child positions tables, one per list.
+
+    Lists are identified by object identity and kept alive by the index, so
+    an index must not outlive edits that replace lists it has seen.
+    """
+
+    def __init__(self):
+        self._tables: dict[int, tuple[list, dict, dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def positions(self, data: list) -> dict:
+        """Return ``{tag: [index, ...]}`` for the child lists of ``data``."""
+        entry = self._tables.get(id(data)) or self._build(data)
+        return entry[1]
+
+    def named(self, data: list, tag: str) -> dict:
+        """Return ``{value: index}`` for the first ``(tag value ...)`` child per value.
+
+        Values are keyed as :attr:`SexpNode.value` returns them, so numbers
+        kept as :class:`Lexeme` text are keyed by the number.
+        """
+        entry = self._tables.get(id(data)) or self._build(data)
+        by_value = entry[2].get(tag)
+        if by_value is None:
+            by_value = entry[2][tag] = {}
+            for i in entry[1].get(tag, ()):
+                item = data[i]
+                if len(item) > 1 and not isinstance(item[1], list):
+                    value = item[1]
+                    by_value.setdefault(value.number if type(value) is Lexeme else value, i)
+        return by_value
+
+    def _build(self, data: list) -> tuple[list, dict, dict]:
+        table: dict = {}
+        for i, item in enumerate(islice(data, 1, None), 1):
+            if isinstance(item, list) and item and not isinstance(item[0], list):
+                positions = table.get(item[0])
+                if positions is None:
+                    table[item[0]] = [i]
+                else:
+                    positions.append(i)
+        entry = self._tables[id(data)] = (data, table, {})
+        return entry
+
+    def invalidate(self, data: list) -> None:
+        self._tables.pop(id(data), None)
+
+
+class SourceSpans:
+    """Side table of source offsets filled in by ``parse_sexp(..., spans=...)``.
+
+    List nodes are identified by object identity; their ``(start, end)``
+    offsets cover the parens. With ``atoms=True`` the span of every atom is
+    recorded too, addressed by its parent list and its index in that list.
+    Offsets index into the parsed text.
+    """
+
+    def __init__(self, atoms: bool = False):
+        self.atoms = atoms
+        self.source = ""
+        self._rows: dict[int, int] = {}
+        self._nodes: list[list] = []  # keeps ids in _rows from being reused
+        self._starts = array("q")
+        self._ends = array("q")
+        self._atom_first = array("q")
+        self._atom_counts = array("q")
+        self._atom_slots = array("q")
+        self._atom_starts = array("q")
+        self._atom_ends = array("q")
+        self._line_starts: array | None = None
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def span(self, node: list | SexpNode) -> tuple[int, int] | None:
+        row = self._rows.get(id(_raw(node)))
+        if row is None:
+            return None
+        return self._starts[row], self._ends[row]
+
+    def atom_span(self, node: list | SexpNode, index: int) -> tuple[int, int] | None:
+        row = self._rows.get(id(_raw(node)))
+        if row is None or not self.atoms:
+            return None
+        first = self._atom_first[row]
+        last = first + self._atom_counts[row]
+        k = bisect_left(self._atom_slots, index, first, last)
+        if k == last or self._atom_slots[k] != index:
+            return None
+        return self._atom_starts[k], self._atom_ends[k]
+
+    def source_text(self, node: list | SexpNode):
+        span = self.span(node)
+        return None if span is None else self.source[span[0]:span[1]]
+
+    def line_col(self, offset: int) -> tuple[int, int]:
+        """Return the 1-based line and column of ``offset``."""
+        if self._line_starts is None:
+            newline = "\n" if isinstance(self.source, str) else b"\n"
+            starts = array("q", [0])
+            pos = self.source.find(newline)
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = self.source.find(newline, pos + 1)
+            self._line_starts = starts
+        line = bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
+
+    def _begin(self, source) -> None:
+        self.__init__(self.atoms)
+        self.source = source
+
+    def _open(self, node: list, start: int) -> int:
+        row = len(self._nodes)
+        self._rows[id(node)] = row
+        self._nodes.append(node)
+        self._starts.append(start)
+        self._ends.append(start)
+        if self.atoms:
+            self._atom_first.append(0)
+            self._atom_counts.append(0)
+        return row
+
+    def _close(self, row: int, end: int, atoms: list[int] | None) -> None:
+        self._ends[row] = end
+        if not atoms:
+            return
+        # A list's atoms are buffered until it closes and then stored as one
+        # contiguous block of (slot, start, end) columns, sorted by slot.
+        self._atom_first[row] = len(self._atom_slots)
+        self._atom_counts[row] = len(atoms) // 3
+        self._atom_slots.extend(atoms[0::3])
+        self._atom_starts.extend(atoms[1::3])
+        self._atom_ends.extend(atoms[2::3])
+
+
+def _raw(node: list | SexpNode) -> list:
+    return node.raw if isinstance(node, SexpNode) else node
+
+
+def scan_symbol_properties(data: bytes) -> Iterator[dict[str, tuple[int, int, str]]]:
+    """Yield ``{key: (start, end, value)}`` for each symbol directly under the root.
+
+    Only the first property per key is reported, with the byte range of its
+    value atom; a property without one gets ``(-1, -1, "")``. All other lists
+    are skipped by matching parens, without converting anything.
+    """
+    search = _TOKEN_RE_B.search
+    m = search(data)
+    if m is None or m.lastindex != _OPEN:
+        return
+    pos = m.end()
+    while (found := _next_child(data, pos, _NEXT_SYMBOL_RE, b"symbol")) is not None and found[1]:
+        props: dict[str, tuple[int, int, str]] = {}
+        pos = found[0]
+        while (found := _next_child(data, pos, _NEXT_PROPERTY_RE, b"property")) is not None and found[1]:
+            pos = found[0]
+            key = search(data, pos)
+            if key is not None and key.lastindex not in (_OPEN, _CLOSE):
+                name = _atom_text(key)
+                value = search(data, key.end())
+                if name in props:
+                    pass
+                elif value is None or value.lastindex in (_OPEN, _CLOSE):
+                    props[name] = (-1, -1, "")
+                else:
+                    props[name] = (value.start(), value.end(), _atom_text(value))
+            pos = _skip_list(data, pos)
+        yield props
+        if found is None:
+            return
+        pos = found[0]
+
+
+def _next_child_pattern(tag: str) -> bytes:
+    """Skip siblings up to the next ``(tag`` child or the enclosing list's ")".
+
+    The match ends just past ``tag``, or past the ")" captured as group 1.
+    """
+    is_tag = rf'[ \t\n\r]*+{tag}(?![^ \t\n\r()"])'
+    string = r'"[^"\\]*+(?:\\.[^"\\]*+)*+"'
+    return (
+        rf'(?:[^()"]++|{string}|\((?!{is_tag}){_BALANCED_PATTERN})*+(?:(\))|\({is_tag})'
+    ).encode()
+
+
+_NEXT_SYMBOL_RE = re.compile(_next_child_pattern("symbol"), re.DOTALL)
+_NEXT_PROPERTY_RE = re.compile(_next_child_pattern("property"), re.DOTALL)
+
+
+def _next_child(data: bytes, pos: int, next_re: re.Pattern, tag: bytes) -> tuple[int, bool] | None:
+    """Advance to the next ``(tag`` child: ``(offset past tag, True)``.
+
+    Returns ``(offset past ")", False)`` when the enclosing list ends first,
+    and None when the data does.
+    """
+    m = next_re.match(data, pos)
+    if m is not None:
+        return m.end(), m[1] is None
+    # A sibling nested too deep for the pattern, or an unterminated string:
+    # walk the siblings token by token instead.
+    while (token := _TOKEN_RE_B.search(data, pos)) is not None:
+        pos = token.end()
+        if token.lastindex == _CLOSE:
+            return pos, False
+        if token.lastindex == _OPEN:
+            found = _TAG_RE_B.match(data, pos)
+            if found is not None and found[1] == tag:
+                return found.end(), True
+            pos = _skip_list(data, pos)
+    return None
+
+
+def _atom_text(m: re.Match) -> str:
+    text = m[m.lastindex].decode()
+    return _unescape(text) if m.lastindex == _ESCAPED else text
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from kicad_tool.annotate import format_changes, read_rows, resolve_edits
+
+
+def test_read_rows_csv(tmp_path):
+    path = tmp_path / "parts.csv"
+    path.write_text('MPN,ref,LCSC\nRC0402,"R1,R2",\nECA-1VHG471,C1,C12345\n,,\n')
+    assert list(read_rows(path)) == [
+        ("R1,R2", {"MPN": "RC0402"}),
+        ("C1", {"MPN": "ECA-1VHG471", "LCSC": "C12345"}),
+    ]
+
+
+def test_read_rows_ndjson(tmp_path):
+    path = tmp_path / "parts.ndjson"
+    rows = [{"Reference": "R*", "MPN": "RC0402", "LCSC": None}, {"Designator": "C1", "Qty": 2}]
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n\n")
+    assert list(read_rows(path)) == [("R*", {"MPN": "RC0402"}), ("C1", {"Qty": "2"})]
+
+
+def test_read_rows_needs_reference_column(tmp_path):
+    path = tmp_path / "parts.csv"
+    path.write_text("Part,MPN\nR1,RC0402\n")
+    with pytest.raises(ValueError, match="no Reference column"):
+        list(read_rows(path))
+
+
+def test_resolve_edits():
+    rows = [
+        ("R*", {"MPN": "RC0402", "LCSC": "C1"}),
+        ("R2, C1", {"MPN": "other"}),
+        ("Q*", {"MPN": "x"}),
+        ("U9", {"MPN": "y"}),
+    ]
+    edits, unmatched = resolve_edits(rows, ["R1", "R2", "C1", "U1"])
+    assert edits == {
+        "R1": {"MPN": "RC0402", "LCSC": "C1"},
+        "R2": {"MPN": "other", "LCSC": "C1"},
+        "C1": {"MPN": "other"},
+    }
+    assert unmatched == ["Q*", "U9"]
+
+
+def test_format_changes():
+    changes = {
+        "R1": ["MPN: (new) RC0402", "Value: 10k -> 22k"],
+        "R2": ["MPN: old -> RC0402"],
+    }
+    assert format_changes(changes) == (
+        "Annotated 2 components\n"
+        "  MPN: 2 set (1 new)\n"
+        "  Value: 1 set\n"
+    )
+
+
+def test_format_changes_skips_unchanged():
+    changes = {"R1": ["MPN: old -> RC0402"], "R2": [], "C1": []}
+    assert format_changes(changes) == "Annotated 1 components\n  MPN: 1 set\n"
+    assert format_changes({"R1": [], "R2": []}) == "Annotated 0 components\n"
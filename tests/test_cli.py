@@ -197,6 +197,18 @@ def test_cli_netlist_ref_comma():
     assert "M1  " not in result.stdout
 
 
+def test_cli_netlist_net():
+    result = subprocess.run(
+        [sys.executable, "-m", "kicad_tool.cli", "netlist", "--net", "M+", HIRVI],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0
+    headers = {line.split()[0] for line in result.stdout.splitlines() if line and not line.startswith(" ")}
+    assert headers == {"M1", "Q1", "Q2", "J1"}
+    assert "(M+)" in result.stdout
+
+
 def test_cli_set_glob_ref():
     fd, path = tempfile.mkstemp(suffix=".kicad_sch")
     os.close(fd)
@@ -240,3 +252,46 @@ def test_cli_set_error_ref_not_found():
         assert "no components found" in result.stderr
     finally:
         os.unlink(path)
+
+
+def test_cli_annotate(tmp_path):
+    path = tmp_path / "board.kicad_sch"
+    shutil.copy2(HIRVI, path)
+    parts = tmp_path / "parts.csv"
+    parts.write_text("Reference,MPN,LCSC\nC1,ECA-1VHG471,C12345\nR*,RC0402FR-0710KL,\nX9,foo,\n")
+    result = subprocess.run(
+        [sys.executable, "-m", "kicad_tool.cli", "annotate", str(path), "--from", str(parts)],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0
+    assert "LCSC: 1 set (1 new)" in result.stdout
+    assert "X9" in result.stderr
+
+    from kicad_tool.sexp import scan_symbol_properties
+    props = {p["Reference"][2]: p for p in scan_symbol_properties(path.read_bytes())}
+    assert props["C1"]["MPN"][2] == "ECA-1VHG471"
+    assert props["R1"]["MPN"][2] == "RC0402FR-0710KL"
+    assert "LCSC" not in props["R1"]
+
+    # The same file again changes nothing.
+    result = subprocess.run(
+        [sys.executable, "-m", "kicad_tool.cli", "annotate", str(path), "--from", str(parts)],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0
+    assert result.stdout == "Annotated 0 components\nNo changes\n"
+
+
+def test_cli_set_queue(tmp_path):
+    path = tmp_path / "board.kicad_sch"
+    shutil.copy2(HIRVI, path)
+    result = subprocess.run(
+        [sys.executable, "-m", "kicad_tool.cli", "set", str(path), "--ref", "C1", "--set", "Value=1000uF", "--queue"],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0
+    assert "C1: Value: 470uF -> 1000uF" in result.stdout
+    assert list((tmp_path / "board.kicad_sch.queue").iterdir()) == []
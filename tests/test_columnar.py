@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from kicad_tool.columnar import ColumnarList, ColumnarNode, ColumnarTree
+from kicad_tool.editor import _index_symbols, _set_or_add_property
+from kicad_tool.parser import parse_schematic
+from kicad_tool.sexp import QuotedStr, SexpNode, parse_sexp, serialize_sexp
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+HIRVI = os.path.join(FIXTURES, "hirvi.kicad_sch")
+JOLENE = os.path.join(FIXTURES, "jolene.kicad_sch")
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("path", [HIRVI, JOLENE])
+def test_to_list_matches_parse_sexp(path):
+    text = _read(path)
+    assert ColumnarTree.parse(text).to_list() == parse_sexp(text)
+
+
+def test_atom_types():
+    tree = ColumnarTree.parse('(at 1.5 -2 "x" hide ("q" 3) (4))')
+    raw = tree.root.raw
+    assert raw == ["at", 1.5, -2, "x", "hide", ["q", 3], [4]]
+    assert isinstance(raw[3], QuotedStr)
+    assert not isinstance(raw[4], QuotedStr)
+    assert isinstance(raw[5][0], QuotedStr)
+    assert isinstance(raw[5], ColumnarList) and isinstance(raw[5], list)
+
+
+def test_skip_and_keep_tags():
+    text = "(sch 1 (symbol (effects 2) (at 3)) (wire 4) (polyline 5))"
+    tree = ColumnarTree.parse(text, skip_tags={"effects"}, keep_tags={"symbol", "wire"})
+    assert tree.to_list() == parse_sexp(text, skip_tags={"effects"}, keep_tags={"symbol", "wire"})
+
+
+def test_node_view():
+    root = ColumnarTree.parse('(a (b 1 2) (c "x") (b 3) (d (b 4)))').root
+    assert isinstance(root, SexpNode)
+    assert root.tag == "a"
+    assert [b.values for b in root.children("b")] == [[1, 2], [3]]
+    assert root.child("c").value == "x"
+    assert root.child("missing") is None
+    assert root.has("d")
+    assert list(root.children("nothing")) == []
+
+
+def test_mutation():
+    tree = ColumnarTree.parse('(sym (property "Value" "1k") (pin 1))')
+    raw = tree.root.raw
+    raw[1][2] = QuotedStr("2k")
+    raw.insert(2, ["property", QuotedStr("MPN"), QuotedStr("X"), ["at", 0, 0, 0]])
+    raw.append(["uuid", QuotedStr("u")])
+    assert tree.to_list() == [
+        "sym",
+        ["property", "Value", "2k"],
+        ["property", "MPN", "X", ["at", 0, 0, 0]],
+        ["pin", 1],
+        ["uuid", "u"],
+    ]
+    assert [p.value for p in ColumnarNode(raw).children("property")] == ["Value", "MPN"]
+
+
+def test_editor_helpers_run_unchanged():
+    text = _read(HIRVI)
+    outputs = []
+    for root in (SexpNode(parse_sexp(text)), ColumnarTree.parse(text).root):
+        changes = []
+        for sym in _index_symbols(root)["C1"]:
+            _set_or_add_property(sym, "Value", "1000uF", changes)
+            _set_or_add_property(sym, "MPN", "ECA-1VHG471", changes)
+        outputs.append((changes, serialize_sexp(root.raw)))
+    assert outputs[0] == outputs[1]
+
+
+@pytest.mark.parametrize("path", [HIRVI, JOLENE])
+def test_parse_schematic_columnar(path):
+    assert parse_schematic(path, columnar=True) == parse_schematic(path)
@@ -1,13 +1,15 @@
+import io
 import os
 import shutil
 import tempfile
 
 import pytest
 
-from kicad_tool.sexp import SexpNode, parse_sexp
+from kicad_tool.sexp import SexpNode, SourceSpans, parse_sexp
 
 FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
 HIRVI = os.path.join(FIXTURES, "hirvi.kicad_sch")
+JOLENE = os.path.join(FIXTURES, "jolene.kicad_sch")
 
 
 def _make_temp_copy():
@@ -118,3 +120,211 @@ def test_error_cannot_edit_reference():
             set_properties(path, "C1", {"Reference": "C99"})
     finally:
         os.unlink(path)
+
+
+def test_edit_keeps_number_spelling(tmp_path):
+    from kicad_tool.editor import set_properties
+
+    path = tmp_path / "x.kicad_sch"
+    path.write_text(
+        '(kicad_sch\n\t(symbol\n\t\t(lib_id "Device:R")\n\t\t(at 100.0 50.80 0)\n'
+        '\t\t(property "Reference" "R1"\n\t\t\t(at 1.27000 -2.54 90)\n\t\t)\n'
+        '\t\t(property "Value" "10k"\n\t\t\t(at 1.27 2.540 90)\n\t\t)\n\t)\n)\n'
+    )
+    set_properties(path, "R1", {"Value": "22k"})
+    text = path.read_text()
+    assert "(at 100.0 50.80 0)" in text
+    assert "(at 1.27000 -2.54 90)" in text
+    assert '(property "Value" "22k"' in text
+
+
+def test_failed_write_leaves_file_untouched(tmp_path):
+    from kicad_tool.editor import set_properties
+
+    path = tmp_path / "x.kicad_sch"
+    text = '(kicad_sch (symbol (lib_id "Device:R") (property "Reference" "R1") stray))\n'
+    path.write_text(text)
+    with pytest.raises(ValueError, match="after list child"):
+        set_properties(path, "R1", {"Value": "22k"})
+    assert path.read_text() == text
+    assert sorted(os.listdir(tmp_path)) == ["x.kicad_sch", "x.kicad_sch.lock"]
+
+
+def test_edit_copies_untouched_text(tmp_path):
+    from kicad_tool.editor import set_properties
+
+    path = tmp_path / "x.kicad_sch"
+    shutil.copy2(HIRVI, path)
+    with open(HIRVI) as f:
+        before = f.read().splitlines()
+    set_properties(path, "C1", {"Value": "1000uF"})
+    after = path.read_text().splitlines()
+    assert len(after) == len(before)
+    changed = [(a, b) for a, b in zip(before, after) if a != b]
+    assert changed == [('\t\t(property "Value" "470uF"', '\t\t(property "Value" "1000uF"')]
+
+
+def _write_to_bytes(write) -> bytes:
+    out = io.BytesIO()
+    write(out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("path", [HIRVI, JOLENE])
+def test_patch_matches_tree_edit(path):
+    from kicad_tool.editor import _edit_tree, _patch_properties, _write_patched
+    from kicad_tool.sexp import scan_symbol_properties
+
+    with open(path, "rb") as f:
+        data = f.read()
+    refs = {props["Reference"][2] for props in scan_symbol_properties(data)}
+    assert len(refs) > 10
+    for ref in sorted(refs)[::5]:  # a fifth of them keeps the test quick
+        properties = {"Value": f'new "{ref}"', "Footprint": "X:Y"}
+        changes, patches = _patch_properties(data, {ref: properties})
+        tree_changes, write, unchanged = _edit_tree(data, {ref: properties})
+        assert unchanged == (not patches)
+        assert changes == tree_changes
+        assert _write_to_bytes(lambda f: _write_patched(f, data, patches)) == _write_to_bytes(write)
+
+
+def test_patch_falls_back_for_new_property():
+    from kicad_tool.editor import _patch_properties
+
+    data = b'(kicad_sch (symbol (property "Reference" "R1") (property "Value" "1k")))'
+    other_unit = b' (symbol (property "Reference" "R1")))'
+    assert _patch_properties(data[:-1] + other_unit, {"R1": {"Value": "2k"}}) is None
+    assert _patch_properties(data, {"R2": {"Value": "2k"}}) is None
+    assert _patch_properties(data, {"R1": {"Value": "2k"}, "R2": {"Value": "2k"}}) is None
+    changes, patches = _patch_properties(data, {"R1": {"Value": "2k"}})
+    assert changes == {"R1": ["Value: 1k -> 2k"]}
+    assert patches == [(data.index(b'"1k"'), data.index(b'"1k"') + 4, b'"2k"')]
+
+
+def test_batch_matches_one_by_one(tmp_path):
+    from kicad_tool.editor import set_properties, set_properties_batch
+
+    edits = {
+        "C1": {"Value": "1000uF", "MPN": "ECA-1VHG102"},
+        "U1": {"Value": "40106B"},
+        "R1": {"Value": "22k"},
+    }
+    one_by_one = tmp_path / "one.kicad_sch"
+    batch = tmp_path / "batch.kicad_sch"
+    shutil.copy2(HIRVI, one_by_one)
+    shutil.copy2(HIRVI, batch)
+    expected = {ref: set_properties(one_by_one, ref, properties) for ref, properties in edits.items()}
+    assert set_properties_batch(batch, edits).changes == expected
+    assert batch.read_bytes() == one_by_one.read_bytes()
+
+
+def test_batch_missing_reference_edits_nothing(tmp_path):
+    from kicad_tool.editor import set_properties_batch
+
+    path = tmp_path / "x.kicad_sch"
+    shutil.copy2(HIRVI, path)
+    with pytest.raises(ValueError, match="'ZZZZ99' not found"):
+        set_properties_batch(path, {"C1": {"Value": "1000uF"}, "ZZZZ99": {"Value": "foo"}})
+    with open(HIRVI, "rb") as f:
+        assert path.read_bytes() == f.read()
+
+
+@pytest.mark.parametrize("properties", [{"Value": "470uF"}, {"Value": "1000uF", "MPN": "ECA-1VHG471"}])
+def test_unchanged_edit_skips_write(tmp_path, properties):
+    from kicad_tool.editor import set_properties_batch
+
+    path = tmp_path / "x.kicad_sch"
+    shutil.copy2(HIRVI, path)
+    if "MPN" in properties:
+        assert set_properties_batch(path, {"C1": properties}).written
+    before = os.stat(path)
+    result = set_properties_batch(path, {"C1": properties})
+    assert result.changes == {"C1": []}
+    assert not result.written and result.bytes_written == 0
+    after = os.stat(path)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+
+
+def test_write_reports_size_and_keeps_mode(tmp_path):
+    from kicad_tool.editor import set_properties_batch
+
+    path = tmp_path / "x.kicad_sch"
+    shutil.copy2(HIRVI, path)
+    os.chmod(path, 0o640)
+    result = set_properties_batch(path, {"C1": {"Value": "1000uF", "Voltage": "35V"}})
+    assert result.written
+    assert result.changes == {"C1": ["Value: 470uF -> 1000uF", "Voltage: (new) 35V"]}
+    assert result.bytes_written == os.path.getsize(path)
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert sorted(os.listdir(tmp_path)) == ["x.kicad_sch", "x.kicad_sch.lock"]
+
+
+def test_patch_keeps_odd_spacing(tmp_path):
+    from kicad_tool.editor import set_properties
+
+    path = tmp_path / "x.kicad_sch"
+    text = '(kicad_sch\n  (lib_symbols (symbol "R" (property "Reference" "R1")))\n  (symbol   (property "Reference"   "R1")\n    (property "Value" "1k" (at 0   0))))\n'
+    path.write_text(text)
+    assert set_properties(path, "R1", {"Value": "2k"}) == ["Value: 1k -> 2k"]
+    assert path.read_text() == text.replace('"1k"', '"2k"')
+
+
+def test_tree_edit_keeps_odd_spacing(tmp_path):
+    from kicad_tool.editor import set_properties
+
+    # A new property takes the tree path; only it and the edited value may change.
+    path = tmp_path / "x.kicad_sch"
+    head = '(kicad_sch\n  (symbol (lib_id "Device:R") (at 100  50 0) (unit 1)\n'
+    reference = '    (property "Reference" "R1" (at 101 49 0)\n      (effects (font (size 1.27 1.27)))\n    )\n'
+    value = '    (property "Value" "10k" (at 101 51 0)\n      (effects (font (size 1.27 1.27)))\n    )\n'
+    tail = '    (pin "1" (uuid "a"))\n  )\n)\n'
+    path.write_text(head + reference + value + tail)
+    assert set_properties(path, "R1", {"MPN": "X", "Value": "22k"}) == ["MPN: (new) X", "Value: 10k -> 22k"]
+    mpn = (
+        '    (property "MPN" "X"\n      (at 0 0 0)\n      (effects\n        (font\n          (size 1.27 1.27)\n'
+        '        )\n        (hide yes)\n      )\n    )\n'
+    )
+    assert path.read_text() == head + reference + value.replace('"10k"', '"22k"') + mpn + tail
+
+
+def test_edit_property_without_value(tmp_path):
+    from kicad_tool.editor import set_properties
+
+    path = tmp_path / "x.kicad_sch"
+    text = '(kicad_sch (symbol (property "Reference" "R1") (property "MPN") (property "Value" (at 0 0))))\n'
+    path.write_text(text)
+    assert set_properties(path, "R1", {"MPN": "X", "Value": "1k"}) == ["MPN:  -> X", "Value:  -> 1k"]
+    assert path.read_text() == text.replace('"MPN"', '"MPN" "X"').replace('"Value"', '"Value" "1k"')
+
+
+def _tree_symbol_properties(data: bytes) -> list[dict]:
+    spans = SourceSpans(atoms=True)
+    result = []
+    for sym in parse_sexp(data, spans=spans, lexemes=True):
+        if not isinstance(sym, list) or sym[0] != "symbol":
+            continue
+        props = {}
+        for prop in sym[1:]:
+            if not isinstance(prop, list) or prop[:1] != ["property"] or len(prop) < 2 or str(prop[1]) in props:
+                continue
+            if len(prop) > 2 and not isinstance(prop[2], list):
+                props[str(prop[1])] = (*spans.atom_span(prop, 2), str(prop[2]))
+            else:
+                props[str(prop[1])] = (-1, -1, "")
+        result.append(props)
+    return result
+
+
+def test_scan_symbol_properties_matches_tree():
+    from kicad_tool.sexp import scan_symbol_properties
+
+    deep = "(d " * 20 + ")" * 20
+    with open(HIRVI, "rb") as f:
+        hirvi = f.read()
+    for data in (
+        hirvi,
+        hirvi[:-2] + f'(symbol {deep} (property "Value" "a (b)") (property "Value" "c")) {deep})'.encode(),
+        b'(kicad_sch (symbol (property "K\\"ey" "v\\nw" x) (property Bare 1.50) (property "Empty")))',
+        b'(kicad_sch (symbols (property "A" "b")) (symbol (property "A" "b") (symbol (property "B" "c"',
+    ):
+        assert list(scan_symbol_properties(data)) == _tree_symbol_properties(data)
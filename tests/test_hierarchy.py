@@ -0,0 +1,150 @@
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pytest
+
+from kicad_tool import parser
+from kicad_tool.parser import parse_schematic, parse_schematic_subset
+
+_LIB = """\
+  (lib_symbols
+    (symbol "Device:R"
+      (symbol "R_1_1"
+        (pin passive line (at 0 3.81 270) (length 1.27) (name "~") (number "1"))
+        (pin passive line (at 0 -3.81 90) (length 1.27) (name "~") (number "2"))
+      )
+    )
+  )
+"""
+
+# R1's pin 1 is wired to the IN pin of sheet A only; sheet B's IN pin is
+# left open. Both sheets place the same file.
+_ROOT = f"""\
+(kicad_sch
+  (uuid "root")
+{_LIB}
+  (symbol (lib_id "Device:R") (at 100 100 0) (unit 1)
+    (property "Reference" "R1") (property "Value" "1k")
+    (instances (project "p" (path "/root" (reference "R1") (unit 1))))
+  )
+  (wire (pts (xy 100 96.19) (xy 120 96.19)))
+  (global_label "VBUS" (shape input) (at 100 103.81 0))
+  (sheet (at 120 90) (size 20 20) (uuid "sa")
+    (property "Sheetname" "A") (property "Sheetfile" "amp.kicad_sch")
+    (pin "IN" input (at 120 96.19 180))
+  )
+  (sheet (at 160 90) (size 20 20) (uuid "sb")
+    (property "Sheetname" "B") (property "Sheetfile" "amp.kicad_sch")
+    (pin "IN" input (at 160 96.19 180))
+  )
+)
+"""
+
+_AMP = f"""\
+(kicad_sch
+  (uuid "amp")
+{_LIB}
+  (symbol (lib_id "Device:R") (at 50 50 0) (unit 1)
+    (property "Reference" "R10") (property "Value" "10k")
+    (instances (project "p"
+      (path "/root/sa" (reference "R10") (unit 1))
+      (path "/root/sb" (reference "R20") (unit 1))
+    ))
+  )
+  (hierarchical_label "IN" (shape input) (at 50 46.19 0))
+  (label "MID" (at 50 53.81 0))
+  (wire (pts (xy 50 53.81) (xy 60 53.81)))
+  (global_label "VBUS" (shape input) (at 60 53.81 0))
+)
+"""
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "amp.kicad_sch").write_text(_AMP)
+    root = tmp_path / "root.kicad_sch"
+    root.write_text(_ROOT)
+    return root
+
+
+def _nets(sch):
+    return {net.name: sorted((c.component_ref, c.pin_name) for c in net.connections) for net in sch.nets}
+
+
+def test_hierarchy_components_per_placement(project):
+    sch = parse_schematic(project, workers=1)
+    assert [(c.reference, c.value) for c in sch.components] == [("R1", "1k"), ("R10", "10k"), ("R20", "10k")]
+
+
+def test_hierarchy_stitches_sheet_pins_and_global_labels(project):
+    nets = _nets(parse_schematic(project, workers=1))
+    assert nets == {
+        "/A/IN": [("R1", "1"), ("R10", "1")],
+        "/B/IN": [("R20", "1")],
+        "VBUS": [("R1", "2"), ("R10", "2"), ("R20", "2")],
+    }
+
+
+@pytest.mark.parametrize("subset", [False, True])
+def test_hierarchy_parses_each_file_once(project, monkeypatch, subset):
+    mapped = []
+    map_file = parser.map_file
+
+    def counting(path):
+        mapped.append(Path(path).name)
+        return map_file(path)
+
+    monkeypatch.setattr(parser, "map_file", counting)
+    if subset:
+        parse_schematic_subset(project, select_refs=lambda refs: {"R1"})
+    else:
+        parse_schematic(project, workers=1)
+    assert sorted(mapped) == ["amp.kicad_sch", "root.kicad_sch"]
+
+
+def test_hierarchy_columnar_matches_tree(project):
+    assert parse_schematic(project, columnar=True, workers=1) == parse_schematic(project, workers=1)
+
+
+def test_hierarchy_parallel_matches_serial(project):
+    # Two distinct sub-sheet files, so that they are loaded by the pool.
+    (project.parent / "amp2.kicad_sch").write_text(_AMP)
+    text = project.read_text()
+    sheet_b = text.index('(uuid "sb")')
+    project.write_text(text[:sheet_b] + text[sheet_b:].replace("amp.kicad_sch", "amp2.kicad_sch", 1))
+    assert parse_schematic(project, workers=2) == parse_schematic(project, workers=1)
+
+
+def test_hierarchy_rejects_recursion(tmp_path):
+    loop = _ROOT.replace("amp.kicad_sch", "root.kicad_sch")
+    root = tmp_path / "root.kicad_sch"
+    root.write_text(loop)
+    with pytest.raises(ValueError, match="places itself"):
+        parse_schematic(root, workers=1)
+
+
+def test_cli_set_edits_root_sheet_only(project):
+    # R10 and R20 live in amp.kicad_sch; set edits the file it is given.
+    amp = (project.parent / "amp.kicad_sch").read_text()
+    result = subprocess.run(
+        [sys.executable, "-m", "kicad_tool.cli", "set", str(project), "--ref", "R*", "--set", "MPN=X"],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "R1: MPN: (new) X\n"
+    assert (project.parent / "amp.kicad_sch").read_text() == amp
+
+
+def test_cli_set_warns_on_sub_sheet_refs(project):
+    amp = (project.parent / "amp.kicad_sch").read_text()
+    result = subprocess.run(
+        [sys.executable, "-m", "kicad_tool.cli", "set", str(project), "--ref", "R2*", "--set", "MPN=X"],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert "only matches components in sub-sheets (R20)" in result.stderr
+    assert (project.parent / "amp.kicad_sch").read_text() == amp
@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import threading
+
+import pytest
+
+from kicad_tool.locking import drain_queue, enqueue_edits, queue_dir, schematic_lock, submit_edits
+from kicad_tool.sexp import scan_symbol_properties
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+HIRVI = os.path.join(FIXTURES, "hirvi.kicad_sch")
+
+
+def _values(path, key):
+    with open(path, "rb") as f:
+        return {p["Reference"][2]: p[key][2] for p in scan_symbol_properties(f.read()) if key in p}
+
+
+@pytest.fixture
+def board(tmp_path):
+    path = tmp_path / "board.kicad_sch"
+    shutil.copy2(HIRVI, path)
+    return path
+
+
+def test_drain_applies_queue_in_one_write(board):
+    first = enqueue_edits(board, {"C1": {"Value": "1000uF"}, "R1": {"Value": "1k"}})
+    second = enqueue_edits(board, {"R1": {"Value": "2k", "MPN": "RC0402"}})
+    with schematic_lock(board):
+        assert drain_queue(board) == 2
+    assert sorted(p.name for p in queue_dir(board).iterdir()) == [
+        first.with_suffix(".result").name, second.with_suffix(".result").name,
+    ]
+    assert _values(board, "Value")["R1"] == "2k"
+    assert _values(board, "MPN")["R1"] == "RC0402"
+
+    outcome = json.loads(first.with_suffix(".result").read_text())
+    assert outcome["written"]
+    # The second entry overwrote R1's value, so only it reports the change.
+    assert outcome["changes"] == {"C1": ["Value: 470uF -> 1000uF"], "R1": []}
+    outcome = json.loads(second.with_suffix(".result").read_text())
+    assert outcome["changes"] == {"R1": ["Value: 2.2K -> 2k", "MPN: (new) RC0402"]}
+
+
+def test_drain_isolates_bad_entries(board):
+    good = enqueue_edits(board, {"C1": {"Value": "1000uF"}})
+    bad = enqueue_edits(board, {"ZZZZ99": {"Value": "foo"}})
+    with schematic_lock(board):
+        assert drain_queue(board) == 2
+    assert "not found" in json.loads(bad.with_suffix(".result").read_text())["error"]
+    assert json.loads(good.with_suffix(".result").read_text())["written"]
+    assert _values(board, "Value")["C1"] == "1000uF"
+
+
+def test_submit_raises_entry_error(board):
+    with pytest.raises(ValueError, match="not found"):
+        submit_edits(board, {"ZZZZ99": {"Value": "foo"}})
+    assert list(queue_dir(board).iterdir()) == []
+
+
+def test_concurrent_submits_lose_nothing(board):
+    refs = sorted(ref for ref in _values(board, "Value") if not ref.startswith("#"))
+    errors = []
+
+    def submit(ref):
+        try:
+            result = submit_edits(board, {ref: {"MPN": f"MPN-{ref}"}})
+            assert result.changes == {ref: [f"MPN: (new) MPN-{ref}"]}
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit, args=(ref,)) for ref in refs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    mpns = _values(board, "MPN")
+    assert {ref: mpns.get(ref) for ref in refs} == {ref: f"MPN-{ref}" for ref in refs}
+    assert list(queue_dir(board).iterdir()) == []
+
+
+def test_failed_write_leaves_nothing_queued(board, monkeypatch):
+    from kicad_tool import editor
+
+    apply_edits = editor._apply_edits
+
+    def no_space(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(editor, "_apply_edits", no_space)
+    other = enqueue_edits(board, {"R1": {"Value": "1k"}})
+    with pytest.raises(OSError, match="No space"):
+        submit_edits(board, {"C1": {"Value": "FAILED-EDIT"}})
+    assert sorted(p.name for p in queue_dir(board).iterdir()) == [other.with_suffix(".result").name]
+    assert "No space" in json.loads(other.with_suffix(".result").read_text())["error"]
+
+    monkeypatch.setattr(editor, "_apply_edits", apply_edits)
+    submit_edits(board, {"R2": {"Value": "3k"}})
+    values = _values(board, "Value")
+    assert values["C1"] == "470uF"
+    assert values["R1"] == "2.2K"
+    assert values["R2"] == "3k"
+
+
+def test_fallback_lock_breaks_stale_lock(board, monkeypatch):
+    from kicad_tool import locking
+
+    monkeypatch.setattr(locking, "fcntl", None)
+    lock_path = board.with_name(board.name + ".lock")
+    lock_path.touch()
+    old = lock_path.stat().st_mtime - locking._STALE_LOCK_AGE - 1
+    os.utime(lock_path, (old, old))
+    with schematic_lock(board):
+        assert lock_path.stat().st_mtime > old
+    assert not lock_path.exists()
+
+
+def test_fallback_lock_keeps_lock_taken_after_stale_check(board, monkeypatch):
+    from kicad_tool import locking
+
+    lock_path = board.with_name(board.name + ".lock")
+    rename = os.rename
+
+    def replaced_first(src, dst):
+        # Another process broke the stale lock and took a fresh one since
+        # this one saw it was stale.
+        os.unlink(src)
+        with open(src, "w") as f:
+            f.write("fresh")
+        rename(src, dst)
+
+    lock_path.write_text("stale")
+    old = lock_path.stat().st_mtime - locking._STALE_LOCK_AGE - 1
+    os.utime(lock_path, (old, old))
+    monkeypatch.setattr(locking.os, "rename", replaced_first)
+    locking._break_stale_lock(lock_path)
+    assert lock_path.read_text() == "fresh"
+    assert sorted(p.name for p in board.parent.iterdir()) == ["board.kicad_sch", "board.kicad_sch.lock"]
+
+    monkeypatch.setattr(locking.os, "rename", rename)
+    os.utime(lock_path, (old, old))
+    locking._break_stale_lock(lock_path)
+    assert not lock_path.exists()
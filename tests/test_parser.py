@@ -454,3 +454,146 @@ def test_groups_references_sorted(hirvi_schematic):
     """References within each group are sorted."""
     for group in hirvi_schematic.groups:
         assert group.references == sorted(group.references)
+
+
+def test_read_instances():
+    from kicad_tool.parser import _read_instances
+    from kicad_tool.sexp import SexpNode, parse_sexp
+
+    root = SexpNode(parse_sexp(
+        '(kicad_sch (symbol (lib_id "Device:R") (at 10 20 90) (mirror y) (unit 2)'
+        ' (property "Reference" "R1") (property "Value" "1k") (property "Value" "2k") (pin "1"))'
+        ' (symbol (lib_id "power:GND") (at 5 5) (unit 1) (property "Reference" "#PWR01")))'
+    ))
+    r1, gnd = _read_instances(root)
+    assert (r1.reference, r1.lib_id, r1.unit, r1.x, r1.y, r1.rotation, r1.mirror) == ("R1", "Device:R", 2, 100_000, 200_000, 90, "y")
+    assert r1.properties == {"Reference": "R1", "Value": "1k"}
+    assert not r1.is_power
+    assert (gnd.rotation, gnd.mirror, gnd.is_power) == (0, None, True)
+
+
+def test_coord_keys_are_exact():
+    from kicad_tool.parser import _coord_key, _key_point, _to_iu
+
+    assert _to_iu(100 - 3.81) == _to_iu(96.19) == 961_900
+    assert _to_iu(0.0001) == 1
+    for x, y in [(0, 0), (-1, 2), (961_900, -254_000), (-(2**31), 2**31 - 1)]:
+        assert _key_point(_coord_key(x, y)) == (x, y)
+    assert _coord_key(1, 0) != _coord_key(0, 1)
+
+
+def test_lib_pin_tables():
+    from kicad_tool.parser import _LibPin, _build_lib_pin_tables, _index_lib_symbols, _read_instances
+    from kicad_tool.sexp import SexpNode, parse_sexp
+
+    with open(HIRVI) as f:
+        root = SexpNode(parse_sexp(f.read()))
+    unit_pins, pin_names = _build_lib_pin_tables(_index_lib_symbols(root), _read_instances(root))
+    assert sorted(unit for lib_id, unit in unit_pins if lib_id == "4xxx:40106") == [1, 2, 3, 4, 5, 6, 7]
+    assert unit_pins[("4xxx:40106", 7)] == {
+        "14": _LibPin("14", "VDD", "power_in", 0, 127_000),
+        "7": _LibPin("7", "VSS", "power_in", 0, -127_000),
+    }
+    assert unit_pins[("4xxx:40106", 1)]["1"] == _LibPin("1", "~", "input", -76_200, 0)
+    assert pin_names["4xxx:40106"] == {"14": "VDD", "7": "VSS"}
+
+
+@pytest.mark.parametrize("rotation, mirror, expected", [
+    (0, None, [("1", 10, -20)]),
+    (90, None, [("1", -20, -10)]),
+    (180, None, [("1", -10, 20)]),
+    (270.0, None, [("1", 20, 10)]),
+    (-90, None, [("1", 20, 10)]),
+    (0, "x", [("1", 10, 20)]),
+    (90, "y", [("1", 20, -10)]),
+])
+def test_pin_offsets_quarter_turns(rotation, mirror, expected):
+    from kicad_tool.parser import _LibPin, _pin_offsets
+
+    offsets = _pin_offsets({"1": _LibPin("1", "~", "passive", 10, 20)}, rotation, mirror)
+    assert offsets == expected
+    assert all(type(d) is int for _, dx, dy in offsets for d in (dx, dy))
+
+
+_T_CONNECTION_SCH = """\
+(kicad_sch
+  (lib_symbols
+    (symbol "Device:R"
+      (symbol "R_1_1"
+        (pin passive line (at 0 3.81 270) (length 1.27) (name "~") (number "1"))
+        (pin passive line (at 0 -3.81 90) (length 1.27) (name "~") (number "2"))
+      )
+    )
+  )
+  (symbol (lib_id "Device:R") (at 100 100 0) (unit 1)
+    (property "Reference" "R1") (property "Value" "10k")
+  )
+  (wire (pts (xy 90 96.19) (xy 110 96.19)))
+  (wire (pts (xy 95 80) (xy 95 96.19)))
+  (label "SIG" (at 95 80 0))
+  (wire (pts (xy 100 103.81) (xy 100 120)))
+  (label "OUT" (at 100 110 0))
+)
+"""
+
+
+def test_mid_wire_connections(tmp_path):
+    """Pins, wire ends and labels that touch a wire between its ends join its net."""
+    path = tmp_path / "t.kicad_sch"
+    path.write_text(_T_CONNECTION_SCH)
+    nets = {net.name: net.connections for net in parse_schematic(path).nets}
+    assert [(c.component_ref, c.pin_name) for c in nets["SIG"]] == [("R1", "1")]
+    assert [(c.component_ref, c.pin_name) for c in nets["OUT"]] == [("R1", "2")]
+
+
+@pytest.mark.parametrize("share", [0, 1])
+@pytest.mark.parametrize("path", [HIRVI, JOLENE])
+def test_subset_nets_match_full_nets(path, share, monkeypatch):
+    """Walking out from a selection finds the same nets, in the same order,
+    whether the walk goes all the way or gives up at once."""
+    from kicad_tool import parser
+    from kicad_tool.parser import parse_schematic_subset
+
+    monkeypatch.setattr(parser, "_WALK_BUDGET_SHARE", share)
+    full = parse_schematic(path)
+    for comp in full.components:
+        subset, selected = parse_schematic_subset(path, select_refs=lambda refs: {r for r in refs if r == comp.reference})
+        assert selected == {comp.reference}
+        expected = [n for n in full.nets if any(c.component_ref == comp.reference for c in n.connections)]
+        assert subset.nets == expected
+
+
+def test_subset_by_net_name():
+    from kicad_tool.parser import parse_schematic_subset
+
+    full = parse_schematic(HIRVI)
+    _, selected = parse_schematic_subset(HIRVI, net="GND")
+    assert selected == {c.component_ref for n in full.nets if n.name == "GND" for c in n.connections}
+    # Q2's source is grounded, R1 has no pin on GND.
+    _, selected = parse_schematic_subset(HIRVI, select_refs=lambda refs: {"Q2", "R1"}, net="GND")
+    assert selected == {"Q2"}
+
+
+def test_subset_mid_wire_connections(tmp_path):
+    from kicad_tool.parser import parse_schematic_subset
+
+    path = tmp_path / "t.kicad_sch"
+    path.write_text(_T_CONNECTION_SCH)
+    subset, selected = parse_schematic_subset(path, net="OUT")
+    assert selected == {"R1"}
+    assert [n.name for n in subset.nets] == ["SIG", "OUT"]
+
+
+def test_subset_diagonal_wire(tmp_path, monkeypatch):
+    """A diagonal wire joins its ends even though no point can lie on it."""
+    from kicad_tool import parser
+    from kicad_tool.parser import parse_schematic_subset
+
+    monkeypatch.setattr(parser, "_WALK_BUDGET_SHARE", 1)
+    path = tmp_path / "t.kicad_sch"
+    path.write_text(_T_CONNECTION_SCH.replace(
+        '(label "SIG" (at 95 80 0))', '(wire (pts (xy 95 80) (xy 90 75)))\n  (label "SIG" (at 90 75 0))'
+    ))
+    subset, selected = parse_schematic_subset(path, net="SIG")
+    assert selected == {"R1"}
+    assert subset.nets == parse_schematic(path).nets
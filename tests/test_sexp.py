@@ -1,6 +1,13 @@
+import io
 import os
+import sys
 
-from kicad_tool.sexp import parse_sexp, serialize_sexp, SexpNode, QuotedStr
+import pytest
+
+from kicad_tool.sexp import (
+    ATOM, CLOSE, OPEN, Lexeme, QuotedStr, SexpNode, SourceSpans, TagIndex, iter_sexp_events, map_file, parse_sexp,
+    serialize_sexp, serialize_sexp_to, splice_sexp_to,
+)
 
 FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
 HIRVI = os.path.join(FIXTURES, "hirvi.kicad_sch")
@@ -36,6 +43,164 @@ def test_parse_integers_and_floats():
     assert result == ["size", 1.27, 1.27]
 
 
+def test_parse_deep_nesting():
+    depth = 100_000
+    result = parse_sexp("(a " * depth + "leaf" + ")" * depth)
+    for _ in range(depth - 1):
+        assert result[0] == "a"
+        result = result[1]
+    assert result == ["a", "leaf"]
+
+
+def test_parse_first_top_level_list_only():
+    assert parse_sexp("(a 1) (b 2)") == ["a", 1]
+
+
+def test_parse_unbalanced():
+    assert parse_sexp("(a (b 1") == ["a", ["b", 1]]
+    assert parse_sexp("") == []
+
+
+def test_parse_skip_tags():
+    text = '(sch (symbol "R" (effects (font "a)b" (size 1 1))) (at 1 2)) (effects x) (wire))'
+    assert parse_sexp(text, skip_tags={"effects"}) == ["sch", ["symbol", "R", ["at", 1, 2]], ["wire"]]
+
+
+def test_parse_keep_tags_applies_to_root_children():
+    text = "(sch 1 (symbol (wire 2)) (wire 3) (polyline (wire 4)))"
+    assert parse_sexp(text, keep_tags={"symbol"}) == ["sch", 1, ["symbol", ["wire", 2]]]
+    assert parse_sexp(text, keep_tags={"wire"}, skip_tags={"wire"}) == ["sch", 1]
+
+
+def test_spans_lists():
+    text = '(a 1\n  (b (c 2) "x")\n  (d))'
+    spans = SourceSpans()
+    root = parse_sexp(text, spans=spans)
+    assert len(spans) == 4
+    assert spans.source_text(root) == text
+    assert spans.source_text(root[2]) == '(b (c 2) "x")'
+    assert spans.source_text(SexpNode(root[2][1])) == "(c 2)"
+    assert spans.span(root[3]) == (23, 26)
+    assert spans.atom_span(root, 1) is None
+    assert spans.span(["not", "parsed"]) is None
+
+
+def test_spans_atoms():
+    text = '(a 1\n  (b (c 2) "x y")\n  (d))'
+    spans = SourceSpans(atoms=True)
+    root = parse_sexp(text, spans=spans)
+    start, end = spans.atom_span(root[2], 2)
+    assert text[start:end] == '"x y"'
+    assert spans.line_col(start) == (2, 12)
+    assert spans.atom_span(root, 1) == (3, 4)
+    assert spans.atom_span(root, 2) is None
+
+
+def test_spans_skip_unclosed():
+    text = "(a (skip (x)) (b 1"
+    spans = SourceSpans()
+    root = parse_sexp(text, skip_tags={"skip"}, spans=spans)
+    assert root == ["a", ["b", 1]]
+    assert len(spans) == 2
+    assert spans.source_text(root[1]) == "(b 1"
+
+
+def test_spans_hirvi_symbols():
+    with open(HIRVI) as f:
+        text = f.read()
+    spans = SourceSpans()
+    root = SexpNode(parse_sexp(text, spans=spans))
+    for sym in root.children("symbol"):
+        assert parse_sexp(spans.source_text(sym)) == sym.raw
+
+
+def test_parse_interns_keywords():
+    tag = "".join(["sym", "bol"])  # built at runtime, so not interned itself
+    for text in (f"({tag} (at 1 2) (at 3 4))", f"({tag} (at 1 2) (at 3 4))".encode()):
+        root = parse_sexp(text)
+        assert root[0] is sys.intern("symbol")
+        assert root[1][0] is root[2][0] is sys.intern("at")
+
+
+def test_parse_intern_quoted():
+    text = '(a (property "Reference" "R1") (property "Reference" "00000000-0000-0000-0000-000000000000"))'
+    root = parse_sexp(text)
+    assert root[1][1] is not root[2][1]
+    root = parse_sexp(text, intern_quoted=True)
+    assert root[1][1] is root[2][1]
+    assert isinstance(root[1][1], QuotedStr)
+    assert parse_sexp(text, intern_quoted=True) == parse_sexp(text)
+
+
+def test_parse_lexemes():
+    text = '(at 100.0 -50.80 1e3 +5 0 hide "1.0" (xy .5 -.25))'
+    for source in (text, text.encode()):
+        root = parse_sexp(source, lexemes=True)
+        assert [type(x) for x in root[1:8]] == [Lexeme, Lexeme, Lexeme, Lexeme, Lexeme, str, QuotedStr]
+        assert root[1:6] == ["100.0", "-50.80", "1e3", "+5", "0"]
+        assert [x.number for x in root[1:6]] == [100.0, -50.8, 1000.0, 5, 0]
+        assert SexpNode(root).values == parse_sexp(text)[1:8]
+        assert SexpNode(root[8]).value == 0.5
+        assert serialize_sexp(root) == '(at 100.0 -50.80 1e3 +5 0 hide "1.0"\n\t(xy .5 -.25)\n)\n'
+
+
+def test_parse_keyword_looking_like_number():
+    assert parse_sexp("(a - -x 1.2.3 .)") == ["a", "-", "-x", "1.2.3", "."]
+    root = parse_sexp("(a - -x 1.2.3 .)", lexemes=True)
+    assert root == ["a", "-", "-x", "1.2.3", "."]
+    assert not any(isinstance(x, Lexeme) for x in root)
+
+
+def test_parse_bytes():
+    text = '(sym "Ωμ \\"x\\"" 1.5 -2 hide (at 1 2))'
+    result = parse_sexp(text.encode())
+    assert result == parse_sexp(text)
+    assert [type(x) for x in result] == [str, QuotedStr, float, int, str, list]
+
+
+def test_parse_mapped_file_with_spans(tmp_path):
+    text = '(kicad_sch (symbol "Ω" (at 1 2)) (effects x))'
+    path = tmp_path / "x.kicad_sch"
+    path.write_text(text)
+    spans = SourceSpans()
+    with map_file(path) as data:
+        root = parse_sexp(data, skip_tags={"effects"}, spans=spans)
+        assert spans.source_text(root[1]) == '(symbol "Ω" (at 1 2))'.encode()
+    assert root == ["kicad_sch", ["symbol", "Ω", ["at", 1, 2]]]
+
+
+def test_map_empty_file(tmp_path):
+    path = tmp_path / "empty.kicad_sch"
+    path.write_bytes(b"")
+    with map_file(path) as data:
+        assert parse_sexp(data) == []
+
+
+@pytest.mark.parametrize("encode", [str, str.encode])
+def test_parse_tokens(encode):
+    result = parse_sexp(encode('(x (at 1.27 -5)\n\t(b "x y"))'))
+    assert result == ["x", ["at", 1.27, -5], ["b", "x y"]]
+    assert isinstance(result[2][1], QuotedStr)
+
+
+@pytest.mark.parametrize("encode", [str, str.encode])
+def test_parse_escapes(encode):
+    assert parse_sexp(encode(r'(x "a\"b" "c\\d" "e\nf\tg" "h\qi")')) == ["x", 'a"b', "c\\d", "e\nf\tg", "hqi"]
+
+
+@pytest.mark.parametrize("encode", [str, str.encode])
+def test_parse_quote_ends_bare_atom(encode):
+    result = parse_sexp(encode('(abc"def"ghi)'))
+    assert result == ["abc", "def", "ghi"]
+    assert [isinstance(atom, QuotedStr) for atom in result] == [False, True, False]
+
+
+@pytest.mark.parametrize("encode", [str, str.encode])
+def test_parse_unterminated_string(encode):
+    assert parse_sexp(encode('(a "bc')) == ["a", "bc"]
+    assert parse_sexp(encode('(a "trailing\\')) == ["a", "trailing\\"]
+
+
 def test_sexpnode_tag():
     node = SexpNode(["symbol", "4xxx:40106", ["unit", 1]])
     assert node.tag == "symbol"
@@ -76,6 +241,55 @@ def test_sexpnode_has():
     assert not node.has("rotation")
 
 
+def test_sexpnode_find():
+    node = SexpNode(["symbol", ["property", "Reference", "R1"], ["property", "Value", "10k"]])
+    assert node.find("property", "Value").raw[2] == "10k"
+    assert node.find("property", "Footprint") is None
+
+
+def _indexed_symbol() -> list:
+    return ["symbol", ["lib_id", "Device:R"], ["at", 1, 2, 0], ["unit", 1]] + [
+        ["property", name, f"{name} value"] for name in ("Reference", "Value", "Footprint", "Datasheet")
+    ] + [["pin", str(n)] for n in range(1, 4)]
+
+
+def test_sexpnode_tag_index_matches_scans():
+    data = ["kicad_sch", _indexed_symbol(), _indexed_symbol(), ["wire", ["pts"]]]
+    index = TagIndex()
+    plain, indexed = SexpNode(data), SexpNode(data, index)
+    for tag in ("symbol", "wire", "missing"):
+        assert [n.raw for n in plain.children(tag)] == [n.raw for n in indexed.children(tag)]
+    sym = indexed.child("symbol")
+    assert sym.raw is data[1]
+    assert [p.raw[1] for p in sym.children("pin")] == ["1", "2", "3"]
+    assert sym.find("property", "Footprint").raw[2] == "Footprint value"
+    assert sym.find("property", "Missing") is None
+    assert sym.child("at").values == [1, 2, 0]
+    assert len(index) == 1  # only the symbol is long enough to be indexed
+
+
+@pytest.mark.parametrize("pins", [1, 8])  # below and above the index threshold
+def test_sexpnode_find_lexemes_with_and_without_index(pins):
+    text = "(symbol " + " ".join(f"(pin {n}.0)" for n in range(1, pins + 1)) + ' (pin "1.0"))'
+    data = parse_sexp(text, lexemes=True)
+    plain, indexed = SexpNode(data), SexpNode(data, TagIndex())
+    for node in (plain, indexed):
+        assert node.find("pin", 1.0).raw is data[1]
+        assert node.find("pin", 1).raw is data[1]
+        assert node.find("pin", "1.0").raw is data[-1]
+        assert node.find("pin", 99) is None
+
+
+def test_sexpnode_tag_index_invalidate():
+    data = _indexed_symbol()
+    sym = SexpNode(data, TagIndex())
+    assert sym.find("property", "MPN") is None
+    data.insert(1, ["property", "MPN", "X"])
+    sym.invalidate()
+    assert sym.find("property", "MPN").raw[2] == "X"
+    assert [p.value for p in sym.children("property")][0] == "MPN"
+
+
 def test_sexpnode_raw():
     data = ["pin", "input", "line", ["at", 0, 0]]
     node = SexpNode(data)
@@ -196,3 +410,95 @@ def test_serialize_roundtrip_hirvi():
     serialized = serialize_sexp(data)
     reparsed = parse_sexp(serialized)
     assert data == reparsed
+
+
+def test_serialize_to_file_object_matches(tmp_path):
+    with open(HIRVI) as f:
+        data = parse_sexp(f.read(), lexemes=True)
+    path = tmp_path / "out.kicad_sch"
+    with path.open("w") as f:
+        serialize_sexp_to(f, data)
+    assert path.read_text() == serialize_sexp(data)
+
+
+def test_serialize_deep_nesting():
+    depth = 3 * sys.getrecursionlimit()
+    data = parse_sexp("(a " * depth + ")" * depth)
+    out = io.StringIO()
+    serialize_sexp_to(out, data)
+    text = out.getvalue()
+    assert text.startswith("(a\n\t(a\n")
+    assert text.count("(a") == depth
+
+
+def test_serialize_atom_after_list_child():
+    with pytest.raises(ValueError, match="after list child"):
+        serialize_sexp(["a", ["b"], "c"])
+
+
+def test_splice_rewrites_only_dirty_lists():
+    text = "(a  (b   1)\n\t(c   2 (d   3)\n\t\t(e 4))\n  (f 5))\n"
+    spans = SourceSpans()
+    root = parse_sexp(text, spans=spans, lexemes=True)
+    root[2][3][1] = 9
+    out = io.StringIO()
+    splice_sexp_to(out, spans, [root[2][3]])
+    assert out.getvalue() == "(a  (b   1)\n\t(c   2 (d   3)\n\t\t(e 9))\n  (f 5))\n"
+
+    root[2][1] = 7
+    out = io.StringIO()
+    splice_sexp_to(out, spans, [root[2][3], root[2]])
+    assert out.getvalue() == "(a  (b   1)\n\t(c   7 (d   3)\n\t\t(e 9))\n  (f 5))\n"
+
+
+def test_splice_mapped_file(tmp_path):
+    path = tmp_path / "x.kicad_sch"
+    path.write_text('(kicad_sch (symbol "Ω"\n\t(at 1 2)) (wire))\n')
+    spans = SourceSpans()
+    out = io.BytesIO()
+    with map_file(path) as data:
+        root = parse_sexp(data, keep_tags={"symbol"}, spans=spans)
+        root[1].insert(2, ["unit", 1])
+        splice_sexp_to(out, spans, [root[1]])
+    assert out.getvalue().decode() == '(kicad_sch (symbol "Ω"\n\t(unit 1)\n\t(at 1 2)) (wire))\n'
+
+
+def _tree_from_events(events):
+    stack = [[]]
+    for event, value in events:
+        if event == OPEN:
+            node = [] if value is None else [value]
+            stack[-1].append(node)
+            stack.append(node)
+        elif event == ATOM:
+            stack[-1].append(value)
+        else:
+            stack.pop()
+    return stack[0]
+
+
+def test_events_simple():
+    events = list(iter_sexp_events(io.StringIO('(a 1 (b "x") (() c))')))
+    assert events == [
+        (OPEN, "a"), (ATOM, 1),
+        (OPEN, "b"), (ATOM, "x"), (CLOSE, None),
+        (OPEN, None), (OPEN, None), (CLOSE, None), (ATOM, "c"), (CLOSE, None),
+        (CLOSE, None),
+    ]
+    assert isinstance(events[3][1], QuotedStr)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 8])
+def test_events_tokens_across_chunks(chunk_size):
+    text = '(sym "a \\"q\\" \\\\ (x)" -12.5 Ω_ref "Ωμ" keyword)'
+    expected = [parse_sexp(text)]
+    for fp in (io.StringIO(text), io.BytesIO(text.encode())):
+        assert _tree_from_events(iter_sexp_events(fp, chunk_size)) == expected
+
+
+@pytest.mark.parametrize("mode", ["r", "rb"])
+def test_events_match_parse_hirvi(mode):
+    with open(HIRVI) as f:
+        expected = [parse_sexp(f.read())]
+    with open(HIRVI, mode) as f:
+        assert _tree_from_events(iter_sexp_events(f, chunk_size=997)) == expected